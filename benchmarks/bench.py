@@ -0,0 +1,223 @@
+"""
+Benchmarks of CoinMarketCap against a local MockServer.
+
+The mock server runs in a separate process, so CPU time and memory
+are those of the client only.
+
+Usage
+-----
+    python -m benchmarks.bench
+    python -m benchmarks.bench --calls 500 --latency 0.02 --save base.json
+    python -m benchmarks.bench --compare base.json --tolerance 0.2
+    python -m benchmarks.bench --error-rate 0.01 --rate-limit-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from cmc_api import CoinMarketCap, AsyncCoinMarketCap, RateLimiter, Retry
+
+
+# Scenarios are (method, parameters of call i).
+scenarios = {
+    'quotes': ('quotes', lambda i: {'id': i % 5000 + 1}),
+    'quotes_100': ('quotes', lambda i: {'id': list(range(1, 101))}),
+    'listings': ('listings', lambda i: {'limit': 100}),
+    'historical': ('historical_quotes',
+                   lambda i: {'id': i % 100 + 1, 'count': 100}),
+    'market_pairs': ('market_pairs', lambda i: {'id': i % 100 + 1}),
+}
+modes = ('sync', 'threads', 'async')
+
+
+def start_server(latency=0, error_rate=0, rate_limit_rate=0):
+    """Start a MockServer process and return (process, url)."""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'cmc_api.mock', '--latency', str(latency),
+         '--error-rate', str(error_rate),
+         '--rate-limit-rate', str(rate_limit_rate), '--seed', '0'],
+        stdout=subprocess.PIPE, universal_newlines=True)
+    return process, process.stdout.readline().strip()
+
+
+def client_options(error_rate=0, rate_limit_rate=0):
+    """Keyword arguments of clients recovering from errors of the server."""
+    options = {}
+    if error_rate:
+        options['retry'] = Retry(backoff_factor=0.01)
+    if rate_limit_rate:
+        # Only HTTP 429 of the server holds requests back.
+        options['rate_limit'] = RateLimiter(10 ** 6, max_retries=10)
+    return options
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def _run_sync(url, method, parameters, calls, workers, options):
+    cmc = CoinMarketCap(root='sandbox', single_flight=False, pool_size=workers,
+                        **options)
+    cmc.BASE_URL = url
+    function = getattr(cmc, method)
+    latencies = []
+
+    def call(i):
+        start = time.perf_counter()
+        try:
+            function(**parameters(i))
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    if workers == 1:
+        for i in range(calls):
+            call(i)
+    else:
+        cmc.map_concurrent(call, [{'i': i} for i in range(calls)],
+                           max_workers=workers)
+    return latencies
+
+
+def _run_async(url, method, parameters, calls, workers, options):
+    latencies = []
+
+    async def main():
+        async with AsyncCoinMarketCap(root='sandbox', limit=workers,
+                                      single_flight=False, **options) as cmc:
+            cmc.BASE_URL = url
+            function = getattr(cmc, method)
+            semaphore = asyncio.Semaphore(workers)
+
+            async def call(i):
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        await function(**parameters(i))
+                    finally:
+                        latencies.append(time.perf_counter() - start)
+            await asyncio.gather(*[call(i) for i in range(calls)])
+    asyncio.run(main())
+    return latencies
+
+
+def run(url, scenario, mode, calls=200, workers=8, error_rate=0,
+        rate_limit_rate=0):
+    """
+    Run calls of a scenario and measure the client.
+
+    Parameters
+    ----------
+    url: str
+        Base url of the mock server.
+    scenario: str
+        Key of scenarios.
+    mode: {'sync', 'threads', 'async'}
+        Sequential calls, calls on workers threads,
+        or workers concurrent coroutines.
+    calls: int, default 200
+    workers: int, default 8
+    error_rate, rate_limit_rate: float, default 0
+        Rates of HTTP 500 and 429 of the server, which the client
+        then retries.
+
+    Returns
+    -------
+    result: dict
+        throughput (calls per second), p50 and p99 latency in ms,
+        cpu_ms per call and peak_kb of traced Python memory.
+    """
+    method, parameters = scenarios[scenario]
+    runner = _run_async if mode == 'async' else _run_sync
+    workers = 1 if mode == 'sync' else workers
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    latencies = runner(url, method, parameters, calls, workers,
+                       client_options(error_rate, rate_limit_rate))
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    # Tracing slows Python down, so memory is measured in its own run.
+    tracemalloc.start()
+    runner(url, method, parameters, max(calls // 10, 10), workers,
+           client_options(error_rate, rate_limit_rate))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'throughput': calls / wall,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'cpu_ms': cpu / calls * 1000,
+        'peak_kb': peak / 1024.,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Get the (name, metric, old, new) that got worse than tolerance."""
+    worse = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for metric, value in result.items():
+            higher_is_better = metric == 'throughput'
+            change = (old[metric] - value if higher_is_better
+                      else value - old[metric])
+            if change > tolerance * old[metric]:
+                worse.append((name, metric, old[metric], value))
+    return worse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scenarios', nargs='+', default=list(scenarios),
+                        choices=list(scenarios))
+    parser.add_argument('--modes', nargs='+', default=list(modes),
+                        choices=modes)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='Share of requests answered with HTTP 500.')
+    parser.add_argument('--rate-limit-rate', type=float, default=0,
+                        help='Share of requests answered with HTTP 429.')
+    parser.add_argument('--save', help='Save results as json.')
+    parser.add_argument('--compare', help='Json of earlier results.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative regression, default 0.2.')
+    args = parser.parse_args(argv)
+
+    process, url = start_server(args.latency, args.error_rate,
+                                args.rate_limit_rate)
+    results = {}
+    try:
+        print('{:<24}{:>12}{:>10}{:>10}{:>10}{:>10}'.format(
+            'benchmark', 'calls/s', 'p50 ms', 'p99 ms', 'cpu ms', 'peak kB'))
+        for scenario in args.scenarios:
+            for mode in args.modes:
+                name = '{}-{}'.format(scenario, mode)
+                result = results[name] = run(
+                    url, scenario, mode, args.calls, args.workers,
+                    args.error_rate, args.rate_limit_rate)
+                print('{:<24}{throughput:>12.1f}{p50_ms:>10.2f}{p99_ms:>10.2f}'
+                      '{cpu_ms:>10.3f}{peak_kb:>10.1f}'.format(name, **result))
+    finally:
+        process.terminate()
+        process.wait()
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            worse = compare(results, json.load(f), args.tolerance)
+        for name, metric, old, new in worse:
+            print('Regression in {} {}: {:.3f} -> {:.3f}'.format(
+                name, metric, old, new))
+        return 1 if worse else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,4 +5,20 @@ __repo__ = 'https://github.com/bizzyvinci/cmc-api'
 __license__ = 'MIT'
 
 from .coinmarketcap import CoinMarketCap
+from .aio import AsyncCoinMarketCap
+from .budget import CreditBudget, estimate_credits
+from .cache import MemoryCache, SQLiteCache
+from .coalesce import Coalescer
+from .decoders import RawResponse, StreamDecoder
 from .exceptions import *
+from .index import SymbolIndex
+from .keys import KeyPool
+from .metrics import Metrics
+from .ratelimit import RateLimiter
+from .rates import RateTable, Conversion
+from .records import Record, Listing, Quote, OHLCV, MarketPair
+from .replay import Tape
+from .retry import Retry, CircuitBreaker
+from .shared import SharedState, SharedRateLimiter
+from .store import HistoryStore
+from .watch import Change, Watcher
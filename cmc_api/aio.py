@@ -0,0 +1,464 @@
+import asyncio
+import time
+from collections import namedtuple
+from .budget import estimate_credits
+from .cache import cache_key, get_ttl
+from .coinmarketcap import CoinMarketCap, logger, _pending_key
+from .decoders import RawResponse, StreamDecoder
+from .ratelimit import retry_after
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# A response whose body is still to be read from the aiohttp response.
+_Streamed = namedtuple('_Streamed', ['status_code', 'response', 'headers'])
+
+
+class AsyncCoinMarketCap(CoinMarketCap):
+    """
+    An asyncio version of CoinMarketCap.
+
+    Every method of CoinMarketCap is available and returns a coroutine,
+    so it has to be awaited. The iter_* methods return async generators,
+    and so do the coroutines of methods called with stream=True.
+    Requests are sent through one pooled aiohttp connection, which
+    allows thousands of calls to run concurrently from a single event
+    loop.
+
+    Parameters
+    ----------
+    api_key: str, default os.getenv('CMC_PRO_API_KEY')
+        API key to use with pro-api
+    root: str, default 'pro'
+        The root of api e.g 'pro' for `pro-api`
+        and 'sandbox' for `sandox-api`
+    limit: int, default 100
+        Maximum number of simultaneous connections in the pool.
+        0 means no limit.
+    cache: bool or cache object, optional
+        See CoinMarketCap.
+    cache_ttl: dict, optional
+        See CoinMarketCap.
+    rate_limit: int or RateLimiter, optional
+        See CoinMarketCap. Waiting is done with asyncio.sleep.
+    single_flight: bool, default True
+        Share one request between coroutines asking for the same url
+        and parameters at the same time. See CoinMarketCap.
+    json_decoder: {'orjson', 'ujson', 'json'} or callable, optional
+        See CoinMarketCap.
+    timeout, retry, circuit_breaker, metrics, budget, tape: optional
+        See CoinMarketCap.
+    shared: SharedState, optional
+        See CoinMarketCap. Its cache and rate limit are shared, while
+        calls in flight are only shared within the event loop.
+
+    Returns
+    -------
+    object
+
+    Examples
+    --------
+    >>> async with AsyncCoinMarketCap(root='sandbox') as cmc:
+    ...     quotes, pairs = await asyncio.gather(
+    ...         cmc.quotes(id=[1, 2]), cmc.market_pairs(id=1))
+    """
+
+    def __init__(self, api_key=None, root='pro', limit=100, cache=None,
+                 cache_ttl=None, rate_limit=None, single_flight=True,
+                 json_decoder=None, timeout=(10, 30), retry=None,
+                 circuit_breaker=None, metrics=None, budget=None,
+                 tape=None, shared=None):
+        if aiohttp is None:
+            raise ImportError(
+                'aiohttp is required for AsyncCoinMarketCap. '
+                'Install it with `pip install cmc-api[async]`.')
+        super().__init__(api_key, root, cache, cache_ttl, rate_limit,
+                         single_flight=single_flight,
+                         json_decoder=json_decoder, timeout=timeout,
+                         retry=retry, circuit_breaker=circuit_breaker,
+                         metrics=metrics, budget=budget, tape=tape,
+                         shared=shared)
+        self.limit = limit
+        self._in_flight = {}
+
+    @staticmethod
+    def _init_session(api_key, *args):
+        """The aiohttp session is created lazily inside the event loop."""
+        return None
+
+    def _get_session(self):
+        """Get the pooled aiohttp session, creating it if needed."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit)
+            self.session = aiohttp.ClientSession(
+                connector=connector, headers=self._headers(self.api_key))
+        return self.session
+
+    async def _get_url(self, url, parameters={}):
+        """Get Response.json()['data'], from cache if it is fresh."""
+        if parameters.get('raw'):
+            parameters = {k: v for k, v in parameters.items()
+                          if k not in ('raw', '_records', '_fresh')}
+            return await self._request_raw(url, parameters)
+        if parameters.get('stream'):
+            parameters = {k: v for k, v in parameters.items()
+                          if k not in ('stream', '_records', '_fresh')}
+            return self._request_stream(url, parameters)
+        fresh = parameters.get('_fresh')
+        if fresh:
+            # Sent even if cached, e.g for polls, and cached again.
+            parameters = {k: v for k, v in parameters.items()
+                          if k != '_fresh'}
+        key = cache_key(url, parameters)
+        if self.cache is not None and not fresh:
+            data = self.cache.get(key)
+            if data is not None:
+                return self._wrap_records(data, parameters)
+        if self.budget is not None:
+            fitted = self.budget.fit(url, parameters)
+            if fitted is not parameters:
+                if fresh:
+                    fitted = dict(fitted, _fresh=True)
+                return await self._get_url(url, fitted)
+        if self.single_flight is None:
+            return await self._fetch(url, parameters, key)
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, parameters, key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url, parameters, key):
+        """Request url and store the data in cache."""
+        data = await self._request(url, parameters)
+        if self.cache is not None:
+            ttl = get_ttl(url, self.cache_ttl)
+            if ttl > 0:
+                self.cache.set(key, self._unwrap_records(data, parameters),
+                               ttl)
+        return data
+
+    def _client_timeout(self):
+        """Convert timeout into aiohttp.ClientTimeout."""
+        if isinstance(self.timeout, (tuple, list)):
+            connect, read = self.timeout
+            return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=self.timeout)
+
+    async def _send(self, url, parameters, stream=False):
+        """
+        Send the request and return it as a RawResponse.
+
+        Async version of CoinMarketCap._send.
+        """
+        # aiohttp only accepts str, int and float in query strings.
+        parameters = {key: str(value) if isinstance(value, bool) else value
+                      for key, value in parameters.items()}
+        session = self._get_session()
+        timeout = self._client_timeout()
+        limiter = self.rate_limiter
+        retry = self.retry
+        breaker = self.circuit_breaker
+        pool = self.key_pool
+        throttled = attempt = rotated = 0
+        while True:
+            if breaker is not None:
+                breaker.before(url)
+            try:
+                if limiter is not None:
+                    await asyncio.sleep(limiter.reserve())
+                response = await self._get(session, url, parameters, timeout,
+                                           stream)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if breaker is not None:
+                    breaker.failure(url)
+                if retry is None or attempt >= retry.total:
+                    raise
+                await asyncio.sleep(retry.backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # Give back the trial request without counting a failure,
+                # e.g when the task is cancelled.
+                if breaker is not None:
+                    breaker.release(url)
+                raise
+            status = response.status_code
+            failed = status >= 500
+            if breaker is not None:
+                if failed:
+                    breaker.failure(url)
+                else:
+                    breaker.success(url)
+            if (pool is not None and status in (401, 402, 429)
+                    and rotated < len(pool) and pool.healthy):
+                if stream:
+                    self._close(response)
+                rotated += 1
+                continue
+            if (limiter is not None and status == 429
+                    and throttled < limiter.max_retries):
+                if stream:
+                    self._close(response)
+                limiter.pause(retry_after(response.headers))
+                throttled += 1
+                continue
+            if (failed and retry is not None and status in retry.statuses
+                    and attempt < retry.total):
+                if stream:
+                    self._close(response)
+                await asyncio.sleep(retry.backoff(attempt))
+                attempt += 1
+                continue
+            return response
+
+    @staticmethod
+    def _close(response):
+        """Release the connection of a streamed response."""
+        response.response.release()
+
+    async def _reserve_key(self, url, parameters):
+        """Async version of CoinMarketCap._reserve_key."""
+        credits = estimate_credits(url, parameters)
+        while True:
+            key, wait = self.key_pool.reserve(credits)
+            if key is not None:
+                return key, credits
+            await asyncio.sleep(wait)
+
+    async def _get(self, session, url, parameters, timeout, stream=False):
+        """
+        Send one GET request, with a key of the pool if any.
+
+        With stream, the body is left unread in the returned _Streamed.
+        """
+        pool = self.key_pool
+        headers = None
+        if pool is not None:
+            key, credits = await self._reserve_key(url, parameters)
+            headers = {'X-CMC_PRO_API_KEY': key}
+        try:
+            if stream:
+                response = await session.get(url, params=parameters,
+                                             timeout=timeout, headers=headers)
+            else:
+                async with session.get(url, params=parameters,
+                                       timeout=timeout,
+                                       headers=headers) as response:
+                    content = await response.read()
+        except BaseException:
+            if pool is not None:
+                pool.release(key)
+            raise
+        if stream:
+            response = _Streamed(response.status, response, response.headers)
+        else:
+            response = RawResponse(response.status, content, response.headers)
+        if pool is not None:
+            self._release_key(key, credits, response)
+        return response
+
+    async def _send_timed(self, url, parameters):
+        """Async version of CoinMarketCap._send_timed."""
+        if self.metrics is None:
+            return await self._send(url, parameters), None
+        start = time.perf_counter()
+        try:
+            return await self._send(url, parameters), start
+        except Exception:
+            self.metrics.record(url, 0, time.perf_counter() - start)
+            raise
+
+    async def _reserve_credits(self, url, parameters):
+        """Async version of CoinMarketCap._reserve_credits."""
+        budget = self.budget
+        if not url.endswith('/key/info') and budget.due():
+            try:
+                budget.reconcile(await self._request(
+                    self.BASE_URL + '/key/info', {}))
+            except Exception as e:
+                logger.warning('Could not reconcile credit budget: %r', e)
+        while True:
+            credits, wait = budget.reserve(url, parameters)
+            if not wait:
+                return credits
+            await asyncio.sleep(wait)
+
+    async def _send_budgeted(self, url, parameters):
+        """Async version of CoinMarketCap._send_budgeted."""
+        if self.budget is None:
+            return await self._send_timed(url, parameters) + (0,)
+        credits = await self._reserve_credits(url, parameters)
+        try:
+            return await self._send_timed(url, parameters) + (credits,)
+        except BaseException:
+            self.budget.charge(credits, 0)
+            raise
+
+    async def _transmit(self, url, parameters):
+        """Async version of CoinMarketCap._transmit."""
+        tape = self.tape
+        if tape is None:
+            return await self._send_budgeted(url, parameters)
+        response = tape.replay(url, parameters)
+        if response is not None:
+            return response, None, None
+        response, start, reserved = await self._send_budgeted(url, parameters)
+        tape.record(url, parameters, response)
+        return response, start, reserved
+
+    async def _request(self, url, parameters):
+        """Send the request and return Response.json()['data']."""
+        parameters, records = self._split_records(parameters)
+        response, start, reserved = await self._transmit(url, parameters)
+        try:
+            res = self._decode(url, response.status_code, response.content,
+                               start, records)
+        except Exception:
+            self._consume(None, reserved)
+            raise
+        self._consume(res, reserved)
+        return self._parse_response(response.status_code, res)
+
+    async def _request_raw(self, url, parameters):
+        """Send the request and return the undecoded RawResponse."""
+        response, start, reserved = await self._transmit(url, parameters)
+        _pending_key.set(None)
+        if self.budget is not None and reserved is not None:
+            self.budget.charge(reserved, reserved)
+        if start is not None:
+            self.metrics.record(url, response.status_code,
+                                time.perf_counter() - start,
+                                len(response.content))
+        return response
+
+    async def _request_stream(self, url, parameters):
+        """Async version of CoinMarketCap._request_stream."""
+        decoder = StreamDecoder(self._stream_path(url))
+        response = None
+        if self.tape is not None:
+            response = self.tape.replay(url, parameters)
+        if response is not None:
+            for record in self._replay_stream(decoder, response):
+                yield record
+            return
+        reserved = 0
+        if self.budget is not None:
+            reserved = await self._reserve_credits(url, parameters)
+        start = time.perf_counter()
+        try:
+            response = await self._send(url, parameters, stream=True)
+        except BaseException:
+            if self.budget is not None:
+                self.budget.charge(reserved, 0)
+            if self.metrics is not None:
+                self.metrics.record(url, 0, time.perf_counter() - start)
+            raise
+        res = None
+        status_code = response.status_code
+        try:
+            if status_code != 200:
+                res = self.json_decoder(await response.response.read())
+                self._parse_response(status_code, res)
+            async for chunk in response.response.content.iter_chunked(
+                    self.chunk_size):
+                for record in decoder.feed(chunk):
+                    yield record
+            for record in decoder.close():
+                yield record
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                asyncio.TimeoutError):
+            # _send took the response as a success, before its body.
+            status_code = 0
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.failure(url)
+            raise
+        finally:
+            self._close(response)
+            self._end_stream(url, status_code, decoder, res, reserved, start)
+
+    def _get_history(self, kind, url, parameters, split=False):
+        """HistoryStore is synchronous, so requests always go to the api."""
+        if split:
+            return self._get_split(kind, url, parameters)
+        return self._get_url(url, parameters)
+
+    async def _then(self, data, function, *args):
+        """Apply function to data once the request is done."""
+        return function(await data, *args)
+
+    async def _get_batched(self, url, parameters):
+        """Async version of CoinMarketCap._get_batched."""
+        batches = self._split_batches(parameters)
+        if (len(batches) == 1 or parameters.get('raw')
+                or parameters.get('stream')):
+            return await self._get_url(url, parameters)
+        return self._merge_batches(batches,
+                                   await self._get_many(url, batches))
+
+    async def _get_many(self, url, batches):
+        """Async version of CoinMarketCap._get_many."""
+        return await asyncio.gather(
+            *[self._get_url(url, batch) for batch in batches],
+            return_exceptions=True)
+
+    async def _get_split(self, kind, url, parameters):
+        """Async version of CoinMarketCap._get_split."""
+        batches, merge = self._plan_split(kind, parameters)
+        if len(batches) == 1 and kind != 'listings':
+            return await self._get_url(url, parameters)
+        return self._merge_windows(batches,
+                                   await self._get_many(url, batches), merge)
+
+    async def _paginate(self, function, cat, page_size, parameters,
+                        extract=None):
+        """Async version of CoinMarketCap._paginate, prefetching in a task."""
+        start = int(parameters.pop('start', 1))
+        parameters['limit'] = page_size
+
+        async def fetch(start):
+            data = await function(cat, start=start, **parameters)
+            return extract(data) if extract else data
+
+        task = asyncio.ensure_future(fetch(start))
+        try:
+            while task is not None:
+                records = await task
+                start += page_size
+                if len(records) < page_size:
+                    task = None
+                else:
+                    task = asyncio.ensure_future(fetch(start))
+                for record in records:
+                    yield record
+                del records
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def _watch(self, function, watcher, parameters, max_polls,
+                     min_interval):
+        """Async version of CoinMarketCap._watch."""
+        polls = 0
+        while True:
+            for change in watcher.update(await function(**parameters)):
+                yield change
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                return
+            await asyncio.sleep(watcher.wait(min_interval))
+
+    async def close(self):
+        """Close the underlying connection pool."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,306 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+from .exceptions import BudgetExceededException
+from .ranges import interval_seconds
+from .times import to_timestamp
+
+
+# Records returned for one credit, matched against the end of the url
+# path. Everything else is charged per 100 records.
+_records_per_credit = {
+    '/map': 5000,
+}
+# Records returned when the request has no limit, id, symbol or slug.
+_default_records = {
+    '/map': 5000,
+    '/listings/latest': 100,
+    '/listings/historical': 100,
+    '/market-pairs/latest': 100,
+}
+_free = ('/key/info',)
+_batch_keys = ('id', 'symbol', 'slug')
+_windows = ('daily', 'monthly')
+
+
+def _count(value):
+    return len(str(value).split(','))
+
+
+def _match(path, table, default):
+    matches = [suffix for suffix in table if path.endswith(suffix)]
+    if not matches:
+        return default
+    return table[max(matches, key=len)]
+
+
+def estimate_credits(url, parameters):
+    """
+    Estimate the credits a request costs before sending it.
+
+    coinmarketcap charges one credit per 100 records returned (5000
+    for map), one credit per 100 data points of historical endpoints,
+    and one credit per convert option beyond the first.
+
+    Parameters
+    ----------
+    url: str
+    parameters: dict
+        Parameters of the request.
+
+    Returns
+    -------
+    credits: int
+    """
+    path = urlparse(url).path
+    if path.endswith(_free):
+        return 0
+    converts = 0
+    for key in ('convert', 'convert_id'):
+        if key in parameters:
+            converts += _count(parameters[key])
+    extra = max(converts - 1, 0)
+    assets = max([_count(parameters[key]) for key in _batch_keys
+                  if key in parameters] or [0])
+    if path.endswith('/historical') and '/listings/' not in path:
+        if 'time_start' in parameters and 'time_end' in parameters:
+            kind = 'ohlcv' if '/ohlcv/' in path else 'quotes'
+            interval = parameters.get(
+                'interval', {'quotes': '5m', 'ohlcv': 'daily'}[kind])
+            span = to_timestamp(parameters['time_end']) - \
+                to_timestamp(parameters['time_start'])
+            points = int(span // interval_seconds(interval)) + 1
+        else:
+            points = int(parameters.get('count', 10))
+        return max(assets, 1) * math.ceil(points / 100.) + extra
+    records = assets or int(parameters.get(
+        'limit', _match(path, _default_records, 1)))
+    per_credit = _match(path, _records_per_credit, 100)
+    return max(math.ceil(records / float(per_credit)), 1) + extra
+
+
+def _next_reset(window, now):
+    """Next UTC midnight, or first day of next month at UTC midnight."""
+    dt = datetime.fromtimestamp(now, timezone.utc)
+    if window == 'daily':
+        dt = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+        return dt.timestamp() + 24 * 60 * 60
+    if dt.month == 12:
+        dt = datetime(dt.year + 1, 1, 1, tzinfo=timezone.utc)
+    else:
+        dt = datetime(dt.year, dt.month + 1, 1, tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class CreditBudget:
+    """
+    Daily and monthly credit budgets of an API key.
+
+    The cost of each call is estimated before it is sent, and corrected
+    with status.credit_count of its response. Local counts are
+    reconciled with the usage reported by key_info every
+    reconcile_every seconds.
+
+    Parameters
+    ----------
+    daily: int, optional
+        Maximum credits per day. Defaults to credit_limit_daily
+        of the plan once reconciled.
+    monthly: int, optional
+        Maximum credits per month. Defaults to credit_limit_monthly
+        of the plan once reconciled.
+    on_exceed: {'raise', 'defer', 'downgrade'}, default 'raise'
+        What to do with a call that would exceed the budget.
+        'raise' raises BudgetExceededException. 'defer' waits until
+        the budget resets. 'downgrade' drops convert options beyond
+        the first and lowers limit so that the call fits, and raises
+        if it still does not.
+    max_wait: float, optional
+        With on_exceed='defer', raise instead of waiting longer
+        than max_wait seconds.
+    reconcile_every: float, default 300
+        Seconds between reconciliations with key_info.
+        None never reconciles.
+
+    Examples
+    --------
+    >>> budget = CreditBudget(daily=300, on_exceed='downgrade')
+    >>> cmc = CoinMarketCap(budget=budget)
+    >>> budget.remaining('daily')
+    """
+
+    def __init__(self, daily=None, monthly=None, on_exceed='raise',
+                 max_wait=None, reconcile_every=300):
+        if on_exceed not in ('raise', 'defer', 'downgrade'):
+            raise ValueError(
+                "Invalid on_exceed ({}) provided. "
+                "Valid options are: {{raise,defer,downgrade}}".format(
+                    on_exceed))
+        self.limits = {'daily': daily, 'monthly': monthly}
+        self.on_exceed = on_exceed
+        self.max_wait = max_wait
+        self.reconcile_every = reconcile_every
+        self.plan = {}
+        now = time.time()
+        self._used = {window: 0 for window in _windows}
+        self._resets = {window: _next_reset(window, now)
+                        for window in _windows}
+        self._pending = 0
+        self._reconciled = None
+        self._lock = threading.Lock()
+
+    def _roll(self, now):
+        for window in _windows:
+            if now >= self._resets[window]:
+                self._used[window] = 0
+                self._resets[window] = _next_reset(window, now)
+
+    def limit(self, window):
+        """Credits allowed per window, None if unlimited."""
+        limit = self.limits[window]
+        if limit is None:
+            limit = self.plan.get('credit_limit_' + window)
+        return limit
+
+    def used(self, window):
+        """Credits used in the current window, including calls in flight."""
+        with self._lock:
+            self._roll(time.time())
+            return self._used[window]
+
+    def remaining(self, window):
+        """Credits left in the current window, None if unlimited."""
+        limit = self.limit(window)
+        if limit is None:
+            return None
+        return max(limit - self.used(window), 0)
+
+    def _exceeded(self, credits):
+        """Windows that credits more would exceed."""
+        return [window for window in _windows
+                if self.limit(window) is not None
+                and self._used[window] + credits > self.limit(window)]
+
+    def fit(self, url, parameters):
+        """
+        Downgrade parameters so that the call fits in the budget.
+
+        parameters is returned unchanged if it fits or if on_exceed is
+        not 'downgrade'.
+        """
+        if self.on_exceed != 'downgrade':
+            return parameters
+        credits = estimate_credits(url, parameters)
+        with self._lock:
+            self._roll(time.time())
+            if not self._exceeded(credits):
+                return parameters
+            left = min(self.limit(window) - self._used[window]
+                       for window in _windows
+                       if self.limit(window) is not None)
+        downgraded = dict(parameters)
+        for key in ('convert', 'convert_id'):
+            if key in downgraded:
+                if _count(downgraded[key]) > 1:
+                    downgraded[key] = str(downgraded[key]).split(',')[0]
+                downgraded.pop('convert_id' if key == 'convert' else
+                               'convert', None)
+                break
+        path = urlparse(url).path
+        if left > 0 and not any(key in downgraded for key in _batch_keys) \
+                and ('limit' in downgraded
+                     or _match(path, _default_records, None)):
+            limit = left * _match(path, _records_per_credit, 100)
+            if limit < int(downgraded.get(
+                    'limit', _match(path, _default_records, limit))):
+                downgraded['limit'] = limit
+        # Returning the same object tells the caller nothing more can be done.
+        return parameters if downgraded == parameters else downgraded
+
+    def reserve(self, url, parameters):
+        """
+        Reserve the estimated credits of a call.
+
+        Returns
+        -------
+        credits, wait: int, float
+            The estimated credits, which must be given back to charge,
+            and the seconds to wait before trying again when the call
+            is deferred. Nothing is reserved when wait is not 0.
+
+        Raises
+        ------
+        BudgetExceededException
+            If the call does not fit in the budget and is not deferred.
+        """
+        credits = estimate_credits(url, parameters)
+        with self._lock:
+            now = time.time()
+            self._roll(now)
+            # Free calls such as key_info are always let through.
+            exceeded = self._exceeded(credits) if credits else []
+            if not exceeded:
+                for window in _windows:
+                    self._used[window] += credits
+                self._pending += credits
+                return credits, 0
+            wait = max(self._resets[window] for window in exceeded) - now
+        if self.on_exceed == 'defer' and (self.max_wait is None
+                                          or wait <= self.max_wait):
+            return credits, max(wait, 0.001)
+        raise BudgetExceededException(
+            '{} credit(s) would exceed the {} budget of {}.'.format(
+                credits, ' and '.join(exceeded),
+                ', '.join(str(self.limit(w)) for w in exceeded)))
+
+    def charge(self, reserved, credits):
+        """Replace reserved credits with the credits actually used."""
+        with self._lock:
+            self._pending -= reserved
+            for window in _windows:
+                self._used[window] = max(
+                    self._used[window] + credits - reserved, 0)
+
+    def due(self):
+        """
+        Check if the budget should be reconciled with key_info.
+
+        A True answer is given to one caller only, which is
+        expected to call reconcile.
+        """
+        if self.reconcile_every is None:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if (self._reconciled is not None and
+                    now - self._reconciled < self.reconcile_every):
+                return False
+            self._reconciled = now
+            return True
+
+    def reconcile(self, key_info):
+        """
+        Replace local counts with the usage reported by the server.
+
+        Parameters
+        ----------
+        key_info: dict
+            Data of CoinMarketCap.key_info().
+        """
+        plan = key_info.get('plan', {})
+        usage = key_info.get('usage', {})
+        with self._lock:
+            self._reconciled = time.monotonic()
+            self.plan = plan
+            for window, period in zip(_windows,
+                                      ('current_day', 'current_month')):
+                reset = plan.get('credit_limit_{}_reset_timestamp'.format(
+                    window))
+                if reset:
+                    self._resets[window] = to_timestamp(reset)
+                used = usage.get(period, {}).get('credits_used')
+                if used is not None:
+                    self._used[window] = used + self._pending
+            self._roll(time.time())
@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+
+# Default time-to-live in seconds, matched against the end of the url path.
+# The values follow how often coinmarketcap refreshes each endpoint.
+DEFAULT_TTLS = {
+    '/map': 24 * 60 * 60,
+    '/info': 24 * 60 * 60,
+    '/key/info': 60,
+    '/latest': 60,
+    '/historical': 60 * 60,
+    '/price-conversion': 60,
+}
+
+
+def cache_key(url, parameters):
+    """Build a cache key from url and normalized parameters."""
+    items = sorted((str(k), str(v)) for k, v in parameters.items())
+    if not items:
+        return url
+    return '{}?{}'.format(url, urlencode(items))
+
+
+def get_ttl(url, ttls=DEFAULT_TTLS):
+    """Get time-to-live of url from the longest matching path suffix."""
+    url = url.split('?')[0]
+    matches = [suffix for suffix in ttls if url.endswith(suffix)]
+    if not matches:
+        return 0
+    return ttls[max(matches, key=len)]
+
+
+class MemoryCache:
+    """
+    An in-memory cache with time-to-live and LRU eviction.
+
+    Values are stored as they are, not copied, so every get of a key
+    returns the same object. Callers must not modify it, or copy it
+    first, as the change would show in every later hit.
+
+    Parameters
+    ----------
+    maxsize: int, default 1024
+        Maximum number of entries. The least recently used entry
+        is evicted when it is exceeded.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get value of key, or None if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        """Store value under key for ttl seconds."""
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    An on-disk sqlite cache with time-to-live and LRU eviction.
+
+    Values are stored as json, so the cache survives restarts
+    and can be shared by processes on the same host.
+
+    Parameters
+    ----------
+    path: str
+        Path to the sqlite database file.
+    maxsize: int, default 10000
+        Maximum number of entries. The least recently used entry
+        is evicted when it is exceeded.
+    """
+
+    def __init__(self, path, maxsize=10000):
+        self.path = path
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, '
+            'value TEXT, expires REAL, accessed REAL)')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+
+    def get(self, key):
+        """Get value of key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires FROM cache WHERE key = ?',
+                (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                return None
+            self._conn.execute('UPDATE cache SET accessed = ? WHERE key = ?',
+                               (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        """Store value under key for ttl seconds."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now + ttl, now))
+            self._conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self.maxsize,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM cache')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM cache').fetchone()[0]
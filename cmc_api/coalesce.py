@@ -0,0 +1,101 @@
+import threading
+from collections.abc import Mapping
+from .exceptions import BadRequestException
+
+
+class _Group:
+    """Requests waiting to be sent together."""
+    def __init__(self):
+        self.values = {}
+        self.members = 0
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.data = None
+        self.error = None
+
+
+def _slice(data, key, values):
+    """Get the part of data requested with values of key."""
+    if key == 'id':
+        return {x: data[x] for x in values if x in data}
+    elif key == 'symbol':
+        symbols = [x.upper() for x in values]
+        return {x: data[x] for x in symbols if x in data}
+    else:
+        return {k: v for k, v in data.items()
+                if isinstance(v, Mapping) and v.get('slug') in values}
+
+
+class Coalescer:
+    """
+    Coalesce concurrent requests for single assets into one request.
+
+    Requests to the same url with the same parameters, apart from their
+    id, symbol or slug, are gathered for a short window and sent as one
+    multi-id request. Each caller gets its own slice of data.
+
+    Parameters
+    ----------
+    window: float, default 0.01
+        Seconds to wait for other requests before sending.
+    max_size: int, default 100
+        Send as soon as this many ids, symbols or slugs are gathered.
+    """
+    keys = ('id', 'symbol', 'slug')
+
+    def __init__(self, window=0.01, max_size=100):
+        self.window = window
+        self.max_size = max_size
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fetch, url, parameters):
+        """
+        Get fetch(url, parameters) through a shared request.
+
+        Requests without exactly one of id, symbol or slug
+        are sent straight away.
+        """
+        keys = [key for key in self.keys if key in parameters]
+        if len(keys) != 1:
+            return fetch(url, parameters)
+        key = keys[0]
+        values = str(parameters[key]).split(',')
+        others = tuple(sorted((k, str(v)) for k, v in parameters.items()
+                              if k != key))
+        group_key = (url, key, others)
+
+        with self._lock:
+            group = self._groups.get(group_key)
+            leader = group is None
+            if leader:
+                group = self._groups[group_key] = _Group()
+            group.members += 1
+            group.values.update(dict.fromkeys(values))
+            if len(group.values) >= self.max_size:
+                del self._groups[group_key]
+                group.full.set()
+
+        if leader:
+            group.full.wait(self.window)
+            with self._lock:
+                if self._groups.get(group_key) is group:
+                    del self._groups[group_key]
+            combined = dict(others)
+            combined[key] = ','.join(group.values)
+            try:
+                group.data = fetch(url, combined)
+            except Exception as e:
+                group.error = e
+            group.done.set()
+        else:
+            group.done.wait()
+
+        if group.error is not None:
+            if (isinstance(group.error, BadRequestException)
+                    and group.members > 1):
+                # One invalid value fails the whole request,
+                # so every caller retries on its own.
+                return fetch(url, parameters)
+            raise group.error
+        return _slice(group.data, key, values)
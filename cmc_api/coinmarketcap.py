@@ -1,9 +1,35 @@
+import contextvars
 import functools
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 from requests import Session
+from requests.exceptions import ChunkedEncodingError, ConnectionError, Timeout
+from requests.adapters import HTTPAdapter
+from .budget import estimate_credits
+from .cache import MemoryCache, cache_key, get_ttl, DEFAULT_TTLS
+from .coalesce import Coalescer
+from .decoders import RawResponse, StreamDecoder, get_decoder
+from .endpoints import ENDPOINTS
 from .exceptions import *
+from .frames import listings_frame, quotes_frame, historical_frame
+from .keys import KeyPool
+from .metrics import Metrics
+from .ranges import (plan_windows, plan_dates, window_parameters,
+                     merge_history, merge_listings)
+from .ratelimit import RateLimiter, credit_count, retry_after
+from .records import decode_records, unwrap_records, wrap_records
+from .retry import Retry, CircuitBreaker
+from .singleflight import SingleFlight
+from .watch import Watcher
+
+logger = logging.getLogger(__name__)
+# Key of the pool and credits reserved for the last response of the
+# current thread or task, until _consume charges its credit_count.
+_pending_key = contextvars.ContextVar('pending_key', default=None)
 
 
 def parse_param(key, value):
@@ -42,28 +68,143 @@ def parameters_parser(*excluded_parameters):
     return decorator
 
 
+def endpoint_method(name):
+    """
+    Generate the method of an endpoint without category from its spec
+    in ENDPOINTS.
+    """
+    endpoint = ENDPOINTS[name]
+
+    def method(self, **parameters):
+        url, parameters = self._prepare(name, None, parameters)
+        return getattr(self, endpoint.fetch)(url, parameters)
+    method.__name__ = name
+    method.__doc__ = endpoint.docstring()
+    return method
+
+
 class CoinMarketCap:
     """
     A class to initiate coinmarketcap api.
 
     Parameters
     ----------
-    api_key: str, default os.getenv('CMC_PRO_API_KEY')
-        API key to use with pro-api
+    api_key: str, list of str or KeyPool, default os.getenv('CMC_PRO_API_KEY')
+        API key to use with pro-api. Several keys are used as a
+        KeyPool, sending each request with the least loaded key.
     root: str, default 'pro'
         The root of api e.g 'pro' for `pro-api`
         and 'sandbox' for `sandox-api`
+    cache: bool or cache object, optional
+        Cache responses to avoid paying for duplicate requests.
+        True uses a MemoryCache, otherwise any object with
+        get(key) and set(key, value, ttl) e.g MemoryCache or SQLiteCache.
+        MemoryCache returns the same data to every hit, so data
+        must be copied before it is modified.
+    cache_ttl: dict, optional
+        Time-to-live in seconds by url path suffix,
+        e.g {'/quotes/latest': 30}. Updates DEFAULT_TTLS.
+    rate_limit: int or RateLimiter, optional
+        Calls per minute allowed by the plan, or a RateLimiter.
+        Requests are then queued to stay within the limit, and
+        retried after the Retry-After delay on HTTP 429.
+    coalesce: float or Coalescer, optional
+        Window in seconds, or a Coalescer, used to gather concurrent
+        info and quotes requests for single assets into one request.
+    single_flight: bool, default True
+        Share one request between threads asking for the same url
+        and parameters at the same time. They all get the same data,
+        which must be copied before it is modified.
+    pool_size: int, default 10
+        Maximum number of connections kept alive for each session.
+        Threads wait for a free connection rather than opening new ones.
+    pool_strategy: {'shared', 'thread'}, default 'shared'
+        'shared' uses one session, and so one pool, for every thread.
+        'thread' gives each thread its own session and pool.
+    keep_alive: bool, default True
+        Keep connections open between requests.
+    json_decoder: {'orjson', 'ujson', 'json'} or callable, optional
+        Library, or function of bytes, used to decode responses.
+        The fastest installed library is used by default.
+    index: SymbolIndex, optional
+        Local index used by resolve=True to rewrite symbols
+        and slugs into ids before sending requests.
+    store: HistoryStore, optional
+        Local store answering historical_quotes and historical_ohlcv,
+        so that only missing time ranges are requested.
+    timeout: float or tuple, default (10, 30)
+        Seconds to wait for the server, as in requests, i.e
+        (connect timeout, read timeout). None waits forever.
+    retry: bool, int or Retry, optional
+        Retry server errors, timeouts and connection errors with
+        exponential backoff and jitter. True uses Retry(),
+        an int sets the number of retries.
+    circuit_breaker: bool or CircuitBreaker, optional
+        Fail fast with CircuitOpenException while an endpoint keeps
+        failing. True uses CircuitBreaker().
+    metrics: bool or Metrics, optional
+        Record latency, size, decode time, status and credits of
+        requests per endpoint. True uses Metrics().
+    budget: CreditBudget, optional
+        Daily and monthly credit budgets. Calls that would exceed them
+        are refused, deferred or downgraded before being sent.
+    tape: Tape, optional
+        Archive to record responses into and replay them from,
+        e.g for backtests and tests without network.
+    shared: SharedState, optional
+        Rate limit, cache and calls in flight shared with every
+        process using the same SharedState file. cache and
+        rate_limit, if given, are used instead of the shared ones.
 
     Returns
     -------
     object
 
+    Notes
+    -----
+    Every method takes raw=True to return a RawResponse holding the
+    status code, undecoded body and headers, e.g for forwarding the
+    payload without parsing it. Such requests bypass the cache.
+
+    Methods returning a list, e.g map and listings, also take
+    stream=True to return a generator of records decoded as the body
+    is downloaded, so that only one record is held in memory.
+    market_pairs then yields the items of data['market_pairs'].
+    Streamed requests bypass the cache and are not recorded to tape.
+    They are not retried once the body is being read, as records were
+    already yielded, but read errors count as failures in the circuit
+    breaker and metrics.
+
+    Parameters are checked against the specs of ENDPOINTS before
+    sending requests. Unknown parameters, invalid values and missing
+    required parameters raise InvalidParameterException, which is
+    both a BadRequestException and a ValueError.
+
     Attributes
     ----------
     CoinMarketCap.api_key: str
         API KEY.
     CoinMarketCap.session: requests.Session
-        Session used for requests.
+        Session used for requests, which is the session
+        of the current thread when pool_strategy is 'thread'.
+    CoinMarketCap.cache: cache object or None
+        Cache used for responses.
+    CoinMarketCap.rate_limiter: RateLimiter or None
+        Rate limiter shared by every request.
+    CoinMarketCap.budget: CreditBudget or None
+        Credit budget checked before every request.
+    CoinMarketCap.metrics: Metrics or None
+        Metrics of requests, e.g cmc.metrics.to_prometheus().
+    CoinMarketCap.batch_size: int, default 100
+        Maximum number of ids, symbols or slugs sent in one request.
+        Longer lists are split into batches sent in parallel.
+    CoinMarketCap.max_workers: int, default 8
+        Maximum number of batches sent at the same time.
+    CoinMarketCap.max_count: int, default 10000
+        Maximum number of quotes returned by one historical request,
+        used to split time ranges with split=True.
+    CoinMarketCap.chunk_size: int, default 65536
+        Number of bytes read at once by stream=True.
     """
     _categories = {
         'crypto': 'cryptocurrency',
@@ -72,10 +213,27 @@ class CoinMarketCap:
         'key': 'key',
         'global-metrics': 'global-metrics',
     }
+    _batch_keys = ('id', 'symbol', 'slug')
+    _default_intervals = {'quotes': '5m', 'ohlcv': 'daily'}
+    batch_size = 100
+    max_workers = 8
+    max_count = 10000
+    chunk_size = 65536
 
-    def __init__(self, api_key=None, root='pro'):
+    def __init__(self, api_key=None, root='pro', cache=None, cache_ttl=None,
+                 rate_limit=None, coalesce=None, single_flight=True,
+                 pool_size=10, pool_strategy='shared', keep_alive=True,
+                 json_decoder=None, index=None, store=None,
+                 timeout=(10, 30), retry=None, circuit_breaker=None,
+                 metrics=None, budget=None, tape=None, shared=None):
         self.BASE_URL = 'https://{}-api.coinmarketcap.com/v1'.format(root)
-        if root=='pro':
+        if isinstance(api_key, (list, tuple)):
+            api_key = KeyPool(api_key)
+        self.key_pool = None
+        if isinstance(api_key, KeyPool):
+            # Keys are sent with each request instead of the session.
+            self.key_pool, api_key = api_key, None
+        elif root=='pro':
             if api_key is None:
                 api_key = os.getenv('CMC_PRO_API_KEY')
             if not api_key:
@@ -84,21 +242,130 @@ class CoinMarketCap:
         else:
             api_key = 'b54bcf4d-1bca-4e8e-9a24-22ff2c3d462c'
         self.api_key = api_key
-        self.session = self._init_session(api_key)
+        if pool_strategy not in ('shared', 'thread'):
+            raise ValueError(
+                "Invalid pool_strategy ({}) provided. "
+                "Valid options are: {{shared,thread}}".format(pool_strategy))
+        self.pool_size = pool_size
+        self.pool_strategy = pool_strategy
+        self.keep_alive = keep_alive
+        self._local = threading.local()
+        self.session = self._init_session(api_key, pool_size, keep_alive)
+        if shared is not None:
+            if cache is None:
+                cache = shared.cache
+            if rate_limit is None:
+                rate_limit = shared.rate_limiter
+        if cache is True:
+            cache = MemoryCache()
+        elif cache is False:
+            cache = None
+        self.cache = cache
+        self.cache_ttl = dict(DEFAULT_TTLS, **(cache_ttl or {}))
+        if isinstance(rate_limit, int):
+            rate_limit = RateLimiter(rate_limit)
+        self.rate_limiter = rate_limit
+        if isinstance(coalesce, (int, float)):
+            coalesce = Coalescer(coalesce, self.batch_size)
+        self.coalescer = coalesce
+        if single_flight and shared is not None:
+            self.single_flight = shared.single_flight
+        else:
+            self.single_flight = SingleFlight() if single_flight else None
+        self.json_decoder = get_decoder(json_decoder)
+        self.index = index
+        self.store = store
+        self.timeout = timeout
+        if retry is True:
+            retry = Retry()
+        elif isinstance(retry, int) and retry is not False:
+            retry = Retry(total=retry)
+        self.retry = retry or None
+        if circuit_breaker is True:
+            circuit_breaker = CircuitBreaker()
+        self.circuit_breaker = circuit_breaker or None
+        if metrics is True:
+            metrics = Metrics()
+        self.metrics = metrics or None
+        self.budget = budget
+        self.tape = tape
 
     @staticmethod
-    def _init_session(api_key):
-        """Initialize session which would be used for requests."""
-        session = Session()
+    def _headers(api_key):
+        """Headers sent along with every request."""
         headers = {
             'Accepts': 'application/json',
             'Accept-Encoding': 'deflate, gzip',
         }
         if api_key is not None:
             headers['X-CMC_PRO_API_KEY'] = api_key
-        session.headers.update(headers)
+        return headers
+
+    @staticmethod
+    def _init_session(api_key, pool_size=10, keep_alive=True):
+        """Initialize session which would be used for requests."""
+        session = Session()
+        session.headers.update(CoinMarketCap._headers(api_key))
+        if not keep_alive:
+            session.headers['Connection'] = 'close'
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size, pool_block=True)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
         return session
 
+    @property
+    def session(self):
+        if self.pool_strategy == 'thread':
+            session = getattr(self._local, 'session', None)
+            if session is None:
+                session = self._local.session = self._init_session(
+                    self.api_key, self.pool_size, self.keep_alive)
+            return session
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def map_concurrent(self, method, parameters, max_workers=None,
+                       return_exceptions=False):
+        """
+        Call a method with many sets of parameters on a thread pool.
+
+        Parameters
+        ----------
+        method: str or callable
+            Name of the method e.g 'quotes', or the method itself.
+        parameters: iterable of dict
+            Keyword arguments of each call, e.g [{'id': 1}, {'id': 2}].
+        max_workers: int, default pool_size
+            Number of threads. It defaults to pool_size
+            so that every thread reuses a pooled connection.
+        return_exceptions: bool, default False
+            Return exceptions in place of results instead of raising
+            the first one.
+
+        Returns
+        -------
+        results: list
+            Results in the same order as parameters.
+        """
+        if isinstance(method, str):
+            method = getattr(self, method)
+
+        def call(kwargs):
+            try:
+                return method(**kwargs)
+            except Exception as e:
+                if return_exceptions:
+                    return e
+                raise
+
+        workers = max_workers or self.pool_size
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, parameters))
+
     def _insert_cat(self, text, cat, options=['crypto', 'exchange']):
         """Insert cat into text if in options."""
         if cat in options:
@@ -108,32 +375,611 @@ class CoinMarketCap:
                 "Invalid category ({}) provided. "
                 "Valid options are: {{{}}}".format(cat, ','.join(options)))
 
+    def _prepare(self, name, cat, parameters):
+        """
+        Get the url of an endpoint and the parameters of a request,
+        checked and encoded following ENDPOINTS.
+        """
+        path, parameters = ENDPOINTS[name].prepare(cat, parameters)
+        return self.BASE_URL + path, parameters
+
     def _get_url(self, url, parameters={}):
-        """Get Response.json()['data']."""
-        response = self.session.get(url, params=parameters)
-        res = response.json()
-        if response.status_code == 200:
+        """Get Response.json()['data'], from cache if it is fresh."""
+        if parameters.get('raw'):
+            parameters = {k: v for k, v in parameters.items()
+                          if k not in ('raw', '_records', '_fresh')}
+            return self._request_raw(url, parameters)
+        if parameters.get('stream'):
+            parameters = {k: v for k, v in parameters.items()
+                          if k not in ('stream', '_records', '_fresh')}
+            return self._request_stream(url, parameters)
+        fresh = parameters.get('_fresh')
+        if fresh:
+            # Sent even if cached, e.g for polls, and cached again.
+            parameters = {k: v for k, v in parameters.items()
+                          if k != '_fresh'}
+        key = cache_key(url, parameters)
+        if self.cache is not None and not fresh:
+            data = self.cache.get(key)
+            if data is not None:
+                return self._wrap_records(data, parameters)
+        if self.budget is not None:
+            fitted = self.budget.fit(url, parameters)
+            if fitted is not parameters:
+                if fresh:
+                    fitted = dict(fitted, _fresh=True)
+                return self._get_url(url, fitted)
+        if self.single_flight is None:
+            return self._fetch(url, parameters, key)
+        data = self.single_flight.do(key, self._fetch, url, parameters, key)
+        # Callers waiting on another process read the data from the cache.
+        return self._wrap_records(data, parameters)
+
+    def _fetch(self, url, parameters, key):
+        """Request url and store the data in cache."""
+        data = self._request(url, parameters)
+        if self.cache is not None:
+            ttl = get_ttl(url, self.cache_ttl)
+            if ttl > 0:
+                self.cache.set(key, self._unwrap_records(data, parameters),
+                               ttl)
+        return data
+
+    @staticmethod
+    def _wrap_records(data, parameters):
+        """Wrap records of data read from the cache, if they were asked."""
+        kind = parameters.get('_records')
+        return data if kind is None else wrap_records(data, kind)
+
+    @staticmethod
+    def _unwrap_records(data, parameters):
+        """
+        Get data to store in the cache. Records are stored as plain json,
+        so that caches serializing values to json can store them.
+        """
+        return data if '_records' not in parameters else unwrap_records(data)
+
+    def _send(self, url, parameters, stream=False):
+        """
+        Send the request and return the response.
+
+        The rate limiter, if any, is waited for and HTTP 429 is retried
+        after the Retry-After delay. Server and network errors are
+        retried following retry, and reported to the circuit breaker.
+        With a key pool, HTTP 401, 402 and 429 are retried with
+        another key. With stream, the body of the response is not read.
+        """
+        limiter = self.rate_limiter
+        retry = self.retry
+        breaker = self.circuit_breaker
+        pool = self.key_pool
+        throttled = attempt = rotated = 0
+        while True:
+            if breaker is not None:
+                breaker.before(url)
+            try:
+                if limiter is not None:
+                    limiter.acquire()
+                response = self._get(url, parameters, stream)
+            except (ConnectionError, Timeout):
+                if breaker is not None:
+                    breaker.failure(url)
+                if retry is None or attempt >= retry.total:
+                    raise
+                time.sleep(retry.backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # Errors of the client are not failures of the server,
+                # but the trial request the breaker may have let through
+                # is given back, or the circuit would stay open for good.
+                if breaker is not None:
+                    breaker.release(url)
+                raise
+            status = response.status_code
+            failed = status >= 500
+            if breaker is not None:
+                if failed:
+                    breaker.failure(url)
+                else:
+                    breaker.success(url)
+            if (pool is not None and status in (401, 402, 429)
+                    and rotated < len(pool) and pool.healthy):
+                if stream:
+                    self._close(response)
+                rotated += 1
+                continue
+            if (limiter is not None and status == 429
+                    and throttled < limiter.max_retries):
+                if stream:
+                    self._close(response)
+                limiter.pause(retry_after(response.headers))
+                throttled += 1
+                continue
+            if (failed and retry is not None and status in retry.statuses
+                    and attempt < retry.total):
+                if stream:
+                    self._close(response)
+                time.sleep(retry.backoff(attempt))
+                attempt += 1
+                continue
+            return response
+
+    @staticmethod
+    def _close(response):
+        """Release the connection of a streamed response."""
+        response.close()
+
+    def _reserve_key(self, url, parameters):
+        """
+        Wait for a key of the pool to be free and take it.
+
+        Returns
+        -------
+        key, credits: the key and the credits reserved for the call.
+        """
+        credits = estimate_credits(url, parameters)
+        while True:
+            key, wait = self.key_pool.reserve(credits)
+            if key is not None:
+                return key, credits
+            time.sleep(wait)
+
+    def _release_key(self, key, credits, response):
+        """
+        Give back a key of the pool after a response, keeping the
+        key until _consume charges it with the credit_count.
+        """
+        status = response.status_code
+        self.key_pool.release(key, status, response.headers)
+        if status in (401, 402, 429):
+            # The key was rejected, so no credits were used.
+            self.key_pool.charge(key, credits, 0)
+            _pending_key.set(None)
+        else:
+            _pending_key.set((key, credits))
+
+    def _get(self, url, parameters, stream=False):
+        """Send one GET request, with a key of the pool if any."""
+        pool = self.key_pool
+        if pool is None:
+            return self.session.get(url, params=parameters,
+                                    timeout=self.timeout, stream=stream)
+        key, credits = self._reserve_key(url, parameters)
+        try:
+            response = self.session.get(url, params=parameters,
+                                        timeout=self.timeout, stream=stream,
+                                        headers={'X-CMC_PRO_API_KEY': key})
+        except BaseException:
+            pool.release(key)
+            raise
+        self._release_key(key, credits, response)
+        return response
+
+    def _send_timed(self, url, parameters):
+        """
+        Send the request, timing it when metrics are enabled.
+
+        Returns
+        -------
+        response, start: start is None when metrics are disabled.
+        """
+        if self.metrics is None:
+            return self._send(url, parameters), None
+        start = time.perf_counter()
+        try:
+            return self._send(url, parameters), start
+        except Exception:
+            self.metrics.record(url, 0, time.perf_counter() - start)
+            raise
+
+    def _decode(self, url, status_code, content, start=None, records=None):
+        """
+        Decode content, recording the request in metrics if timed.
+
+        With records, the records of data are left undecoded.
+        """
+        decoder = self.json_decoder
+        if records is not None:
+            decoder = functools.partial(decode_records, kind=records,
+                                        loads=self.json_decoder)
+        if start is None:
+            return decoder(content)
+        received = time.perf_counter()
+        res = None
+        try:
+            res = decoder(content)
+            return res
+        finally:
+            self.metrics.record(url, status_code, received - start,
+                                len(content), time.perf_counter() - received,
+                                res)
+
+    def _reserve_credits(self, url, parameters):
+        """
+        Reserve the estimated credits of a request in the budget,
+        reconciling it with key_info first when it is due.
+        """
+        budget = self.budget
+        if not url.endswith('/key/info') and budget.due():
+            try:
+                budget.reconcile(self._request(self.BASE_URL + '/key/info',
+                                               {}))
+            except Exception as e:
+                logger.warning('Could not reconcile credit budget: %r', e)
+        while True:
+            credits, wait = budget.reserve(url, parameters)
+            if not wait:
+                return credits
+            time.sleep(wait)
+
+    def _send_budgeted(self, url, parameters):
+        """
+        Send the request within the budget, if any.
+
+        Returns
+        -------
+        response, start, credits: credits is the reserved estimate.
+        """
+        if self.budget is None:
+            return self._send_timed(url, parameters) + (0,)
+        credits = self._reserve_credits(url, parameters)
+        try:
+            return self._send_timed(url, parameters) + (credits,)
+        except Exception:
+            self.budget.charge(credits, 0)
+            raise
+
+    def _transmit(self, url, parameters):
+        """
+        Get the response of a request from the tape or the server.
+
+        Returns
+        -------
+        response, start, reserved: reserved is None for replayed
+            responses, which cost nothing.
+        """
+        tape = self.tape
+        if tape is None:
+            return self._send_budgeted(url, parameters)
+        response = tape.replay(url, parameters)
+        if response is not None:
+            return response, None, None
+        response, start, reserved = self._send_budgeted(url, parameters)
+        tape.record(url, parameters, response)
+        return response, start, reserved
+
+    def _consume(self, res, reserved):
+        """
+        Take the credits used by a response from limiter, budget and
+        the key of the pool it was sent with.
+        """
+        if reserved is None:
+            return
+        pending = _pending_key.get()
+        if pending is not None:
+            _pending_key.set(None)
+            key, credits = pending
+            self.key_pool.charge(key, credits, credit_count(res))
+        if self.rate_limiter is not None or self.budget is not None:
+            credits = credit_count(res)
+            if self.rate_limiter is not None:
+                self.rate_limiter.consume(credits)
+            if self.budget is not None:
+                self.budget.charge(reserved, credits)
+
+    @staticmethod
+    def _split_records(parameters):
+        """Take the kind of records asked by records=True out of parameters."""
+        records = parameters.get('_records')
+        if records is not None:
+            parameters = {k: v for k, v in parameters.items()
+                          if k != '_records'}
+        return parameters, records
+
+    def _request(self, url, parameters):
+        """Send the request and return Response.json()['data']."""
+        parameters, records = self._split_records(parameters)
+        response, start, reserved = self._transmit(url, parameters)
+        try:
+            res = self._decode(url, response.status_code, response.content,
+                               start, records)
+        except Exception:
+            self._consume(None, reserved)
+            raise
+        self._consume(res, reserved)
+        return self._parse_response(response.status_code, res)
+
+    def _request_raw(self, url, parameters):
+        """
+        Send the request and return the undecoded RawResponse.
+
+        The body is not decoded, so the budget and the key pool keep
+        the estimate.
+        """
+        response, start, reserved = self._transmit(url, parameters)
+        _pending_key.set(None)
+        if self.budget is not None and reserved is not None:
+            self.budget.charge(reserved, reserved)
+        if start is not None:
+            self.metrics.record(url, response.status_code,
+                                time.perf_counter() - start,
+                                len(response.content))
+        return RawResponse(response.status_code, response.content,
+                           response.headers)
+
+    @staticmethod
+    def _stream_path(url):
+        """Keys leading to the records streamed from url."""
+        if url.endswith('/market-pairs/latest'):
+            return ('data', 'market_pairs')
+        return ('data',)
+
+    def _replay_stream(self, decoder, response):
+        """Yield the records of a replayed response, chunk by chunk."""
+        content = response.content
+        if response.status_code != 200:
+            self._parse_response(response.status_code,
+                                 self.json_decoder(content))
+        for i in range(0, len(content), self.chunk_size):
+            for record in decoder.feed(content[i:i+self.chunk_size]):
+                yield record
+        for record in decoder.close():
+            yield record
+
+    def _end_stream(self, url, status_code, decoder, res, reserved, start):
+        """
+        Take the credits of a streamed response and record it in metrics.
+
+        status comes first in the body, so its credit_count is known
+        even when the stream was not read to the end.
+        """
+        if res is None and 'status' in decoder.fields:
+            res = {'status': decoder.fields['status']}
+        self._consume(res, reserved)
+        if self.metrics is not None:
+            self.metrics.record(url, status_code, time.perf_counter() - start,
+                                decoder.size, res=res)
+
+    def _request_stream(self, url, parameters):
+        """
+        Send the request and yield the records of data as they are decoded.
+
+        Only one chunk of the body and one record are held in memory,
+        and the first records are yielded before the body is complete.
+        Errors reading the body are not retried, and are recorded with
+        status 0.
+        """
+        decoder = StreamDecoder(self._stream_path(url))
+        response = None
+        if self.tape is not None:
+            response = self.tape.replay(url, parameters)
+        if response is not None:
+            for record in self._replay_stream(decoder, response):
+                yield record
+            return
+        reserved = 0
+        if self.budget is not None:
+            reserved = self._reserve_credits(url, parameters)
+        start = time.perf_counter()
+        try:
+            response = self._send(url, parameters, stream=True)
+        except Exception:
+            if self.budget is not None:
+                self.budget.charge(reserved, 0)
+            if self.metrics is not None:
+                self.metrics.record(url, 0, time.perf_counter() - start)
+            raise
+        res = None
+        status_code = response.status_code
+        try:
+            if status_code != 200:
+                res = self.json_decoder(response.content)
+                self._parse_response(status_code, res)
+            for chunk in response.iter_content(self.chunk_size):
+                for record in decoder.feed(chunk):
+                    yield record
+            for record in decoder.close():
+                yield record
+        except (ConnectionError, Timeout, ChunkedEncodingError):
+            # _send took the response as a success, before its body.
+            status_code = 0
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.failure(url)
+            raise
+        finally:
+            self._close(response)
+            self._end_stream(url, status_code, decoder, res, reserved, start)
+
+    def _resolve(self, cat, parameters):
+        """Rewrite symbol or slug in parameters to id with the index."""
+        if self.index is None:
+            raise ValueError('resolve=True requires an index. '
+                             'Pass a SymbolIndex as index.')
+        return self.index.resolve(parameters, cat)
+
+    def _get_history(self, kind, url, parameters, split=False):
+        """
+        Get historical data of url, from the store if it can serve it.
+
+        With split, long time ranges are fetched in parallel windows.
+        """
+        if split:
+            fetch = functools.partial(self._get_split, kind, url)
+        else:
+            fetch = functools.partial(self._get_url, url)
+        if self.store is None or not self.store.accepts(kind, parameters):
+            return fetch(parameters)
+        return self.store.get(kind, parameters, fetch)
+
+    def _plan_split(self, kind, parameters):
+        """
+        Get the parameters of each window of a historical request,
+        and the function merging their data.
+        """
+        if 'time_start' not in parameters or 'time_end' not in parameters:
+            raise ValueError('split=True requires time_start and time_end.')
+        if kind == 'listings':
+            others = {k: v for k, v in parameters.items()
+                      if k not in ('time_start', 'time_end', 'interval')}
+            dates = plan_dates(parameters['time_start'],
+                               parameters['time_end'],
+                               parameters.get('interval', 'daily'))
+            return [dict(others, date=x) for x in dates], merge_listings
+        interval = parameters.get('interval', self._default_intervals[kind])
+        windows = plan_windows(parameters['time_start'],
+                               parameters['time_end'], interval,
+                               self.max_count)
+        merge = functools.partial(merge_history, kind=kind)
+        return window_parameters(parameters, windows), merge
+
+    @staticmethod
+    def _merge_windows(batches, results, merge):
+        """Merge data of windows or raise BatchException."""
+        errors = [(batch, result) for batch, result in zip(batches, results)
+                  if isinstance(result, Exception)]
+        data = merge([result for result in results
+                      if not isinstance(result, Exception)])
+        if errors:
+            raise BatchException(errors, data)
+        return data
+
+    def _get_split(self, kind, url, parameters):
+        """Get historical data of url in parallel time windows."""
+        batches, merge = self._plan_split(kind, parameters)
+        if len(batches) == 1 and kind != 'listings':
+            return self._get_url(url, parameters)
+        return self._merge_windows(batches, self._get_many(url, batches),
+                                   merge)
+
+    def _then(self, data, function, *args):
+        """Apply function to data returned by a request."""
+        return function(data, *args)
+
+    def _split_batches(self, parameters):
+        """
+        Split parameters with a long id, symbol or slug list into batches.
+
+        Returns a list of parameters, one for each batch.
+        """
+        for key in self._batch_keys:
+            values = str(parameters.get(key, '')).split(',')
+            if len(values) > self.batch_size:
+                return [dict(parameters, **{key: ','.join(
+                            values[i:i+self.batch_size])})
+                        for i in range(0, len(values), self.batch_size)]
+        return [parameters]
+
+    @staticmethod
+    def _merge_batches(batches, results):
+        """Merge dict results of batches or raise BatchException."""
+        data, errors = {}, []
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                errors.append((batch, result))
+            else:
+                data.update(result)
+        if errors:
+            raise BatchException(errors, data)
+        return data
+
+    def _get_batched(self, url, parameters):
+        """
+        Get data of url, sending long id, symbol or slug lists
+        in parallel batches of batch_size and merging the results.
+        """
+        batches = self._split_batches(parameters)
+        if (len(batches) == 1 or parameters.get('raw')
+                or parameters.get('stream')):
+            return self._get_url(url, parameters)
+        return self._merge_batches(batches, self._get_many(url, batches))
+
+    def _get_many(self, url, batches):
+        """
+        Get data of url for each parameters in batches, in parallel.
+
+        Exceptions are returned in place of data.
+        """
+        def fetch(batch):
+            try:
+                return self._get_url(url, batch)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(fetch, batches))
+
+    @staticmethod
+    def _parse_response(status_code, res):
+        """Return res['data'] or raise the exception matching status_code."""
+        if status_code == 200:
             return res['data']
         else:
             error_message = res['status']['error_message']
-            if response.status_code == 400:
+            if status_code == 400:
                 raise BadRequestException(error_message)
-            elif response.status_code == 401:
+            elif status_code == 401:
                 raise UnauthorizedException(error_message)
-            elif response.status_code == 402:
+            elif status_code == 402:
                 raise PaymentRequiredException(error_message)
-            elif response.status_code == 403:
+            elif status_code == 403:
                 raise ForbiddenException(error_message)
-            elif response.status_code == 429:
+            elif status_code == 429:
                 raise TooManyRequestsException(error_message)
-            elif response.status_code == 500:
+            elif status_code == 500:
                 raise InternalServerErrorException(error_message)
             else:
                 error_message = "Unknown response error:{}:{}".format(
-                          response.status_code, error_message)
+                          status_code, error_message)
                 raise CMCAPIException(error_message)
 
-    @parameters_parser('cat')
+    def _get_coalesced(self, url, parameters):
+        """Get data of url through the coalescer, if any."""
+        if (self.coalescer is None or parameters.get('raw')
+                or parameters.get('stream')):
+            return self._get_batched(url, parameters)
+        return self.coalescer.submit(self._get_batched, url, parameters)
+
+    def _paginate(self, function, cat, page_size, parameters,
+                  extract=None):
+        """
+        Yield records of function page by page using start and limit.
+
+        The next page is fetched in a background thread while the
+        current one is consumed, and paging stops at the first page
+        that is not full.
+        """
+        start = int(parameters.pop('start', 1))
+        parameters['limit'] = page_size
+
+        def fetch(start):
+            data = function(cat, start=start, **parameters)
+            return extract(data) if extract else data
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(fetch, start)
+            while future is not None:
+                records = future.result()
+                start += page_size
+                if len(records) < page_size:
+                    future = None
+                else:
+                    future = executor.submit(fetch, start)
+                for record in records:
+                    yield record
+                del records
+
+    def _watch(self, function, watcher, parameters, max_polls, min_interval):
+        """Poll function when the server refreshes, yielding changes."""
+        polls = 0
+        while True:
+            for change in watcher.update(function(**parameters)):
+                yield change
+            polls += 1
+            if max_polls is not None and polls >= max_polls:
+                return
+            time.sleep(watcher.wait(min_interval))
+
     def map(self, cat='crypto', **parameters):
         """
         Get ID map for cryptocurrency, exchange or fiat.
@@ -179,12 +1025,30 @@ class CoinMarketCap:
         .. [3] `/v1/fiat/map
             <https://coinmarketcap.com/api/documentation/v1/#operation/getV1FiatMap>`_
         """
-        url = self._insert_cat(self.BASE_URL + '/{}/map', cat,
-              ['crypto', 'exchange', 'fiat'])
+        url, parameters = self._prepare('map', cat, parameters)
         return self._get_url(url, parameters)
 
-    @parameters_parser('cat')
-    def listings(self, cat='crypto', **parameters):
+    def iter_map(self, cat='crypto', page_size=5000, **parameters):
+        """
+        Iterate over the ID map page by page.
+
+        Parameters
+        ----------
+        cat: {'crypto', 'exchange', 'fiat'}, default 'crypto'
+            The category to get map for.
+        page_size: int {1...5000}, default 5000
+            Number of records requested per page.
+        \*\*parameters: keyword arguments
+            Parameters to include in the request. See map.
+
+        Returns
+        -------
+        generator of dict
+        """
+        return self._paginate(self.map, cat, page_size, parameters)
+
+    def listings(self, cat='crypto', as_frame=False, records=False,
+                 **parameters):
         """
         Get latest listings for cryptocurrency or exchange.
 
@@ -240,10 +1104,18 @@ class CoinMarketCap:
                 cat: {'exchange'}
             aux: str or sequence of str
                 cat: {'crypto', 'exchange'}
+        as_frame: bool or {'numpy', 'pandas', 'arrow'}, default False
+            Return typed columns instead of records, with one column
+            per convert currency e.g 'quote.USD.price'.
+            True is the same as 'pandas'.
+        records: bool, default False
+            Return Record objects decoded only when they are read,
+            instead of dicts. They save memory when many records are
+            kept or few of them are read.
 
         Returns
         -------
-        data: list
+        data: list or columns
 
         References
         ----------
@@ -252,11 +1124,34 @@ class CoinMarketCap:
         .. [2] `/v1/exchange/listings/latest
             <https://coinmarketcap.com/api/documentation/v1/#operation/getV1ExchangeListingsLatest>`_
         """
-        url = self._insert_cat(self.BASE_URL + '/{}/listings/latest', cat)
-        return self._get_url(url, parameters)
+        url, parameters = self._prepare('listings', cat, parameters)
+        if records:
+            parameters['_records'] = 'listings'
+        data = self._get_url(url, parameters)
+        if as_frame:
+            return self._then(data, listings_frame, as_frame)
+        return data
 
-    @parameters_parser('cat')
-    def historical_listings(self, cat='crypto', **parameters):
+    def iter_listings(self, cat='crypto', page_size=5000, **parameters):
+        """
+        Iterate over latest listings page by page.
+
+        Parameters
+        ----------
+        cat: {'crypto', 'exchange'}, default 'crypto'
+            The category to get listings for.
+        page_size: int {1...5000}, default 5000
+            Number of records requested per page.
+        \*\*parameters: keyword arguments
+            Parameters to include in the request. See listings.
+
+        Returns
+        -------
+        generator of dict
+        """
+        return self._paginate(self.listings, cat, page_size, parameters)
+
+    def historical_listings(self, cat='crypto', split=False, **parameters):
         """
         Get latest listings for cryptocurrency or exchange.
 
@@ -266,6 +1161,10 @@ class CoinMarketCap:
             The category to get historical for.
         \*\*parameters:  keyword arguments
             Parameters to include in the request.
+        split: bool, default False
+            Get one snapshot per interval (default 'daily') between
+            time_start and time_end, fetched in parallel, instead of
+            the snapshot of date.
             
         Returns
         -------
@@ -278,11 +1177,13 @@ class CoinMarketCap:
         .. [2] `/v1/exchange/listings/historical
             <https://coinmarketcap.com/api/documentation/v1/#operation/getV1ExchangeListingsHistorical>`_
         """
-        url = self._insert_cat(self.BASE_URL + '/{}/listings/historical', cat)
+        url, parameters = self._prepare('historical_listings', cat,
+                                        parameters)
+        if split:
+            return self._get_split('listings', url, parameters)
         return self._get_url(url, parameters)
 
-    @parameters_parser('cat')
-    def info(self, cat='crypto', **parameters):
+    def info(self, cat='crypto', resolve=False, **parameters):
         """
         Get Metadata for cryptocurrency or exchange.
 
@@ -301,6 +1202,9 @@ class CoinMarketCap:
                 cat: {'crypto'}
             aux: str or sequence of str
                 cat: {'crypto', 'exchange'}
+        resolve: bool, default False
+            Rewrite symbol or slug into id with the local index
+            before sending the request. data is then keyed by id.
         
         Returns
         -------
@@ -315,9 +1219,10 @@ class CoinMarketCap:
         .. [3] `/v1/key/info
             <https://coinmarketcap.com/api/documentation/v1/#operation/getV1KeyInfo>`_
         """
-        url = self._insert_cat(self.BASE_URL + '/{}/info', cat, 
-              ['crypto', 'exchange', 'key'])
-        return self._get_url(url, parameters)
+        url, parameters = self._prepare('info', cat, parameters)
+        if resolve:
+            parameters = self._resolve(cat, parameters)
+        return self._get_coalesced(url, parameters)
 
     def key_info(self):
         """
@@ -325,8 +1230,8 @@ class CoinMarketCap:
         """
         return self.info('key')
 
-    @parameters_parser('cat')
-    def quotes(self, cat='crypto', **parameters):
+    def quotes(self, cat='crypto', as_frame=False, resolve=False,
+               records=False, **parameters):
         """
         Get latest quotes for cryptocurrency or exchange.
 
@@ -336,10 +1241,21 @@ class CoinMarketCap:
             The category to get quotes for.
         \*\*parameters:  keyword arguments
             Parameters to include in the request.
-            
+        as_frame: bool or {'numpy', 'pandas', 'arrow'}, default False
+            Return typed columns instead of records, with one column
+            per convert currency e.g 'quote.USD.price'.
+            True is the same as 'pandas'.
+        resolve: bool, default False
+            Rewrite symbol or slug into id with the local index
+            before sending the request. data is then keyed by id.
+        records: bool, default False
+            Return Record objects decoded only when they are read,
+            instead of dicts. They save memory when many records are
+            kept or few of them are read.
+
         Returns
         -------
-        data: dict
+        data: dict or columns
 
         References
         ----------
@@ -350,12 +1266,21 @@ class CoinMarketCap:
         .. [3] `/v1/global-metrics/quotes/latest
             <https://coinmarketcap.com/api/documentation/v1/#operation/getV1GlobalmetricsQuotesLatest>`_
         """
-        url = self._insert_cat(self.BASE_URL + '/{}/quotes/latest', cat,
-              ['crypto', 'exchange', 'global-metrics'])
-        return self._get_url(url, parameters)
+        url, parameters = self._prepare('quotes', cat, parameters)
+        if resolve:
+            parameters = self._resolve(cat, parameters)
+        if records:
+            if cat == 'global-metrics':
+                raise ValueError('records=True is not available for '
+                                 'global-metrics quotes.')
+            parameters['_records'] = 'quotes'
+        data = self._get_coalesced(url, parameters)
+        if as_frame:
+            return self._then(data, quotes_frame, as_frame)
+        return data
 
-    @parameters_parser('cat')
-    def historical_quotes(self, cat='crypto', **parameters):
+    def historical_quotes(self, cat='crypto', as_frame=False, split=False,
+                          **parameters):
         """
         Get historical quotes for cryptocurrency or exchange.
 
@@ -365,10 +1290,18 @@ class CoinMarketCap:
             The category to get historical quotes for.
         \*\*parameters:  keyword arguments
             Parameters to include in the request.
+        as_frame: bool or {'numpy', 'pandas', 'arrow'}, default False
+            Return typed columns instead of quotes, with one column
+            per convert currency e.g 'quote.USD.price'.
+            True is the same as 'pandas'.
+        split: bool, default False
+            Split a long time_start to time_end range into windows of
+            max_count intervals, fetched in parallel and merged in
+            time order.
             
         Returns
         -------
-        data: dict
+        data: dict or columns
 
         References
         ----------
@@ -379,71 +1312,141 @@ class CoinMarketCap:
         .. [3] `/v1/global-metrics/quotes/historical
             <https://coinmarketcap.com/api/documentation/v1/#operation/getV1GlobalmetricsQuotesHistorical>`_
         """
-        url = self._insert_cat(self.BASE_URL + '/{}/quotes/historical', cat,
-              ['crypto', 'exchange', 'global-metrics'])
-        return self._get_url(url, parameters)
+        url, parameters = self._prepare('historical_quotes', cat,
+                                        parameters)
+        if cat == 'crypto':
+            data = self._get_history('quotes', url, parameters, split)
+        elif split:
+            data = self._get_split('quotes', url, parameters)
+        else:
+            data = self._get_url(url, parameters)
+        if as_frame:
+            return self._then(data, historical_frame, as_frame)
+        return data
 
-    @parameters_parser()
-    def ohlcv(self, **parameters):
+    def ohlcv(self, resolve=False, records=False, **parameters):
         """
         Get the latest OHLCV of coin(s).
+
+        Parameters
+        ----------
+        resolve: bool, default False
+            Rewrite symbol or slug into id with the local index
+            before sending the request. data is then keyed by id.
+        records: bool, default False
+            Return Record objects decoded only when they are read,
+            instead of dicts. They save memory when many records are
+            kept or few of them are read.
+        \*\*parameters:  keyword arguments
+            Parameters to include in the request.
         """
-        url = self.BASE_URL + '/cryptocurrency/ohlcv/latest'
-        return self._get_url(url, parameters)
+        url, parameters = self._prepare('ohlcv', None, parameters)
+        if resolve:
+            parameters = self._resolve('crypto', parameters)
+        if records:
+            parameters['_records'] = 'ohlcv'
+        return self._get_batched(url, parameters)
 
-    @parameters_parser()
-    def historical_ohlcv(self, **parameters):
+    def historical_ohlcv(self, as_frame=False, split=False, records=False,
+                         **parameters):
         """
         Get historical OHLCV of coin(s).
+
+        Parameters
+        ----------
+        as_frame: bool or {'numpy', 'pandas', 'arrow'}, default False
+            Return typed columns instead of quotes, with one column
+            per convert currency e.g 'quote.USD.price'.
+            True is the same as 'pandas'.
+        split: bool, default False
+            Split a long time_start to time_end range into windows of
+            max_count intervals, fetched in parallel and merged in
+            time order.
+        records: bool, default False
+            Return the quotes of one id as Record objects decoded
+            only when they are read, instead of dicts. Records are
+            not served from the store.
+        \*\*parameters:  keyword arguments
+            Parameters to include in the request.
         """
-        url = self.BASE_URL + '/cryptocurrency/ohlcv/historical'
-        return self._get_url(url, parameters)
+        url, parameters = self._prepare('historical_ohlcv', None, parameters)
+        if records:
+            parameters['_records'] = 'historical_ohlcv'
+        data = self._get_history('ohlcv', url, parameters, split)
+        if as_frame:
+            return self._then(data, historical_frame, as_frame)
+        return data
 
-    @parameters_parser('cat')
-    def market_pairs(self, cat='crypto', **parameters):
+    def market_pairs(self, cat='crypto', records=False, **parameters):
         """
         Get the latest market-pairs of cryptocurrency or exchange.
-        """
-        url = self._insert_cat(self.BASE_URL + '/{}/market-pairs/latest', cat)
-        return self._get_url(url, parameters)
 
-    @parameters_parser()
-    def price_performance_stats(self, **parameters):
-        """
-        Get price-performance-stats of coin(s).
+        With records=True, data['market_pairs'] holds Record objects
+        decoded only when they are read, instead of dicts.
         """
-        url = self.BASE_URL + '/cryptocurrency/price-performance-stats/latest'
+        url, parameters = self._prepare('market_pairs', cat, parameters)
+        if records:
+            parameters['_records'] = 'market_pairs'
         return self._get_url(url, parameters)
 
-    @parameters_parser()
-    def price_conversion(self, **parameters):
-        """
-        Convert an amount of one crypto or fiat into another.
+    def iter_market_pairs(self, cat='crypto', page_size=5000, **parameters):
         """
-        url = self.BASE_URL + '/tools/price-conversion'
-        return self._get_url(url, parameters)
-    
-    @parameters_parser()
-    def blockchain_stats(self, **parameters):
-        """
-        Get the latest blockchain statistics for 1 or more blockchains.
-        """
-        url = self.BASE_URL + '/blockchain/statistics/latest'
-        return self._get_url(url, parameters)
-    
-    @parameters_parser()
-    def flipside_fcas_listings(self, **parameters):
-        """
-        Get the list of FCAS scores of all crypto by flipside.
+        Iterate over the latest market-pairs page by page.
+
+        Yields the items of data['market_pairs'].
         """
-        url = self.BASE_URL + '/partners/flipside-crypto/fcas/listings/latest'
-        return self._get_url(url, parameters)
-    
-    @parameters_parser()
-    def flipside_fcas_quotes(self, **parameters):
+        return self._paginate(self.market_pairs, cat, page_size, parameters,
+                              extract=lambda data: data['market_pairs'])
+
+    def watch(self, method='quotes', fields=None, thresholds=None,
+              initial=True, max_polls=None, min_interval=1, **parameters):
         """
-        Get the latest FCAS score of 1 or more crypto.
+        Poll quotes or listings and yield only the records that changed.
+
+        Polls follow the refresh cadence of the server, learned from
+        last_updated of the records, instead of a fixed interval.
+
+        Parameters
+        ----------
+        method: {'quotes', 'listings'} or callable, default 'quotes'
+            Method to poll.
+        fields: sequence of str, optional
+            Dotted fields to compare, e.g ['quote.USD.price'].
+            By default whole records are compared.
+        thresholds: dict, optional
+            Minimum relative change of fields to yield a record,
+            e.g {'quote.USD.price': 0.01}.
+        initial: bool, default True
+            Yield every record of the first poll.
+        max_polls: int, optional
+            Stop after max_polls polls. By default it never stops.
+        min_interval: float, default 1
+            Minimum seconds between polls.
+        \*\*parameters: keyword arguments
+            Parameters of method, e.g id=[1, 2] or limit=500.
+
+        Returns
+        -------
+        generator of Change
+            Namedtuples of (id, record, previous).
+
+        Examples
+        --------
+        >>> for change in cmc.watch('listings', limit=500,
+        ...                         thresholds={'quote.USD.price': 0.01}):
+        ...     print(change.id, change.record['quote']['USD']['price'])
         """
-        url = self.BASE_URL + '/partners/flipside-crypto/fcas/quotes/latest'
-        return self._get_url(url, parameters)
-    
\ No newline at end of file
+        if isinstance(method, str):
+            method = getattr(self, method)
+            # Polls must get new data, not the response of the last poll
+            # from the cache.
+            parameters['_fresh'] = True
+        watcher = Watcher(fields, thresholds, initial)
+        return self._watch(method, watcher, parameters, max_polls,
+                           min_interval)
+
+    price_performance_stats = endpoint_method('price_performance_stats')
+    price_conversion = endpoint_method('price_conversion')
+    blockchain_stats = endpoint_method('blockchain_stats')
+    flipside_fcas_listings = endpoint_method('flipside_fcas_listings')
+    flipside_fcas_quotes = endpoint_method('flipside_fcas_quotes')
@@ -0,0 +1,238 @@
+import codecs
+import json
+import re
+from collections import namedtuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+RawResponse = namedtuple('RawResponse', ['status_code', 'content', 'headers'])
+RawResponse.__doc__ = """
+Undecoded response returned with raw=True.
+
+status_code: int
+content: bytes
+    Body of the response, already decompressed.
+headers: dict-like
+"""
+
+
+def _json_loads(content):
+    return json.loads(content)
+
+
+def get_decoder(decoder=None):
+    """
+    Get a function decoding a json body from bytes.
+
+    Parameters
+    ----------
+    decoder: {'orjson', 'ujson', 'json'} or callable, optional
+        The json library to use, or a function taking bytes.
+        The fastest installed library is used by default,
+        i.e orjson, then ujson, then the standard json.
+
+    Returns
+    -------
+    function
+    """
+    if callable(decoder):
+        return decoder
+    libraries = {'orjson': orjson, 'ujson': ujson}
+    if decoder is None:
+        for library in (orjson, ujson):
+            if library is not None:
+                return library.loads
+        return _json_loads
+    elif decoder == 'json':
+        return _json_loads
+    elif decoder in libraries:
+        if libraries[decoder] is None:
+            raise ImportError('{} is not installed.'.format(decoder))
+        return libraries[decoder].loads
+    else:
+        raise ValueError(
+            "Invalid json_decoder ({}) provided. "
+            "Valid options are: {{orjson,ujson,json}}".format(decoder))
+
+
+_whitespace = re.compile(r'[ \t\n\r]*')
+_incomplete = object()
+
+
+class StreamDecoder:
+    """
+    Decode the records of a json body fed chunk by chunk.
+
+    Each record of the array at path is returned as soon as its last
+    byte is fed, so only one record and one chunk are held in memory.
+    If path leads to an object, its values are the records. Other
+    values met on the way, e.g status, are kept in fields.
+
+    Parameters
+    ----------
+    path: sequence of str, default ('data',)
+        Keys leading to the records, e.g ('data', 'market_pairs').
+
+    Attributes
+    ----------
+    StreamDecoder.fields: dict
+        Values outside of the records by dotted key, e.g 'status'.
+    StreamDecoder.size: int
+        Number of bytes fed.
+
+    Examples
+    --------
+    >>> decoder = StreamDecoder()
+    >>> for chunk in chunks:
+    ...     for record in decoder.feed(chunk):
+    ...         print(record['id'])
+    >>> decoder.close()
+    """
+
+    def __init__(self, path=('data',)):
+        self.path = tuple(path)
+        self.fields = {}
+        self.size = 0
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._scan = json.JSONDecoder().raw_decode
+        self._buffer = ''
+        self._pos = 0
+        self._keys = []
+        self._key = None
+        self._state = 'start'
+        self._closed = False
+
+    def _next(self):
+        """Skip whitespace and get the next character, None if none."""
+        self._pos = _whitespace.match(self._buffer, self._pos).end()
+        if self._pos < len(self._buffer):
+            return self._buffer[self._pos]
+        return None
+
+    def _value(self):
+        """Decode the value at the current position, if it is complete."""
+        try:
+            value, end = self._scan(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if self._closed:
+                raise
+            return _incomplete
+        if (not self._closed and not isinstance(value, (dict, list, str))
+                and self._buffer[end:end+1] in ('', '.', 'e', 'E')):
+            # A number may go on in the next chunk, e.g '1' of '1.5'.
+            return _incomplete
+        self._pos = end
+        return value
+
+    def _expect(self, char, expected):
+        if char != expected:
+            raise ValueError('Expected {!r} in the json body, got {!r}.'
+                             .format(expected, char))
+        self._pos += 1
+
+    def _parse(self):
+        """Parse as much of the buffer as possible, returning records."""
+        records = []
+        while True:
+            char = self._next()
+            if char is None:
+                break
+            state = self._state
+            if state == 'start':
+                self._expect(char, '{')
+                self._state = 'key'
+            elif state in ('key', 'item-key'):
+                if char == ',':
+                    self._pos += 1
+                    continue
+                if char == '}':
+                    self._pos += 1
+                    if state == 'item-key':
+                        self._state = 'key'
+                    elif self._keys:
+                        self._keys.pop()
+                    else:
+                        self._state = 'end'
+                    continue
+                key = self._value()
+                if key is _incomplete:
+                    break
+                self._key = key
+                self._state = 'colon' if state == 'key' else 'item-colon'
+            elif state in ('colon', 'item-colon'):
+                self._expect(char, ':')
+                self._state = 'value' if state == 'colon' else 'item'
+            elif state == 'value':
+                keys = tuple(self._keys) + (self._key,)
+                if keys == self.path[:len(keys)] and char in '[{':
+                    self._pos += 1
+                    if len(keys) < len(self.path):
+                        self._keys.append(self._key)
+                        self._state = 'key'
+                    else:
+                        self._state = 'items' if char == '[' else 'item-key'
+                    continue
+                value = self._value()
+                if value is _incomplete:
+                    break
+                self.fields['.'.join(self._keys + [self._key])] = value
+                self._state = 'key'
+            elif state in ('items', 'item'):
+                if state == 'items' and char in ',]':
+                    self._pos += 1
+                    if char == ']':
+                        self._state = 'key'
+                    continue
+                record = self._value()
+                if record is _incomplete:
+                    break
+                records.append(record)
+                if state == 'item':
+                    self._state = 'item-key'
+            else:
+                self._pos = len(self._buffer)
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        return records
+
+    def feed(self, chunk):
+        """
+        Feed the next chunk of the body.
+
+        Parameters
+        ----------
+        chunk: bytes
+
+        Returns
+        -------
+        records: list
+            Records completed by chunk.
+        """
+        self.size += len(chunk)
+        self._buffer += self._text.decode(chunk)
+        return self._parse()
+
+    def close(self):
+        """
+        End the body, returning the last records if any.
+
+        Raises
+        ------
+        ValueError
+            If the body is not complete json.
+        """
+        self._closed = True
+        self._buffer += self._text.decode(b'', final=True)
+        records = self._parse()
+        if self._state != 'end':
+            raise ValueError('The json body is incomplete.')
+        return records
@@ -0,0 +1,416 @@
+from datetime import datetime, date
+from .exceptions import InvalidParameterException
+from .ranges import interval_seconds
+
+_docs = 'https://coinmarketcap.com/api/documentation/v1/#operation/'
+# Parameters handled by the client rather than sent to the server.
+FLAGS = ('raw', 'stream', '_records', '_fresh')
+
+
+class Parameter:
+    """
+    Spec of a request parameter, which checks and encodes its values.
+
+    Parameters
+    ----------
+    name: str
+    kind: {'str', 'list', 'ids', 'int', 'number', 'bool', 'time', 'interval'}
+        'list' takes a str or sequence of str, and 'ids' a sequence
+        of ints, both sent comma separated. Default 'str'.
+    options: sequence of str, optional
+        Valid values, or valid items of lists.
+    minimum, maximum: float, optional
+        Range of valid values of 'int' and 'number' parameters.
+    cats: sequence of str, optional
+        Categories taking the parameter. All of them by default.
+    """
+
+    def __init__(self, name, kind='str', options=None, minimum=None,
+                 maximum=None, cats=None):
+        self.name = name
+        self.kind = kind
+        self.options = frozenset(options) if options else None
+        self.minimum = minimum
+        self.maximum = maximum
+        self.cats = cats
+        # Bound once, so that encoding a value is a single call.
+        self.encode = getattr(self, '_encode_' + kind)
+
+    def _invalid(self, value, expected):
+        return InvalidParameterException(
+            'Invalid {} ({}) provided. Valid options are: {}'.format(
+                self.name, value, expected))
+
+    def _check_options(self, values, value):
+        if self.options is not None:
+            for item in values:
+                if item not in self.options:
+                    raise self._invalid(value, '{{{}}}'.format(
+                        ','.join(sorted(self.options))))
+
+    def _check_range(self, number, value):
+        if ((self.minimum is not None and number < self.minimum) or
+                (self.maximum is not None and number > self.maximum)):
+            raise self._invalid(value, '{{{}...{}}}'.format(
+                self.minimum if self.minimum is not None else '',
+                self.maximum if self.maximum is not None else ''))
+
+    def _encode_str(self, value):
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise self._invalid(value, 'str')
+        self._check_options([str(value)], value)
+        return value
+
+    def _encode_list(self, value):
+        if isinstance(value, str):
+            values = value.split(',')
+        elif isinstance(value, (list, tuple, set)):
+            values = [str(x) for x in value]
+            value = ','.join(values)
+        else:
+            raise self._invalid(value, 'str or sequence of str')
+        self._check_options([x.strip() for x in values], value)
+        return value
+
+    def _encode_ids(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            values = value.split(',')
+        elif isinstance(value, (list, tuple, set)):
+            values = [str(x) for x in value]
+            value = ','.join(values)
+        else:
+            values = [str(value)]
+        if not all(x.strip().isdigit() for x in values):
+            raise self._invalid(value, 'int or sequence of int')
+        return value
+
+    def _encode_number(self, value):
+        if isinstance(value, bool):
+            raise self._invalid(value, 'number')
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise self._invalid(value, 'number')
+        self._check_range(number, value)
+        return value
+
+    def _encode_int(self, value):
+        if isinstance(value, bool) or not (
+                isinstance(value, int) or
+                (isinstance(value, str) and value.strip().isdigit())):
+            raise self._invalid(value, 'int')
+        self._check_range(int(value), value)
+        return value
+
+    def _encode_bool(self, value):
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if str(value).lower() not in ('true', 'false'):
+            raise self._invalid(value, '{true,false}')
+        return str(value).lower()
+
+    def _encode_time(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            raise self._invalid(value, 'unix time, ISO 8601, date or datetime')
+        return value
+
+    def _encode_interval(self, value):
+        try:
+            interval_seconds(value)
+        except ValueError:
+            raise self._invalid(
+                value, '{hourly,daily,weekly,monthly,yearly,<n>m,<n>h,<n>d}')
+        return value
+
+    def describe(self):
+        """Describe the parameter as in the docstrings of the client."""
+        kind = {'list': 'str or sequence of str',
+                'ids': 'int or sequence of int',
+                'time': 'str, int, date or datetime',
+                'interval': 'str'}.get(self.kind, self.kind)
+        if self.options is not None:
+            kind += ' {{{}}}'.format(', '.join(
+                repr(x) for x in sorted(self.options)))
+        elif self.minimum is not None or self.maximum is not None:
+            kind += ' {{{}...{}}}'.format(
+                self.minimum if self.minimum is not None else '',
+                self.maximum if self.maximum is not None else '')
+        return '{}: {}'.format(self.name, kind)
+
+
+class Endpoint:
+    """
+    Spec of an endpoint: its url path for each category, the parameters
+    it takes, and how the client sends it.
+
+    Parameters
+    ----------
+    name: str
+        Name of the method of the client.
+    paths: str or dict
+        Url path after the version, e.g '/tools/price-conversion',
+        or the path of each category.
+    parameters: sequence of Parameter
+    required: sequence of tuples of str, optional
+        Each tuple lists parameters of which one must be given,
+        if the category takes any of them.
+    fetch: {'_get_url', '_get_batched', '_get_coalesced'}, default '_get_url'
+        Method of the client sending requests of generated methods.
+    summary: str, optional
+        First line of the docstring of generated methods.
+    references: sequence of str, optional
+        Operations of the documentation of pro-api.
+    """
+
+    def __init__(self, name, paths, parameters, required=(),
+                 fetch='_get_url', summary='', references=()):
+        self.name = name
+        if isinstance(paths, str):
+            paths = {None: paths}
+        self.paths = paths
+        self.parameters = tuple(parameters)
+        self.fetch = fetch
+        self.summary = summary
+        self.references = references
+        self._cats = {}
+        for cat in paths:
+            taken = {p.name: p for p in self.parameters
+                     if p.cats is None or cat in p.cats}
+            needed = [names for names in required
+                      if any(name in taken for name in names)]
+            self._cats[cat] = (taken, needed)
+
+    def prepare(self, cat, parameters):
+        """
+        Check and encode the parameters of a request.
+
+        Parameters
+        ----------
+        cat: str or None
+        parameters: dict
+
+        Returns
+        -------
+        path, parameters: str, dict
+
+        Raises
+        ------
+        ValueError
+            If cat is not a category of the endpoint.
+        InvalidParameterException
+            If a parameter is unknown, missing, or has an invalid value.
+        """
+        try:
+            path = self.paths[cat]
+            taken, needed = self._cats[cat]
+        except (KeyError, TypeError):
+            raise ValueError(
+                "Invalid category ({}) provided. "
+                "Valid options are: {{{}}}".format(cat, ','.join(
+                    x for x in self.paths if x is not None)))
+        encoded = {}
+        for key, value in parameters.items():
+            parameter = taken.get(key)
+            if parameter is not None:
+                encoded[key] = parameter.encode(value)
+            elif key in FLAGS:
+                encoded[key] = value
+            else:
+                raise InvalidParameterException(
+                    'Invalid parameter ({}) provided for {}. '
+                    'Valid options are: {{{}}}'.format(
+                        key, path, ','.join(sorted(taken))))
+        for names in needed:
+            if not any(name in encoded for name in names):
+                if len(names) > 1:
+                    names = 'One of {{{}}}'.format(','.join(names))
+                else:
+                    names = names[0]
+                raise InvalidParameterException(
+                    '{} is required for {}.'.format(names, path))
+        return path, encoded
+
+    def docstring(self):
+        """Build the docstring of a generated method."""
+        lines = [self.summary, '', 'Parameters', '----------',
+                 '\\*\\*parameters: keyword arguments',
+                 '    Parameters to include in the request.']
+        for parameter in self.parameters:
+            lines.append('    ' + parameter.describe())
+        if self.references:
+            lines += ['', 'References', '----------']
+            for i, (cat, reference) in enumerate(
+                    zip(self.paths.values(), self.references)):
+                lines.append('.. [{}] `/v1{}'.format(i + 1, cat))
+                lines.append('    <{}{}>`_'.format(_docs, reference))
+        return '\n'.join('        ' + line if line else ''
+                         for line in lines).lstrip()
+
+
+def _paths(template, cats):
+    return {cat: template.format(path) for cat, path in cats}
+
+
+_crypto = ('crypto', 'cryptocurrency')
+_exchange = ('exchange', 'exchange')
+_fiat = ('fiat', 'fiat')
+_global = ('global-metrics', 'global-metrics')
+_key = ('key', 'key')
+_sorts = ('name', 'symbol', 'date_added', 'market_cap', 'market_cap_strict',
+          'price', 'circulating_supply', 'total_supply', 'max_supply',
+          'num_market_pairs', 'volume_24h', 'percent_change_1h',
+          'percent_change_24h', 'percent_change_7d',
+          'market_cap_by_total_supply_strict', 'volume_7d', 'volume_30d',
+          'volume_24h_adjusted', 'exchange_score')
+_convert = (Parameter('convert', 'list'), Parameter('convert_id', 'list'))
+_paging = (Parameter('start', 'int', minimum=1),
+           Parameter('limit', 'int', minimum=1, maximum=5000))
+_history = (Parameter('time_start', 'time'), Parameter('time_end', 'time'),
+            Parameter('count', 'int', minimum=1, maximum=10000),
+            Parameter('interval', 'interval'))
+_ranges = tuple(
+    Parameter('{}_{}'.format(field, end), 'number', minimum=minimum,
+              maximum=1e17, cats=['crypto'])
+    for field, minimum in (('price', 0), ('market_cap', 0), ('volume_24h', 0),
+                           ('circulating_supply', 0),
+                           ('percent_change_24h', -100))
+    for end in ('min', 'max'))
+
+ENDPOINTS = {endpoint.name: endpoint for endpoint in [
+    Endpoint('map', _paths('/{}/map', [_crypto, _exchange, _fiat]), [
+        Parameter('listing_status', 'list',
+                  ['active', 'inactive', 'untracked'],
+                  cats=['crypto', 'exchange']),
+        Parameter('slug', 'list', cats=['exchange']),
+        Parameter('symbol', 'list', cats=['crypto']),
+        Parameter('crypto_id', 'ids', cats=['exchange']),
+        Parameter('sort', options=['id', 'cmc_rank', 'name', 'volume_24h']),
+        Parameter('include_metals', 'bool', cats=['fiat']),
+        Parameter('aux', 'list', cats=['crypto', 'exchange']),
+    ] + list(_paging)),
+    Endpoint('listings', _paths('/{}/listings/latest', [_crypto, _exchange]),
+             list(_paging) + list(_ranges) + list(_convert) + [
+        Parameter('sort', options=_sorts),
+        Parameter('sort_dir', options=['asc', 'desc']),
+        Parameter('cryptocurrency_type', options=['all', 'coins', 'tokens'],
+                  cats=['crypto']),
+        Parameter('tag', cats=['crypto']),
+        Parameter('market_type', options=['fees', 'no_fees', 'all'],
+                  cats=['exchange']),
+        Parameter('category', cats=['exchange']),
+        Parameter('aux', 'list'),
+    ]),
+    Endpoint('historical_listings',
+             _paths('/{}/listings/historical', [_crypto, _exchange]),
+             list(_paging) + list(_convert) + [
+        Parameter('date', 'time'),
+        Parameter('time_start', 'time'),
+        Parameter('time_end', 'time'),
+        Parameter('interval', 'interval'),
+        Parameter('sort', options=_sorts),
+        Parameter('sort_dir', options=['asc', 'desc']),
+        Parameter('cryptocurrency_type', options=['all', 'coins', 'tokens'],
+                  cats=['crypto']),
+        Parameter('aux', 'list'),
+    ]),
+    Endpoint('info', _paths('/{}/info', [_crypto, _exchange, _key]), [
+        Parameter('id', 'ids', cats=['crypto', 'exchange']),
+        Parameter('slug', 'list', cats=['crypto', 'exchange']),
+        Parameter('symbol', 'list', cats=['crypto']),
+        Parameter('address', cats=['crypto']),
+        Parameter('aux', 'list', cats=['crypto', 'exchange']),
+    ], required=[('id', 'slug', 'symbol', 'address')]),
+    Endpoint('quotes',
+             _paths('/{}/quotes/latest', [_crypto, _exchange, _global]), [
+        Parameter('id', 'ids', cats=['crypto', 'exchange']),
+        Parameter('slug', 'list', cats=['crypto', 'exchange']),
+        Parameter('symbol', 'list', cats=['crypto']),
+        Parameter('aux', 'list', cats=['crypto', 'exchange']),
+        Parameter('skip_invalid', 'bool', cats=['crypto']),
+    ] + list(_convert), required=[('id', 'slug', 'symbol')]),
+    Endpoint('historical_quotes',
+             _paths('/{}/quotes/historical', [_crypto, _exchange, _global]), [
+        Parameter('id', 'ids', cats=['crypto', 'exchange']),
+        Parameter('slug', 'list', cats=['exchange']),
+        Parameter('symbol', 'list', cats=['crypto']),
+        Parameter('aux', 'list'),
+        Parameter('skip_invalid', 'bool', cats=['crypto']),
+    ] + list(_history) + list(_convert),
+             required=[('id', 'slug', 'symbol')]),
+    Endpoint('ohlcv', '/cryptocurrency/ohlcv/latest', [
+        Parameter('id', 'ids'),
+        Parameter('symbol', 'list'),
+        Parameter('skip_invalid', 'bool'),
+    ] + list(_convert), required=[('id', 'symbol')]),
+    Endpoint('historical_ohlcv', '/cryptocurrency/ohlcv/historical', [
+        Parameter('id', 'ids'),
+        Parameter('slug', 'list'),
+        Parameter('symbol', 'list'),
+        Parameter('time_period', options=['daily', 'hourly']),
+        Parameter('skip_invalid', 'bool'),
+    ] + list(_history) + list(_convert),
+             required=[('id', 'slug', 'symbol')]),
+    Endpoint('market_pairs',
+             _paths('/{}/market-pairs/latest', [_crypto, _exchange]), [
+        Parameter('id', 'ids'),
+        Parameter('slug', 'list'),
+        Parameter('symbol', 'list', cats=['crypto']),
+        Parameter('aux', 'list'),
+        Parameter('matched_id', 'ids'),
+        Parameter('matched_symbol', 'list'),
+        Parameter('category', options=['all', 'spot', 'derivatives', 'otc',
+                                       'perpetual', 'futures']),
+        Parameter('fee_type', options=['all', 'percentage', 'no-fees',
+                                       'transactional-mining', 'unknown']),
+        Parameter('sort', options=['volume_24h_strict', 'cmc_rank',
+                                   'cmc_rank_advanced', 'effective_liquidity',
+                                   'market_score', 'market_reputation']),
+        Parameter('sort_dir', options=['asc', 'desc']),
+    ] + list(_paging) + list(_convert), required=[('id', 'slug', 'symbol')]),
+    Endpoint('price_performance_stats',
+             '/cryptocurrency/price-performance-stats/latest', [
+        Parameter('id', 'ids'),
+        Parameter('slug', 'list'),
+        Parameter('symbol', 'list'),
+        Parameter('time_period', 'list', ['all_time', 'yesterday', '24h',
+                                          '7d', '30d', '90d', '365d']),
+        Parameter('skip_invalid', 'bool'),
+    ] + list(_convert), required=[('id', 'slug', 'symbol')],
+             fetch='_get_batched',
+             summary='Get price-performance-stats of coin(s).',
+             references=['getV1CryptocurrencyPriceperformancestatsLatest']),
+    Endpoint('price_conversion', '/tools/price-conversion', [
+        Parameter('amount', 'number', minimum=1e-8, maximum=1e9),
+        Parameter('id', 'ids'),
+        Parameter('symbol'),
+        Parameter('time', 'time'),
+    ] + list(_convert), required=[('amount',), ('id', 'symbol')],
+             summary='Convert an amount of one crypto or fiat into another.',
+             references=['getV1ToolsPriceconversion']),
+    Endpoint('blockchain_stats', '/blockchain/statistics/latest', [
+        Parameter('id', 'ids'),
+        Parameter('symbol', 'list'),
+        Parameter('slug', 'list'),
+    ], required=[('id', 'symbol', 'slug')],
+             summary='Get the latest blockchain statistics for 1 or more '
+                     'blockchains.',
+             references=['getV1BlockchainStatisticsLatest']),
+    Endpoint('flipside_fcas_listings',
+             '/partners/flipside-crypto/fcas/listings/latest',
+             list(_paging) + [Parameter('aux', 'list')],
+             summary='Get the list of FCAS scores of all crypto by flipside.',
+             references=['getV1PartnersFlipsidecryptoFcasListingsLatest']),
+    Endpoint('flipside_fcas_quotes',
+             '/partners/flipside-crypto/fcas/quotes/latest', [
+        Parameter('id', 'ids'),
+        Parameter('slug', 'list'),
+        Parameter('symbol', 'list'),
+        Parameter('aux', 'list'),
+    ], required=[('id', 'slug', 'symbol')],
+             summary='Get the latest FCAS score of 1 or more crypto.',
+             references=['getV1PartnersFlipsidecryptoFcasQuotesLatest']),
+]}
@@ -24,3 +24,43 @@ class TooManyRequestsException(Exception):
 
 class InternalServerErrorException(Exception):
     pass
+
+
+class CircuitOpenException(CMCAPIException):
+    pass
+
+
+class BudgetExceededException(CMCAPIException):
+    pass
+
+
+class ReplayMissException(CMCAPIException):
+    pass
+
+
+class KeyPoolExhaustedException(CMCAPIException):
+    pass
+
+
+class InvalidParameterException(BadRequestException, ValueError):
+    """
+    A parameter was rejected before sending the request.
+
+    It is a BadRequestException, as the server would answer HTTP 400,
+    and a ValueError like other invalid arguments.
+    """
+    pass
+
+
+class BatchException(CMCAPIException):
+    """
+    Some batches of a chunked request failed.
+
+    BatchException.errors is a list of (batch, exception), and
+    BatchException.data holds the merged data of the other batches.
+    """
+    def __init__(self, errors, data):
+        self.errors = errors
+        self.data = data
+        super().__init__('{} batch(es) failed, first error: {!r}'.format(
+            len(errors), errors[0][1]))
@@ -0,0 +1,166 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+KINDS = ('numpy', 'pandas', 'arrow')
+_time_columns = ('timestamp', 'last_updated', 'date_added', 'time_open',
+                 'time_close', 'time_high', 'time_low', 'time_period_start',
+                 'time_period_end')
+
+
+def _append(columns, row, prefix, record):
+    """Append the flattened values of record to columns at row."""
+    for key, value in record.items():
+        name = prefix + key
+        if isinstance(value, dict):
+            _append(columns, row, name + '.', value)
+            continue
+        column = columns.get(name)
+        if column is None:
+            column = columns[name] = []
+        if len(column) < row:
+            column.extend([None] * (row - len(column)))
+        column.append(value)
+
+
+def _pad(columns, length):
+    for column in columns.values():
+        if len(column) < length:
+            column.extend([None] * (length - len(column)))
+    return columns
+
+
+def records_columns(records):
+    """
+    Flatten a list of records into a dict of columns.
+
+    Nested dicts become dotted column names, so each convert currency
+    gets its own columns e.g 'quote.USD.price' and 'quote.EUR.price'.
+
+    Parameters
+    ----------
+    records: iterable of dict
+
+    Returns
+    -------
+    columns: dict of lists
+    """
+    columns = {}
+    row = -1
+    for row, record in enumerate(records):
+        _append(columns, row, '', record)
+    return _pad(columns, row + 1)
+
+
+def historical_columns(data):
+    """
+    Flatten data of historical_quotes or historical_ohlcv into columns,
+    with one row for each quote of each asset.
+    """
+    if 'quotes' in data:
+        data = {'': data}
+    columns = {}
+    row = 0
+    for asset in data.values():
+        extra = {k: v for k, v in asset.items() if k != 'quotes'}
+        for quote in asset['quotes']:
+            _append(columns, row, '', extra)
+            _append(columns, row, '', quote)
+            row += 1
+    return _pad(columns, row)
+
+
+def _is_time(name):
+    return name.rsplit('.', 1)[-1] in _time_columns
+
+
+def _typed_array(name, values):
+    """Convert a column into a numpy array of the best dtype."""
+    present = [x for x in values if x is not None]
+    types = {type(x) for x in present}
+    if not present:
+        return np.full(len(values), np.nan)
+    if types == {bool}:
+        if len(present) == len(values):
+            return np.array(values, dtype=bool)
+        return np.array(values, dtype=object)
+    if types <= {int, float} and bool not in types:
+        if types == {int} and len(present) == len(values):
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if x is None else x for x in values],
+                        dtype=np.float64)
+    if types == {str} and _is_time(name):
+        try:
+            return np.array([x.rstrip('Z') if x is not None else 'NaT'
+                             for x in values], dtype='datetime64[ns]')
+        except ValueError:
+            pass
+    return np.array(values, dtype=object)
+
+
+def to_kind(columns, kind):
+    """
+    Convert a dict of columns into typed arrays.
+
+    Numbers become float64 (int64 if there is no missing value),
+    times become datetime64 and anything else is kept as object.
+    numpy is required, pandas for DataFrame and pyarrow for Table.
+
+    Parameters
+    ----------
+    columns: dict of lists
+    kind: {'numpy', 'pandas', 'arrow'} or True
+        True is the same as 'pandas'.
+
+    Returns
+    -------
+    dict of numpy.ndarray, pandas.DataFrame or pyarrow.Table
+    """
+    if kind is True:
+        kind = 'pandas'
+    if kind not in KINDS:
+        raise ValueError(
+            "Invalid as_frame ({}) provided. "
+            "Valid options are: {{{}}}".format(kind, ','.join(KINDS)))
+    if np is None:
+        raise ImportError('numpy is required for as_frame.')
+    arrays = {name: _typed_array(name, values)
+              for name, values in columns.items()}
+    if kind == 'numpy':
+        return arrays
+    elif kind == 'pandas':
+        if pd is None:
+            raise ImportError("pandas is required for as_frame='pandas'.")
+        return pd.DataFrame(arrays)
+    else:
+        if pa is None:
+            raise ImportError("pyarrow is required for as_frame='arrow'.")
+        return pa.table({name: pa.array(array, from_pandas=True)
+                         for name, array in arrays.items()})
+
+
+def listings_frame(data, kind):
+    """Columns of listings data, one row per asset."""
+    return to_kind(records_columns(data), kind)
+
+
+def quotes_frame(data, kind):
+    """Columns of quotes data, one row per asset."""
+    return to_kind(records_columns(data.values()), kind)
+
+
+def historical_frame(data, kind):
+    """Columns of historical quotes or OHLCV, one row per quote."""
+    return to_kind(historical_columns(data), kind)
@@ -0,0 +1,151 @@
+import sqlite3
+import threading
+import time
+
+
+class SymbolIndex:
+    """
+    A local index resolving symbols, slugs and names to ids.
+
+    The index is built from map('crypto'), map('exchange') and
+    map('fiat'), and stored in sqlite so that it loads fast and
+    survives restarts. Lookups are dict lookups done offline.
+
+    Parameters
+    ----------
+    path: str, default ':memory:'
+        Path to the sqlite database file.
+
+    Examples
+    --------
+    >>> index = SymbolIndex('symbols.db')
+    >>> index.refresh(cmc)
+    >>> index.lookup(symbol='BTC')
+    1
+    """
+    keys = ('symbol', 'slug', 'name')
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries (cat TEXT, id INTEGER, '
+                'symbol TEXT, slug TEXT, name TEXT, rank INTEGER, '
+                'PRIMARY KEY (cat, id))')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS updates (cat TEXT PRIMARY KEY, '
+                'updated REAL)')
+        self._load()
+
+    def _load(self):
+        """Load the lookup tables from sqlite."""
+        tables = {}
+        rows = self._conn.execute(
+            'SELECT cat, id, symbol, slug, name FROM entries '
+            'ORDER BY rank IS NOT NULL, rank DESC, id DESC')
+        # The best ranked id is written last, so it wins ambiguous keys.
+        for cat, id, symbol, slug, name in rows:
+            table = tables.setdefault(cat, {key: {} for key in self.keys})
+            if symbol:
+                table['symbol'][symbol.upper()] = id
+            if slug:
+                table['slug'][slug] = id
+            if name:
+                table['name'][name.lower()] = id
+        self._tables = tables
+
+    def refresh(self, client, cats=('crypto', 'exchange', 'fiat'),
+                max_age=0):
+        """
+        Update the index from map of each category.
+
+        Only rows that changed are written.
+
+        Parameters
+        ----------
+        client: CoinMarketCap
+        cats: sequence of {'crypto', 'exchange', 'fiat'}
+            Categories to refresh.
+        max_age: int or float, default 0
+            Skip categories refreshed less than max_age seconds ago.
+
+        Returns
+        -------
+        changed: int
+            Number of rows added or updated.
+        """
+        changed = 0
+        for cat in cats:
+            if self.age(cat) < max_age:
+                continue
+            with self._lock:
+                known = {row[0]: row[1:] for row in self._conn.execute(
+                    'SELECT id, symbol, slug, name, rank FROM entries '
+                    'WHERE cat = ?', (cat,))}
+            rows = []
+            for record in client.iter_map(cat):
+                row = (record.get('symbol'), record.get('slug'),
+                       record.get('name'), record.get('rank'))
+                if known.get(record['id']) != row:
+                    rows.append((cat, record['id']) + row)
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                    rows)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO updates VALUES (?, ?)',
+                    (cat, time.time()))
+            changed += len(rows)
+        self._load()
+        return changed
+
+    def age(self, cat):
+        """Seconds since cat was refreshed, inf if it never was."""
+        row = self._conn.execute('SELECT updated FROM updates WHERE cat = ?',
+                                 (cat,)).fetchone()
+        return time.time() - row[0] if row else float('inf')
+
+    def lookup(self, symbol=None, slug=None, name=None, cat='crypto'):
+        """
+        Get the id of a symbol, slug or name.
+
+        Symbols are not unique, so the best ranked id is returned.
+
+        Raises
+        ------
+        KeyError
+            If the value is not in the index.
+        """
+        table = self._tables.get(cat, {})
+        if symbol is not None:
+            return table['symbol'][symbol.upper()]
+        elif slug is not None:
+            return table['slug'][slug]
+        elif name is not None:
+            return table['name'][name.lower()]
+        raise ValueError('One of symbol, slug or name is required.')
+
+    def resolve(self, parameters, cat='crypto'):
+        """
+        Rewrite symbol or slug in request parameters to id.
+
+        The parameters are returned unchanged if any value is
+        not in the index, so that the server can resolve them.
+        """
+        for key in ('symbol', 'slug'):
+            if key in parameters:
+                try:
+                    ids = [self.lookup(cat=cat, **{key: value})
+                           for value in str(parameters[key]).split(',')]
+                except KeyError:
+                    return parameters
+                parameters = {k: v for k, v in parameters.items()
+                              if k != key}
+                parameters['id'] = ','.join(str(x) for x in ids)
+                return parameters
+        return parameters
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from .exceptions import KeyPoolExhaustedException
+from .ratelimit import retry_after
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+class _Key:
+    def __init__(self, key):
+        self.key = key
+        self.in_flight = 0
+        self.calls = deque()
+        self.credits = 0
+        self.day = _today()
+        self.removed = False
+        self.cooling_until = 0
+
+
+class KeyPool:
+    """
+    A pool of API keys sharing the load of requests.
+
+    Each request is sent with the least loaded healthy key: the one
+    with the fewest requests in flight, then the fewest calls in the
+    last minute, then the fewest credits used today. Credits are
+    estimated when a key is taken, and replaced with the credit_count
+    of the response once it is decoded. Keys answering
+    HTTP 401 or 402 are removed from the pool, and keys answering
+    HTTP 429 rest until their Retry-After delay is over.
+
+    Parameters
+    ----------
+    keys: sequence of str
+        API keys.
+    calls_per_minute: int, optional
+        Maximum number of calls per minute of each key.
+    daily_credits: int, optional
+        Credits each key may use per day.
+    cooldown: float, default 60
+        Seconds a key rests after HTTP 429 without Retry-After.
+
+    Examples
+    --------
+    >>> cmc = CoinMarketCap(api_key=KeyPool(['key1', 'key2'],
+    ...                                     calls_per_minute=30))
+    """
+
+    def __init__(self, keys, calls_per_minute=None, daily_credits=None,
+                 cooldown=60):
+        if not keys:
+            raise ValueError('KeyPool needs at least one key.')
+        self.calls_per_minute = calls_per_minute
+        self.daily_credits = daily_credits
+        self.cooldown = cooldown
+        self._keys = {key: _Key(key) for key in keys}
+        self._lock = threading.Lock()
+
+    def _free_at(self, state, credits, now):
+        """Time at which state can take a call, None if never today."""
+        if state.removed:
+            return None
+        if state.day != _today():
+            state.day = _today()
+            state.credits = 0
+        if self.daily_credits is not None and \
+                state.credits + credits > self.daily_credits:
+            return None
+        while state.calls and state.calls[0] <= now - 60:
+            state.calls.popleft()
+        free = state.cooling_until
+        if self.calls_per_minute and \
+                len(state.calls) >= self.calls_per_minute:
+            free = max(free, state.calls[0] + 60)
+        return free
+
+    def reserve(self, credits=1):
+        """
+        Take the least loaded healthy key for a call.
+
+        Returns
+        -------
+        key, wait: str or None, float
+            key is None when every key is busy, and the call
+            should try again after wait seconds.
+
+        Raises
+        ------
+        KeyPoolExhaustedException
+            If every key was removed or used its daily credits.
+        """
+        with self._lock:
+            now = time.monotonic()
+            ready, waits = [], []
+            for state in self._keys.values():
+                free = self._free_at(state, credits, now)
+                if free is None:
+                    continue
+                if free <= now:
+                    ready.append(state)
+                else:
+                    waits.append(free - now)
+            if ready:
+                state = min(ready, key=lambda s: (s.in_flight, len(s.calls),
+                                                  s.credits))
+                state.in_flight += 1
+                state.calls.append(now)
+                state.credits += credits
+                return state.key, 0
+        if waits:
+            return None, min(waits)
+        raise KeyPoolExhaustedException(
+            'Every API key was rejected or used its daily credits.')
+
+    def charge(self, key, reserved, credits):
+        """
+        Replace credits reserved for a call of key with the credits
+        it actually used, e.g status.credit_count of its response.
+        """
+        with self._lock:
+            state = self._keys[key]
+            if state.day == _today():
+                state.credits = max(state.credits + credits - reserved, 0)
+
+    def release(self, key, status=None, headers=None):
+        """Return a key after its call, with the HTTP status if any."""
+        with self._lock:
+            state = self._keys[key]
+            state.in_flight -= 1
+            if status in (401, 402):
+                state.removed = True
+            elif status == 429:
+                state.cooling_until = time.monotonic() + retry_after(
+                    headers or {}, self.cooldown)
+
+    @property
+    def healthy(self):
+        """Keys that were not removed."""
+        return [key for key, state in self._keys.items() if not state.removed]
+
+    def remaining(self, key):
+        """Credits key may still use today, None if unlimited."""
+        if self.daily_credits is None:
+            return None
+        state = self._keys[key]
+        if state.day != _today():
+            return self.daily_credits
+        return max(self.daily_credits - state.credits, 0)
+
+    def __len__(self):
+        return len(self._keys)
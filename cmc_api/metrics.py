@@ -0,0 +1,180 @@
+import bisect
+import threading
+from collections import namedtuple
+from urllib.parse import urlparse
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+RequestEvent = namedtuple('RequestEvent', [
+    'endpoint', 'status', 'latency', 'size', 'decode_time', 'credit_count',
+    'elapsed'])
+RequestEvent.__doc__ = """
+A request recorded by Metrics, as passed to hooks.
+
+endpoint: str
+    Path of the url, e.g '/v1/cryptocurrency/map'.
+status: int
+    HTTP status code, or 0 if no response was received.
+latency: float
+    Seconds to get the response, including retries and rate limit waits.
+size: int
+    Size of the body in bytes.
+decode_time: float
+    Seconds spent decoding the body.
+credit_count: int or None
+    status.credit_count of the response.
+elapsed: int or None
+    status.elapsed of the response, in milliseconds.
+"""
+
+
+class _Endpoint:
+    def __init__(self, buckets):
+        self.statuses = {}
+        self.buckets = [0] * (len(buckets) + 1)
+        self.latency = 0.
+        self.size = 0
+        self.decode_time = 0.
+        self.credits = 0
+        self.elapsed = 0
+
+    @property
+    def count(self):
+        return sum(self.statuses.values())
+
+
+def endpoint_of(url):
+    """Get the endpoint label of url, i.e its path."""
+    return urlparse(url).path
+
+
+class Metrics:
+    """
+    Per-endpoint metrics of requests.
+
+    Records request count by status, latency histogram, response size,
+    decode time, status.credit_count and status.elapsed.
+
+    Parameters
+    ----------
+    buckets: sequence of float, default DEFAULT_BUCKETS
+        Upper bounds of the latency histogram in seconds.
+
+    Examples
+    --------
+    >>> metrics = Metrics()
+    >>> cmc = CoinMarketCap(metrics=metrics)
+    >>> metrics.add_hook(lambda event: print(event.endpoint, event.latency))
+    >>> print(metrics.to_prometheus())
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.hooks = []
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """Call hook(RequestEvent) for every recorded request."""
+        self.hooks.append(hook)
+
+    def record(self, url, status, latency, size=0, decode_time=0.,
+               res=None):
+        """Record a request to url, with res the decoded body if any."""
+        try:
+            credit_count = res['status'].get('credit_count')
+            elapsed = res['status'].get('elapsed')
+        except (KeyError, TypeError, AttributeError):
+            credit_count = elapsed = None
+        event = RequestEvent(endpoint_of(url), status, latency, size,
+                             decode_time, credit_count, elapsed)
+        with self._lock:
+            endpoint = self._endpoints.get(event.endpoint)
+            if endpoint is None:
+                endpoint = self._endpoints[event.endpoint] = \
+                    _Endpoint(self.buckets)
+            endpoint.statuses[status] = endpoint.statuses.get(status, 0) + 1
+            endpoint.buckets[bisect.bisect_left(self.buckets, latency)] += 1
+            endpoint.latency += latency
+            endpoint.size += size
+            endpoint.decode_time += decode_time
+            endpoint.credits += credit_count or 0
+            endpoint.elapsed += elapsed or 0
+        for hook in self.hooks:
+            hook(event)
+
+    def snapshot(self):
+        """
+        Get the metrics of each endpoint.
+
+        Returns
+        -------
+        dict of dict
+            Keyed by endpoint, with requests, statuses, latency_buckets
+            (cumulative, by upper bound), latency_sum, bytes,
+            decode_seconds, credits and elapsed_ms.
+        """
+        with self._lock:
+            result = {}
+            for name, endpoint in self._endpoints.items():
+                cumulative, total = {}, 0
+                for bound, count in zip(self.buckets + (float('inf'),),
+                                        endpoint.buckets):
+                    total += count
+                    cumulative[bound] = total
+                result[name] = {
+                    'requests': endpoint.count,
+                    'statuses': dict(endpoint.statuses),
+                    'latency_buckets': cumulative,
+                    'latency_sum': endpoint.latency,
+                    'bytes': endpoint.size,
+                    'decode_seconds': endpoint.decode_time,
+                    'credits': endpoint.credits,
+                    'elapsed_ms': endpoint.elapsed,
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def to_prometheus(self, prefix='cmc_api'):
+        """Export the metrics in the Prometheus text format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help, samples):
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help))
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+            for suffix, labels, value in samples:
+                labels = ','.join('{}="{}"'.format(k, v) for k, v in labels)
+                lines.append('{}_{}{}{{{}}} {}'.format(
+                    prefix, name, suffix, labels, value))
+
+        metric('requests_total', 'counter',
+               'Requests by endpoint and HTTP status.',
+               [('', (('endpoint', name), ('status', status)), count)
+                for name, x in snapshot.items()
+                for status, count in sorted(x['statuses'].items())])
+        samples = []
+        for name, x in snapshot.items():
+            for bound, count in x['latency_buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                samples.append(('_bucket', (('endpoint', name), ('le', le)),
+                                count))
+            samples.append(('_sum', (('endpoint', name),), x['latency_sum']))
+            samples.append(('_count', (('endpoint', name),), x['requests']))
+        metric('request_duration_seconds', 'histogram',
+               'Time to get responses.', samples)
+        for key, name, help in (
+                ('bytes', 'response_bytes_total', 'Size of response bodies.'),
+                ('decode_seconds', 'decode_seconds_total',
+                 'Time spent decoding response bodies.'),
+                ('credits', 'credits_total', 'Sum of status.credit_count.'),
+                ('elapsed_ms', 'server_elapsed_milliseconds_total',
+                 'Sum of status.elapsed.')):
+            metric(name, 'counter', help,
+                   [('', (('endpoint', endpoint),), x[key])
+                    for endpoint, x in snapshot.items()])
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,617 @@
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+from .budget import estimate_credits
+from .ranges import interval_seconds
+from .times import to_timestamp, to_isoformat
+
+
+_epoch = 1577836800  # 2020-01-01
+
+
+def _isoformat(timestamp=None):
+    return to_isoformat(time.time() if timestamp is None else timestamp)
+
+
+def _price(id, timestamp=None):
+    """A deterministic price of asset id at timestamp, now by default."""
+    if timestamp is None:
+        timestamp = time.time()
+    base = 50000. / id
+    return round(base * (1 + 0.1 * ((timestamp // 300 + id) % 17 - 8) / 8.),
+                 8)
+
+
+def _asset(id):
+    return {'id': id, 'name': 'Coin {}'.format(id),
+            'symbol': 'C{}'.format(id), 'slug': 'coin-{}'.format(id)}
+
+
+def _quote(id, converts, timestamp=None, **extra):
+    timestamp = time.time() if timestamp is None else timestamp
+    quote = {}
+    for convert in converts:
+        price = _price(id, timestamp)
+        quote[convert] = dict({
+            'price': price,
+            'volume_24h': price * 1000,
+            'percent_change_1h': 0.1,
+            'percent_change_24h': -1.2,
+            'percent_change_7d': 3.4,
+            'market_cap': price * 1e6,
+            'last_updated': _isoformat(timestamp),
+        }, **extra)
+    return quote
+
+
+class _Error(Exception):
+    def __init__(self, status, message):
+        self.status = status
+        self.message = message
+
+
+class MockData:
+    """
+    Realistic payloads for every endpoint of CoinMarketCap.
+
+    Assets are generated: asset i has symbol 'Ci', slug 'coin-i' and
+    rank i, and prices depend only on the asset and the time, so the
+    same request always gets the same answer.
+
+    Parameters
+    ----------
+    assets: int, default 5000
+        Number of cryptocurrencies.
+    exchanges: int, default 500
+        Number of exchanges.
+    """
+    # Fiats and their price in USD.
+    fiats = {'USD': 1., 'EUR': 1.1, 'GBP': 1.3, 'JPY': 0.009, 'NGN': 0.0024}
+
+    def __init__(self, assets=5000, exchanges=500):
+        self.assets = assets
+        self.exchanges = exchanges
+        self.routes = {
+            '/cryptocurrency/map': self.map,
+            '/exchange/map': self.exchange_map,
+            '/fiat/map': self.fiat_map,
+            '/cryptocurrency/listings/latest': self.listings,
+            '/cryptocurrency/listings/historical': self.listings,
+            '/exchange/listings/latest': self.exchange_listings,
+            '/exchange/listings/historical': self.exchange_listings,
+            '/cryptocurrency/info': self.info,
+            '/exchange/info': self.exchange_info,
+            '/key/info': self.key_info,
+            '/cryptocurrency/quotes/latest': self.quotes,
+            '/exchange/quotes/latest': self.exchange_quotes,
+            '/global-metrics/quotes/latest': self.global_metrics,
+            '/cryptocurrency/quotes/historical': self.historical_quotes,
+            '/exchange/quotes/historical': self.historical_quotes,
+            '/global-metrics/quotes/historical':
+                self.historical_global_metrics,
+            '/cryptocurrency/ohlcv/latest': self.ohlcv,
+            '/cryptocurrency/ohlcv/historical': self.historical_ohlcv,
+            '/cryptocurrency/market-pairs/latest': self.market_pairs,
+            '/exchange/market-pairs/latest': self.market_pairs,
+            '/cryptocurrency/price-performance-stats/latest':
+                self.price_performance_stats,
+            '/tools/price-conversion': self.price_conversion,
+            '/blockchain/statistics/latest': self.blockchain_stats,
+            '/partners/flipside-crypto/fcas/listings/latest':
+                self.fcas_listings,
+            '/partners/flipside-crypto/fcas/quotes/latest': self.fcas_quotes,
+        }
+
+    def get(self, path, parameters):
+        """
+        Get the status code and json of a request.
+
+        Parameters
+        ----------
+        path: str
+            Path of the url after /v1, e.g '/cryptocurrency/map'.
+        parameters: dict of str
+        """
+        route = self.routes.get(path)
+        if route is None:
+            return 404, self.status(404, 'Not found')
+        try:
+            data = route(parameters)
+        except _Error as e:
+            return e.status, self.status(e.status, e.message)
+        res = self.status(0, None, estimate_credits(path, parameters))
+        res['data'] = data
+        return 200, res
+
+    @staticmethod
+    def status(error_code, error_message, credit_count=0):
+        return {'status': {
+            'timestamp': _isoformat(),
+            'error_code': error_code,
+            'error_message': error_message,
+            'elapsed': 5,
+            'credit_count': credit_count,
+            'notice': None,
+        }}
+
+    # Helpers
+
+    def _page(self, parameters, total):
+        start = int(parameters.get('start', 1))
+        limit = int(parameters.get('limit', 100))
+        return range(start, min(start + limit, total + 1))
+
+    def _converts(self, parameters):
+        return parameters.get('convert', 'USD').split(',')
+
+    def _ids(self, parameters, total):
+        """Resolve id, symbol or slug to a list of (key, id)."""
+        for key, parse in (('id', int),
+                           ('symbol', lambda x: int(x.lstrip('C'))),
+                           ('slug', lambda x: int(x.split('-')[-1]))):
+            if key in parameters:
+                ids = []
+                for value in parameters[key].split(','):
+                    try:
+                        id = parse(value)
+                    except ValueError:
+                        id = 0
+                    if not 0 < id <= total:
+                        raise _Error(400, 'Invalid value for "{}": "{}"'
+                                     .format(key, value))
+                    ids.append((value, id))
+                return ids
+        raise _Error(400, '"value" must contain at least one of '
+                     '[id, symbol, slug]')
+
+    def _timestamps(self, parameters, interval):
+        step = interval_seconds(parameters.get('interval', interval))
+        if 'time_start' in parameters:
+            start = to_timestamp(parameters['time_start'])
+            end = to_timestamp(parameters.get('time_end', time.time()))
+            count = min(int((end - start) // step) + 1, 10000)
+        else:
+            count = int(parameters.get('count', 10))
+            start = time.time() - step * count
+        start = start - start % step
+        return [start + i * step for i in range(count)]
+
+    # Endpoints
+
+    def map(self, parameters):
+        return [dict(_asset(i), rank=i, is_active=1, platform=None,
+                     first_historical_data=_isoformat(_epoch),
+                     last_historical_data=_isoformat())
+                for i in self._page(dict({'limit': 5000}, **parameters),
+                                    self.assets)]
+
+    def exchange_map(self, parameters):
+        return [{'id': i, 'name': 'Exchange {}'.format(i),
+                 'slug': 'exchange-{}'.format(i), 'is_active': 1,
+                 'first_historical_data': _isoformat(_epoch),
+                 'last_historical_data': _isoformat()}
+                for i in self._page(dict({'limit': 5000}, **parameters),
+                                    self.exchanges)]
+
+    def fiat_map(self, parameters):
+        return [{'id': 2781 + i, 'name': name, 'sign': '', 'symbol': name}
+                for i, name in enumerate(self.fiats)]
+
+    def _listing(self, id, converts):
+        return dict(_asset(id), cmc_rank=id, num_market_pairs=100,
+                    circulating_supply=1e6, total_supply=2e6,
+                    max_supply=None, date_added=_isoformat(_epoch),
+                    last_updated=_isoformat(), tags=['mineable'],
+                    platform=None, quote=_quote(id, converts))
+
+    def listings(self, parameters):
+        converts = self._converts(parameters)
+        return [self._listing(i, converts)
+                for i in self._page(parameters, self.assets)]
+
+    def exchange_listings(self, parameters):
+        converts = self._converts(parameters)
+        return [{'id': i, 'name': 'Exchange {}'.format(i),
+                 'slug': 'exchange-{}'.format(i), 'num_market_pairs': 100,
+                 'last_updated': _isoformat(),
+                 'quote': {c: {'volume_24h': 1e6 / i,
+                               'percent_change_volume_24h': 1.5}
+                           for c in converts}}
+                for i in self._page(parameters, self.exchanges)]
+
+    def info(self, parameters):
+        return {key: dict(_asset(id), category='coin',
+                          logo='https://example.com/{}.png'.format(id),
+                          description='Coin number {}.'.format(id),
+                          date_added=_isoformat(_epoch), tags=[],
+                          platform=None,
+                          urls={'website': [], 'explorer': []})
+                for key, id in self._ids(parameters, self.assets)}
+
+    def exchange_info(self, parameters):
+        return {key: {'id': id, 'name': 'Exchange {}'.format(id),
+                      'slug': 'exchange-{}'.format(id),
+                      'logo': 'https://example.com/e{}.png'.format(id),
+                      'date_launched': _isoformat(_epoch),
+                      'urls': {'website': []}}
+                for key, id in self._ids(parameters, self.exchanges)}
+
+    def key_info(self, parameters):
+        return {
+            'plan': {
+                'credit_limit_daily': 4000,
+                'credit_limit_daily_reset_timestamp': _isoformat(
+                    time.time() // 86400 * 86400 + 86400),
+                'credit_limit_monthly': 120000,
+                'rate_limit_minute': 60,
+            },
+            'usage': {
+                'current_minute': {'requests_made': 0, 'requests_left': 60},
+                'current_day': {'credits_used': 0, 'credits_left': 4000},
+                'current_month': {'credits_used': 0,
+                                  'credits_left': 120000},
+            },
+        }
+
+    def quotes(self, parameters):
+        converts = self._converts(parameters)
+        return {key: self._listing(id, converts)
+                for key, id in self._ids(parameters, self.assets)}
+
+    def exchange_quotes(self, parameters):
+        converts = self._converts(parameters)
+        return {key: {'id': id, 'name': 'Exchange {}'.format(id),
+                      'slug': 'exchange-{}'.format(id),
+                      'num_market_pairs': 100, 'last_updated': _isoformat(),
+                      'quote': {c: {'volume_24h': 1e6 / id}
+                                for c in converts}}
+                for key, id in self._ids(parameters, self.exchanges)}
+
+    def global_metrics(self, parameters):
+        converts = self._converts(parameters)
+        return {'active_cryptocurrencies': self.assets,
+                'active_exchanges': self.exchanges,
+                'btc_dominance': 60.5, 'eth_dominance': 10.2,
+                'last_updated': _isoformat(),
+                'quote': {c: {'total_market_cap': 1e12,
+                              'total_volume_24h': 1e11,
+                              'last_updated': _isoformat()}
+                          for c in converts}}
+
+    def _history(self, id, parameters):
+        converts = self._converts(parameters)
+        quotes = []
+        for t in self._timestamps(parameters, '5m'):
+            quote = {c: {'price': _price(id, t),
+                         'volume_24h': _price(id, t) * 1000,
+                         'market_cap': _price(id, t) * 1e6,
+                         'timestamp': _isoformat(t)} for c in converts}
+            quotes.append({'timestamp': _isoformat(t), 'quote': quote})
+        return dict(_asset(id), is_active=1, is_fiat=0, quotes=quotes)
+
+    def historical_quotes(self, parameters):
+        ids = self._ids(parameters, self.assets)
+        if len(ids) == 1:
+            return self._history(ids[0][1], parameters)
+        return {key: self._history(id, parameters) for key, id in ids}
+
+    def historical_global_metrics(self, parameters):
+        converts = self._converts(parameters)
+        return {'quotes': [
+            {'timestamp': _isoformat(t),
+             'quote': {c: {'total_market_cap': 1e12, 'total_volume_24h': 1e11,
+                           'timestamp': _isoformat(t)} for c in converts}}
+            for t in self._timestamps(parameters, '1d')]}
+
+    def _ohlcv(self, id, t, step, converts):
+        prices = [_price(id, t + step * x / 4.) for x in range(5)]
+        return {c: {'open': prices[0], 'high': max(prices),
+                    'low': min(prices), 'close': prices[-1],
+                    'volume': prices[-1] * 1000,
+                    'market_cap': prices[-1] * 1e6,
+                    'timestamp': _isoformat(t + step - 1)}
+                for c in converts}
+
+    def ohlcv(self, parameters):
+        converts = self._converts(parameters)
+        now = time.time()
+        start = now - now % 86400
+        return {key: dict(_asset(id), last_updated=_isoformat(now),
+                          time_open=_isoformat(start), time_close=None,
+                          quote=self._ohlcv(id, start, now - start + 1,
+                                            converts))
+                for key, id in self._ids(parameters, self.assets)}
+
+    def historical_ohlcv(self, parameters):
+        converts = self._converts(parameters)
+        step = interval_seconds(parameters.get('time_period', 'daily'))
+        id = self._ids(parameters, self.assets)[0][1]
+        quotes = [{'time_open': _isoformat(t),
+                   'time_close': _isoformat(t + step - 1),
+                   'time_high': _isoformat(t + step / 2.),
+                   'time_low': _isoformat(t + step / 4.),
+                   'quote': self._ohlcv(id, t, step, converts)}
+                  for t in self._timestamps(parameters, 'daily')]
+        return dict(_asset(id), quotes=quotes)
+
+    def market_pairs(self, parameters):
+        converts = self._converts(parameters)
+        id = self._ids(parameters, self.assets)[0][1]
+        total = 1000
+        pairs = []
+        for i in self._page(parameters, total):
+            exchange = i % self.exchanges + 1
+            quote = {'exchange_reported': {
+                'price': _price(id), 'volume_24h_base': 100.,
+                'volume_24h_quote': 100. * _price(id),
+                'last_updated': _isoformat()}}
+            quote.update({c: {'price': _price(id), 'volume_24h': 1e5,
+                              'last_updated': _isoformat()}
+                          for c in converts})
+            pairs.append({
+                'exchange': {'id': exchange,
+                             'name': 'Exchange {}'.format(exchange),
+                             'slug': 'exchange-{}'.format(exchange)},
+                'market_id': id * total + i,
+                'market_pair': 'C{}/USD'.format(id),
+                'category': 'spot', 'fee_type': 'percentage',
+                'market_pair_base': {'currency_id': id,
+                                     'currency_symbol': 'C{}'.format(id),
+                                     'exchange_symbol': 'C{}'.format(id),
+                                     'currency_type': 'cryptocurrency'},
+                'market_pair_quote': {'currency_id': 2781,
+                                      'currency_symbol': 'USD',
+                                      'exchange_symbol': 'USD',
+                                      'currency_type': 'fiat'},
+                'quote': quote,
+            })
+        return dict(_asset(id), num_market_pairs=total, market_pairs=pairs)
+
+    def price_performance_stats(self, parameters):
+        converts = self._converts(parameters)
+        periods = parameters.get('time_period', 'all_time').split(',')
+        result = {}
+        for key, id in self._ids(parameters, self.assets):
+            price = _price(id)
+            stats = {period: {
+                'open_timestamp': _isoformat(_epoch),
+                'high_timestamp': _isoformat(_epoch),
+                'low_timestamp': _isoformat(_epoch),
+                'close_timestamp': _isoformat(),
+                'quote': {c: {'open': price, 'high': price * 1.5,
+                              'low': price / 2., 'close': price,
+                              'percent_change': 0, 'price_change': 0}
+                          for c in converts}} for period in periods}
+            result[key] = dict(_asset(id), last_updated=_isoformat(),
+                               periods=stats)
+        return result
+
+    def _fiat(self, symbol):
+        return {'id': 2781 + list(self.fiats).index(symbol), 'name': symbol,
+                'symbol': symbol}
+
+    def price_conversion(self, parameters):
+        if 'amount' not in parameters:
+            raise _Error(400, '"amount" is required')
+        amount = float(parameters['amount'])
+        symbol = parameters.get('symbol')
+        if symbol in self.fiats:
+            asset, price = self._fiat(symbol), self.fiats[symbol]
+        else:
+            id = self._ids(parameters, self.assets)[0][1]
+            asset, price = _asset(id), _price(id)
+        quote = {}
+        for convert in self._converts(parameters):
+            if convert in self.fiats:
+                target = self.fiats[convert]
+            else:
+                target = _price(self._ids({'symbol': convert},
+                                          self.assets)[0][1])
+            quote[convert] = {'price': amount * price / target,
+                              'last_updated': _isoformat()}
+        return dict(asset, amount=amount, last_updated=_isoformat(),
+                    quote=quote)
+
+    def blockchain_stats(self, parameters):
+        return {key: {'id': id, 'slug': 'coin-{}'.format(id),
+                      'symbol': 'C{}'.format(id),
+                      'block_reward_static': 6.25,
+                      'consensus_mechanism': 'proof-of-work',
+                      'difficulty': '1', 'hashrate_24h': '1',
+                      'pending_transactions': 100, 'reduction_rate': '50%',
+                      'total_blocks': 600000, 'total_transactions': '1',
+                      'tps_24h': 3.5,
+                      'first_block_timestamp': _isoformat(_epoch)}
+                for key, id in self._ids(parameters, self.assets)}
+
+    def _fcas(self, id):
+        return dict(_asset(id), score=900 - id % 500, grade='A',
+                    percent_change_24h=0.1, point_change_24h=1,
+                    last_updated=_isoformat())
+
+    def fcas_listings(self, parameters):
+        return [self._fcas(i) for i in self._page(parameters, self.assets)]
+
+    def fcas_quotes(self, parameters):
+        return {key: self._fcas(id)
+                for key, id in self._ids(parameters, self.assets)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, which Nagle's algorithm
+    # would hold back until the delayed ACK of the client.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server.mock
+        url = urlparse(self.path)
+        parameters = dict(parse_qsl(url.query))
+        path = url.path[len('/v1'):] if url.path.startswith('/v1') \
+            else url.path
+        headers = {}
+        outcome, delay = server._draw()
+        if delay:
+            time.sleep(delay)
+        if outcome == 429:
+            status, res = 429, MockData.status(1008, 'Rate limit reached')
+            headers['Retry-After'] = str(server.retry_after)
+        elif outcome == 500:
+            status, res = 500, MockData.status(500, 'Internal error')
+        else:
+            status, res = server.data.get(path, parameters)
+        body = json.dumps(res).encode()
+        if server.compress and 'gzip' in self.headers.get(
+                'Accept-Encoding', ''):
+            body = gzip.compress(body, 1)
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        server._count(path, status)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Many clients connect at once, and the default backlog of 5
+    # makes the others retry after a second.
+    request_queue_size = 128
+
+
+class MockServer:
+    """
+    A local server imitating coinmarketcap pro-api.
+
+    It serves MockData for every endpoint of CoinMarketCap, with
+    optional latency, server errors and HTTP 429 to test clients
+    and measure their overhead offline.
+
+    Parameters
+    ----------
+    host: str, default '127.0.0.1'
+    port: int, default 0
+        0 picks a free port.
+    latency: float or (float, float), default 0
+        Seconds added to every response, or a range to draw from.
+    error_rate: float, default 0
+        Fraction of requests answered with HTTP 500.
+    rate_limit_rate: float, default 0
+        Fraction of requests answered with HTTP 429.
+    retry_after: int, default 1
+        Retry-After header of HTTP 429.
+    compress: bool, default True
+        Gzip responses when the client accepts it.
+    seed: int, optional
+        Seed of the random draws of latency, errors and 429.
+    data: MockData, optional
+
+    Attributes
+    ----------
+    MockServer.url: str
+        Base url to use as CoinMarketCap.BASE_URL.
+    MockServer.requests: dict
+        Number of requests by (path, status).
+
+    Examples
+    --------
+    >>> with MockServer(latency=0.05, error_rate=0.01) as server:
+    ...     cmc = CoinMarketCap(root='sandbox')
+    ...     cmc.BASE_URL = server.url
+    ...     cmc.listings()
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, error_rate=0,
+                 rate_limit_rate=0, retry_after=1, compress=True, seed=None,
+                 data=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.compress = compress
+        self.data = data or MockData()
+        self.requests = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}/v1'.format(host, port)
+
+    def _draw(self):
+        """Draw the outcome and delay of a request."""
+        with self._lock:
+            if isinstance(self.latency, (tuple, list)):
+                delay = self._random.uniform(*self.latency)
+            else:
+                delay = self.latency
+            x = self._random.random()
+        if x < self.rate_limit_rate:
+            return 429, delay
+        if x < self.rate_limit_rate + self.error_rate:
+            return 500, delay
+        return 200, delay
+
+    def _count(self, path, status):
+        with self._lock:
+            key = (path, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def start(self):
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    """Run a MockServer until interrupted, printing its url."""
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Serve a local imitation of coinmarketcap pro-api.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+    server = MockServer(args.host, args.port, latency=args.latency,
+                        error_rate=args.error_rate,
+                        rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    print(server.url, flush=True)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import re
+from .times import to_timestamp, to_isoformat
+
+
+_named_intervals = {
+    'hourly': 60 * 60,
+    'daily': 24 * 60 * 60,
+    'weekly': 7 * 24 * 60 * 60,
+    'monthly': 30 * 24 * 60 * 60,
+    'yearly': 365 * 24 * 60 * 60,
+}
+_units = {'m': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+# Field used to order and de-duplicate quotes of each kind.
+time_fields = {'quotes': 'timestamp', 'ohlcv': 'time_open'}
+
+
+def interval_seconds(interval):
+    """Get the length of an interval such as '5m', '2h', 'daily' in seconds."""
+    if interval in _named_intervals:
+        return _named_intervals[interval]
+    match = re.match(r'^(\d+)([mhd])$', str(interval))
+    if match is None:
+        raise ValueError('Invalid interval ({}) provided.'.format(interval))
+    return int(match.group(1)) * _units[match.group(2)]
+
+
+def plan_windows(time_start, time_end, interval, max_count=10000):
+    """
+    Split [time_start, time_end] into windows of at most max_count intervals.
+
+    Parameters
+    ----------
+    time_start, time_end: unix timestamp, ISO 8601 str, date or datetime
+    interval: str
+        e.g '5m', 'hourly', 'daily'.
+    max_count: int, default 10000
+        Maximum number of quotes the server returns for one request.
+
+    Returns
+    -------
+    windows: list of (start, end) unix timestamps
+    """
+    start = to_timestamp(time_start)
+    end = to_timestamp(time_end)
+    length = interval_seconds(interval) * max_count
+    windows = []
+    while start <= end:
+        windows.append((start, min(start + length - 1, end)))
+        start += length
+    return windows
+
+
+def plan_dates(time_start, time_end, interval='daily'):
+    """Get the dates of historical_listings snapshots within a range."""
+    step = interval_seconds(interval)
+    start = to_timestamp(time_start)
+    end = to_timestamp(time_end)
+    dates = []
+    while start <= end:
+        dates.append(to_isoformat(start))
+        start += step
+    return dates
+
+
+def window_parameters(parameters, windows):
+    """Get the parameters of the request for each window."""
+    return [dict(parameters, time_start=to_isoformat(start),
+                 time_end=to_isoformat(end)) for start, end in windows]
+
+
+def merge_history(results, kind):
+    """
+    Merge data of historical_quotes or historical_ohlcv of several windows.
+
+    Quotes of each asset are ordered by time and de-duplicated.
+    """
+    field = time_fields[kind]
+    single = any('quotes' in data for data in results)
+    assets = {}
+    for data in results:
+        for key, asset in ({'': data} if single else data).items():
+            merged = assets.get(key)
+            if merged is None:
+                merged = assets[key] = dict(asset, quotes={})
+            for quote in asset.get('quotes', []):
+                merged['quotes'][quote[field]] = quote
+    for asset in assets.values():
+        asset['quotes'] = [asset['quotes'][t] for t in sorted(asset['quotes'])]
+    if single:
+        return assets.get('', {'quotes': []})
+    return assets
+
+
+def merge_listings(results):
+    """Merge historical_listings snapshots, de-duplicating records."""
+    merged = {}
+    for data in results:
+        for record in data:
+            merged[(record.get('id'), record.get('last_updated'))] = record
+    return list(merged.values())
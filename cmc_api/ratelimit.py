@@ -0,0 +1,114 @@
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+def retry_after(headers, default=60):
+    """
+    Get the number of seconds to wait from a Retry-After header.
+
+    The header may hold either seconds or an HTTP date.
+    coinmarketcap resets its rate limit every minute,
+    hence the default of 60 seconds.
+    """
+    value = headers.get('Retry-After')
+    if value is None:
+        return default
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def credit_count(res):
+    """Get status.credit_count of a response json, defaulting to 1."""
+    try:
+        return res['status']['credit_count'] or 0
+    except (KeyError, TypeError):
+        return 1
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket for the per-minute limits of a plan.
+
+    Each request takes one call token. Once the response arrives, its
+    status.credit_count is taken from the credit bucket, so expensive
+    calls slow down the following ones before the server complains.
+    Requests that exceed the limits are queued instead of failing.
+
+    Parameters
+    ----------
+    calls_per_minute: int, default 30
+        Maximum number of calls per minute.
+        30 is the limit of the basic plan.
+    credits_per_minute: int, optional
+        Maximum number of credits per minute.
+    max_retries: int, default 3
+        Number of times a request is retried after HTTP 429.
+    """
+
+    def __init__(self, calls_per_minute=30, credits_per_minute=None,
+                 max_retries=3):
+        self.calls_per_minute = calls_per_minute
+        self.credits_per_minute = credits_per_minute
+        self.max_retries = max_retries
+        self._calls = float(calls_per_minute)
+        self._credits = float(credits_per_minute or 0)
+        self._blocked_until = 0
+        self._updated = self._clock()
+        self._lock = threading.Lock()
+
+    # Clock of the token buckets. SharedRateLimiter uses the wall clock,
+    # which is the same in every process.
+    _clock = staticmethod(time.monotonic)
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self._calls = min(self._calls + elapsed * self.calls_per_minute / 60.,
+                          self.calls_per_minute)
+        if self.credits_per_minute:
+            self._credits = min(
+                self._credits + elapsed * self.credits_per_minute / 60.,
+                self.credits_per_minute)
+
+    def reserve(self):
+        """
+        Take a call token and get how many seconds to wait before sending.
+
+        Tokens may go negative, which queues callers in arrival order.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self._calls -= 1
+            wait = max(-self._calls * 60. / self.calls_per_minute,
+                       self._blocked_until - now, 0)
+            if self.credits_per_minute and self._credits < 0:
+                wait = max(wait, -self._credits * 60. / self.credits_per_minute)
+            return wait
+
+    def acquire(self):
+        """Block until a request can be sent."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def consume(self, credits):
+        """Take the credits used by a response from the credit bucket."""
+        if not self.credits_per_minute:
+            return
+        with self._lock:
+            self._refill(self._clock())
+            self._credits -= credits
+
+    def pause(self, seconds):
+        """Hold every request for seconds, e.g after HTTP 429."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until,
+                                      self._clock() + seconds)
@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import namedtuple
+from .times import to_timestamp
+from .watch import iter_records
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+Conversion = namedtuple('Conversion', ['amount', 'as_of', 'stale'])
+Conversion.__doc__ = """
+Amounts converted by RateTable.convert.
+
+amount: numpy.ndarray
+as_of: numpy.ndarray
+    Unix time of the oldest price used for each amount,
+    nan when only the base currency was involved.
+stale: numpy.ndarray of bool
+    Whether as_of is older than max_age.
+"""
+
+
+class RateTable:
+    """
+    A local table of prices to convert amounts between any two assets.
+
+    Prices of cryptocurrencies and fiats are kept in one base currency,
+    so the rate of any pair is the ratio of their prices. Amounts are
+    converted as whole numpy arrays, and price_conversion is only
+    called for assets missing from the table.
+
+    Parameters
+    ----------
+    client: CoinMarketCap, optional
+        Client used by refresh and for missing assets.
+        Without it missing assets raise KeyError.
+    base: str, default 'USD'
+        Currency prices are kept in.
+    max_age: float, optional
+        Seconds after which prices are marked stale.
+
+    Examples
+    --------
+    >>> rates = RateTable(cmc)
+    >>> rates.refresh(limit=500, fiats=['EUR', 'NGN'])
+    >>> rates.convert([1, 2.5], 'BTC', 'EUR').amount
+    """
+
+    def __init__(self, client=None, base='USD', max_age=None):
+        if np is None:
+            raise ImportError('numpy is required for RateTable.')
+        self.client = client
+        self.base = base
+        self.max_age = max_age
+        self._index = {base: 0}
+        self._ranks = {0: -1}
+        self._prices = [1.]
+        self._updated = [np.nan]
+        self._arrays = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(key):
+        """ids are int and symbols are upper case str."""
+        if isinstance(key, str):
+            return int(key) if key.isdigit() else key.upper()
+        return int(key)
+
+    def set_price(self, price, updated, id=None, symbol=None, rank=None):
+        """
+        Set the price of an asset in the base currency.
+
+        A symbol shared by several assets refers to the best ranked one.
+        """
+        updated = to_timestamp(updated) if updated is not None else np.nan
+        with self._lock:
+            position = self._index.get(id) if id is not None else None
+            if position is None and id is None:
+                position = self._index.get(self._key(symbol))
+            if position is None:
+                position = len(self._prices)
+                self._prices.append(price)
+                self._updated.append(updated)
+            else:
+                self._prices[position] = price
+                self._updated[position] = updated
+            if id is not None:
+                self._index[id] = position
+            if symbol is not None:
+                symbol = self._key(symbol)
+                other = self._index.get(symbol)
+                rank = float('inf') if rank is None else rank
+                if other is None or other == position or \
+                        rank < self._ranks.get(other, float('inf')):
+                    self._index[symbol] = position
+                self._ranks[position] = rank
+            self._arrays = None
+
+    def add_quotes(self, data):
+        """
+        Add the prices of quotes or listings data.
+
+        data must have been requested with convert=base.
+        """
+        for record in iter_records(data):
+            quote = record.get('quote', {}).get(self.base)
+            if not quote or quote.get('price') is None:
+                continue
+            self.set_price(quote['price'],
+                           quote.get('last_updated',
+                                     record.get('last_updated')),
+                           record.get('id'), record.get('symbol'),
+                           record.get('cmc_rank', record.get('rank')))
+
+    def _add_conversion(self, data):
+        quote = data['quote'][self.base]
+        self.set_price(quote['price'] / float(data['amount']),
+                       quote.get('last_updated', data.get('last_updated')),
+                       data.get('id'), data.get('symbol'))
+
+    def refresh(self, ids=None, limit=None, fiats=()):
+        """
+        Update prices with the client.
+
+        Parameters
+        ----------
+        ids: list of int, optional
+            Get quotes of these cryptocurrencies.
+        limit: int, optional
+            Get listings of the top limit cryptocurrencies.
+        fiats: list of str, optional
+            Fiat symbols to get with price_conversion.
+        """
+        if ids:
+            self.add_quotes(self.client.quotes(id=list(ids),
+                                               convert=self.base))
+        if limit:
+            self.add_quotes(self.client.listings(limit=limit,
+                                                 convert=self.base))
+        for fiat in fiats:
+            self._add_conversion(self.client.price_conversion(
+                amount=1, symbol=fiat, convert=self.base))
+
+    def _fetch(self, key):
+        """Get the price of a missing asset from price_conversion."""
+        if self.client is None:
+            raise KeyError(key)
+        name = 'id' if isinstance(key, int) else 'symbol'
+        self._add_conversion(self.client.price_conversion(
+            amount=1, convert=self.base, **{name: key}))
+
+    def _get_arrays(self):
+        arrays = self._arrays
+        if arrays is None:
+            with self._lock:
+                arrays = self._arrays = (np.array(self._prices, dtype='f8'),
+                                         np.array(self._updated, dtype='f8'))
+        return arrays
+
+    def _positions(self, keys):
+        """Positions of a key or array of keys, fetching missing ones."""
+        if np.ndim(keys) == 0:
+            unique, inverse = [keys], None
+        else:
+            unique, inverse = np.unique(np.asarray(keys), return_inverse=True)
+        positions = []
+        for key in unique:
+            key = self._key(key.item() if hasattr(key, 'item') else key)
+            if key not in self._index:
+                self._fetch(key)
+            positions.append(self._index[key])
+        positions = np.array(positions)
+        if inverse is None:
+            return positions[0]
+        return positions[inverse.reshape(np.shape(keys))]
+
+    def __contains__(self, key):
+        return self._key(key) in self._index
+
+    def rate(self, source, target):
+        """Get the price of one source in target."""
+        return float(self.convert(1, source, target).amount)
+
+    def matrix(self, keys):
+        """
+        Get the cross rates of keys.
+
+        Returns
+        -------
+        numpy.ndarray
+            matrix[i, j] is the price of keys[i] in keys[j].
+        """
+        prices = self._get_arrays()[0][self._positions(keys)]
+        return np.outer(prices, 1. / prices)
+
+    def convert(self, amount, source, target):
+        """
+        Convert amounts from source to target.
+
+        Parameters
+        ----------
+        amount: float or array-like
+        source, target: id, symbol or array-like of them
+            Arrays must broadcast with amount.
+
+        Returns
+        -------
+        Conversion
+        """
+        source = self._positions(source)
+        target = self._positions(target)
+        prices, updated = self._get_arrays()
+        converted = np.asarray(amount, dtype='f8') * prices[source] / \
+            prices[target]
+        as_of = np.broadcast_to(np.fmin(updated[source], updated[target]),
+                                np.shape(converted))
+        if self.max_age is None:
+            stale = np.zeros(np.shape(as_of), dtype=bool)
+        else:
+            stale = as_of < time.time() - self.max_age
+        return Conversion(converted, as_of, stale)
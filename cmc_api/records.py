@@ -0,0 +1,264 @@
+import json
+import re
+from collections.abc import Mapping
+from .decoders import get_decoder
+
+_string = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+
+
+def _nested(depth):
+    """
+    Build a pattern of the content of an object or array nested up to
+    depth levels. Each alternative starts with a different character,
+    so a match can fail without backtracking.
+    """
+    pattern = rb'(?:[^"{}\[\]]|' + _string + rb')*'
+    for _ in range(depth):
+        pattern = (rb'(?:[^"{}\[\]]|' + _string + rb'|\{' + pattern +
+                   rb'\}|\[' + pattern + rb'\])*')
+    return pattern
+
+
+_content = _nested(6)
+_object = re.compile(rb'\{' + _content + rb'\}')
+_value = re.compile(_string + rb'|\{' + _content + rb'\}|\[' + _content +
+                    rb'\]|[^,}\]\s]+')
+_key = re.compile(_string)
+_whitespace = re.compile(rb'[ \t\n\r]*')
+
+
+class Record(Mapping):
+    """
+    A record decoded from its json only when one of its fields is read.
+
+    Records keep the bytes of their json until then, which are not
+    tracked by the garbage collector, instead of a tree of dicts.
+    They are read only mappings, e.g record['quote']['USD']['price'],
+    and their main fields are also attributes, e.g record.symbol.
+    Missing fields are None as attributes.
+    """
+    __slots__ = ('_raw', '_data')
+    _fields = ()
+    _loads = staticmethod(get_decoder())
+
+    def __init__(self, raw=None, data=None):
+        self._raw = raw
+        self._data = data
+
+    def _load(self):
+        data = self._data
+        if data is None:
+            raw = self._raw
+            if raw is None:
+                # Another thread decoded it in the meantime.
+                return self._data
+            data = self._data = self._loads(raw)
+            self._raw = None
+        return data
+
+    @property
+    def loaded(self):
+        """Whether the json was decoded."""
+        return self._data is not None
+
+    def __getattr__(self, name):
+        if name in type(self)._fields:
+            return self._load().get(name)
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self._fields))
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self._load())
+
+    def __reduce__(self):
+        return (type(self), (self._raw, self._data))
+
+    def to_dict(self):
+        """Get the record as a dict."""
+        return dict(self._load())
+
+
+class Listing(Record):
+    """A record of listings."""
+    __slots__ = ()
+    _fields = ('id', 'name', 'symbol', 'slug', 'cmc_rank', 'num_market_pairs',
+               'circulating_supply', 'total_supply', 'max_supply',
+               'last_updated', 'date_added', 'tags', 'platform', 'quote')
+
+
+class Quote(Listing):
+    """A record of latest quotes."""
+    __slots__ = ()
+    _fields = Listing._fields + ('is_active', 'is_fiat')
+
+
+class OHLCV(Record):
+    """A record of latest OHLCV, or a bar of historical OHLCV."""
+    __slots__ = ()
+    _fields = ('id', 'name', 'symbol', 'last_updated', 'time_open',
+               'time_close', 'time_high', 'time_low', 'quote')
+
+
+class MarketPair(Record):
+    """A record of market pairs."""
+    __slots__ = ()
+    _fields = ('exchange', 'market_id', 'market_pair', 'category',
+               'fee_type', 'market_pair_base', 'market_pair_quote', 'quote')
+
+
+# Record class, whether data is keyed by id, and the key of the records
+# in data if it is one object, for each kind of records.
+KINDS = {
+    'listings': (Listing, False, None),
+    'quotes': (Quote, True, None),
+    'ohlcv': (OHLCV, True, None),
+    'historical_ohlcv': (OHLCV, False, 'quotes'),
+    'market_pairs': (MarketPair, False, 'market_pairs'),
+}
+
+
+class _Cursor:
+    """Walk through the json of a response without decoding it."""
+
+    def __init__(self, content):
+        self.content = content
+        self.pos = 0
+
+    def peek(self):
+        self.pos = _whitespace.match(self.content, self.pos).end()
+        return self.content[self.pos:self.pos+1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expected {!r} at {} of the json body.'.format(
+                char, self.pos))
+        self.pos += 1
+
+    def match(self, pattern):
+        self.peek()
+        match = pattern.match(self.content, self.pos)
+        if match is None:
+            raise ValueError('Invalid json at {} of the body.'.format(
+                self.pos))
+        self.pos = match.end()
+        return match.group()
+
+    def keys(self):
+        """Iterate over the keys of an object, the caller reading values."""
+        self.expect(b'{')
+        while self.peek() != b'}':
+            key = json.loads(self.match(_key))
+            self.expect(b':')
+            yield key
+            if self.peek() == b',':
+                self.pos += 1
+        self.pos += 1
+
+    def items(self):
+        """Iterate over the items of an array, the caller reading them."""
+        self.expect(b'[')
+        while self.peek() != b']':
+            yield
+            if self.peek() == b',':
+                self.pos += 1
+        self.pos += 1
+
+
+def _split(cursor, kind, loads):
+    """Split data at the cursor into records."""
+    cls, keyed, nested = KINDS[kind]
+    char = cursor.peek()
+    if nested is not None and char == b'{':
+        data = {}
+        for key in cursor.keys():
+            if key == nested and cursor.peek() == b'[':
+                data[key] = [cls(cursor.match(_object))
+                             for _ in cursor.items()]
+            else:
+                data[key] = loads(cursor.match(_value))
+        return data
+    if keyed and char == b'{':
+        return {key: cls(cursor.match(_object)) for key in cursor.keys()}
+    if not keyed and nested is None and char == b'[':
+        return [cls(cursor.match(_object)) for _ in cursor.items()]
+    return loads(cursor.match(_value))
+
+
+def wrap_records(data, kind):
+    """
+    Wrap records of decoded data, e.g for bodies that could not be split
+    or data read back from a cache. Records already wrapped are kept.
+    """
+    cls, keyed, nested = KINDS[kind]
+
+    def wrap(value):
+        return value if isinstance(value, Record) else cls(data=value)
+
+    if nested is not None and isinstance(data, dict) and \
+            isinstance(data.get(nested), list):
+        return dict(data, **{nested: [wrap(x) for x in data[nested]]})
+    if keyed and isinstance(data, dict):
+        return {key: wrap(value) for key, value in data.items()}
+    if not keyed and nested is None and isinstance(data, list):
+        return [wrap(x) for x in data]
+    return data
+
+
+def unwrap_records(data):
+    """Turn the records of data back into dicts, e.g to store it as json."""
+    if isinstance(data, Record):
+        return data.to_dict()
+    if isinstance(data, dict):
+        return {key: unwrap_records(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [unwrap_records(x) for x in data]
+    return data
+
+
+def decode_records(content, kind, loads=None):
+    """
+    Decode a json body, leaving the records of data undecoded.
+
+    Parameters
+    ----------
+    content: bytes
+        Body of the response.
+    kind: {'listings', 'quotes', 'ohlcv', 'historical_ohlcv', 'market_pairs'}
+        Endpoint the body comes from.
+    loads: function, optional
+        Function decoding json from bytes, used for values other
+        than records e.g status.
+
+    Returns
+    -------
+    res: dict
+        The response json, with Record objects in data.
+    """
+    loads = loads or get_decoder()
+    cursor = _Cursor(content)
+    try:
+        res = {}
+        for key in cursor.keys():
+            if key == 'data':
+                res[key] = _split(cursor, kind, loads)
+            else:
+                res[key] = loads(cursor.match(_value))
+        return res
+    except ValueError:
+        # Records nested deeper than the patterns allow, or invalid json.
+        res = loads(content)
+        if isinstance(res, dict) and 'data' in res:
+            res['data'] = wrap_records(res['data'], kind)
+        return res
@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlparse
+from .cache import cache_key
+from .decoders import RawResponse
+from .exceptions import ReplayMissException
+from .times import to_timestamp
+
+_time_parameters = ('time_start', 'time_end', 'date')
+
+
+def _normalize(key, value, time_tolerance):
+    """Normalize a parameter value for fuzzy matching."""
+    value = str(value)
+    if key in _time_parameters and time_tolerance:
+        try:
+            return to_timestamp(value)
+        except ValueError:
+            return value
+    if ',' in value:
+        return frozenset(x.strip().upper() for x in value.split(','))
+    return value.upper()
+
+
+class Tape:
+    """
+    An archive of responses to record and replay requests.
+
+    Responses are kept zlib-compressed in sqlite, indexed by url and
+    parameters, so that replays run at disk speed without network,
+    credits or rate limits.
+
+    Parameters
+    ----------
+    path: str
+        Path to the sqlite database file.
+    mode: {'auto', 'record', 'replay'}, default 'auto'
+        'record' always sends requests and records their responses.
+        'replay' only replays, and raises ReplayMissException for
+        requests that were never recorded. 'auto' replays recorded
+        requests and records the others.
+    match: {'exact', 'fuzzy'}, default 'exact'
+        'exact' replays responses of the same url and parameters.
+        'fuzzy' also ignores the order and case of lists such as
+        id='1,2', the parameters in ignore, and differences of up to
+        time_tolerance seconds in time_start, time_end and date.
+    ignore: sequence of str, optional
+        Parameters ignored by fuzzy matching.
+    time_tolerance: float, default 0
+        Seconds of difference allowed in times by fuzzy matching.
+
+    Examples
+    --------
+    >>> cmc = CoinMarketCap(tape=Tape('research.db', mode='auto'))
+    >>> cmc.listings()  # sent and recorded
+    >>> cmc.listings()  # replayed
+    """
+
+    def __init__(self, path, mode='auto', match='exact', ignore=(),
+                 time_tolerance=0):
+        if mode not in ('auto', 'record', 'replay'):
+            raise ValueError(
+                "Invalid mode ({}) provided. "
+                "Valid options are: {{auto,record,replay}}".format(mode))
+        if match not in ('exact', 'fuzzy'):
+            raise ValueError(
+                "Invalid match ({}) provided. "
+                "Valid options are: {{exact,fuzzy}}".format(match))
+        self.path = path
+        self.mode = mode
+        self.match = match
+        self.ignore = frozenset(ignore)
+        self.time_tolerance = time_tolerance
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, '
+            'path TEXT, parameters TEXT, status INTEGER, headers TEXT, '
+            'body BLOB, recorded REAL)')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS responses_path ON responses (path)')
+
+    @staticmethod
+    def _key(path, parameters):
+        # Hosts are left out, so that sandbox recordings replay anywhere.
+        return cache_key(path, parameters)
+
+    def _matches(self, parameters, recorded):
+        keys = (set(parameters) | set(recorded)) - self.ignore
+        for key in keys:
+            if key not in parameters or key not in recorded:
+                return False
+            a = _normalize(key, parameters[key], self.time_tolerance)
+            b = _normalize(key, recorded[key], self.time_tolerance)
+            if isinstance(a, float) and isinstance(b, float):
+                if abs(a - b) > self.time_tolerance:
+                    return False
+            elif a != b:
+                return False
+        return True
+
+    def find(self, url, parameters):
+        """Get the recorded RawResponse of a request, or None."""
+        path = urlparse(url).path
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, headers, body FROM responses WHERE key = ?',
+                (self._key(path, parameters),)).fetchone()
+            if row is None and self.match == 'fuzzy':
+                for candidate in self._conn.execute(
+                        'SELECT status, headers, body, parameters FROM '
+                        'responses WHERE path = ? ORDER BY recorded DESC',
+                        (path,)):
+                    if self._matches(parameters, json.loads(candidate[3])):
+                        row = candidate[:3]
+                        break
+        if row is None:
+            return None
+        return RawResponse(row[0], zlib.decompress(row[2]),
+                           json.loads(row[1]))
+
+    def replay(self, url, parameters):
+        """
+        Get the response to replay for a request.
+
+        Returns
+        -------
+        RawResponse or None
+            None if the request has to be sent.
+
+        Raises
+        ------
+        ReplayMissException
+            If mode is 'replay' and the request was never recorded.
+        """
+        if self.mode == 'record':
+            return None
+        response = self.find(url, parameters)
+        if response is None and self.mode == 'replay':
+            raise ReplayMissException(
+                'No recorded response for {}.'.format(
+                    cache_key(url, parameters)))
+        return response
+
+    def record(self, url, parameters, response):
+        """Record the response of a request, unless it is a transient error."""
+        if response.status_code == 429 or response.status_code >= 500:
+            return
+        path = urlparse(url).path
+        parameters = {str(k): str(v) for k, v in parameters.items()}
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (self._key(path, parameters), path,
+                 json.dumps(parameters, sort_keys=True),
+                 response.status_code, json.dumps(dict(response.headers)),
+                 zlib.compress(response.content), time.time()))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM responses').fetchone()[0]
@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+from .exceptions import CircuitOpenException
+
+
+class Retry:
+    """
+    Retry policy for server errors and network errors.
+
+    Every endpoint is a GET, so every request is safe to retry.
+
+    Parameters
+    ----------
+    total: int, default 3
+        Maximum number of retries.
+    backoff_factor: float, default 0.5
+        The n-th retry waits up to backoff_factor * 2**n seconds.
+    max_backoff: float, default 30
+        Maximum wait between retries.
+    jitter: bool, default True
+        Wait a random time between 0 and the backoff ("full jitter"),
+        so that clients do not retry in lockstep.
+    statuses: sequence of int, default (500, 502, 503, 504)
+        HTTP status codes that are retried.
+    """
+
+    def __init__(self, total=3, backoff_factor=0.5, max_backoff=30,
+                 jitter=True, statuses=(500, 502, 503, 504)):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+
+    def backoff(self, attempt):
+        """Seconds to wait before retry number attempt, from 0."""
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+
+class _Circuit:
+    def __init__(self):
+        self.failures = 0
+        self.opened = None
+        self.trial = False
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker for each endpoint.
+
+    After failure_threshold consecutive failures the circuit opens,
+    and requests to the endpoint fail fast with CircuitOpenException.
+    After reset_timeout seconds one trial request is let through:
+    the circuit closes if it succeeds and opens again if it fails.
+
+    Parameters
+    ----------
+    failure_threshold: int, default 5
+        Consecutive failures that open the circuit.
+    reset_timeout: float, default 30
+        Seconds to wait before a trial request.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def before(self, endpoint):
+        """Raise CircuitOpenException if endpoint must not be called."""
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is None or circuit.opened is None:
+                return
+            waited = time.monotonic() - circuit.opened
+            if waited < self.reset_timeout or circuit.trial:
+                raise CircuitOpenException(
+                    'Circuit open for {} after {} failures.'.format(
+                        endpoint, circuit.failures))
+            circuit.trial = True
+
+    def release(self, endpoint):
+        """
+        Give back the trial request of endpoint, e.g after an error of
+        the client, without counting a failure.
+        """
+        with self._lock:
+            circuit = self._circuits.get(endpoint)
+            if circuit is not None:
+                circuit.trial = False
+
+    def success(self, endpoint):
+        with self._lock:
+            self._circuits.pop(endpoint, None)
+
+    def failure(self, endpoint):
+        with self._lock:
+            circuit = self._circuits.setdefault(endpoint, _Circuit())
+            circuit.failures += 1
+            if circuit.trial or circuit.failures >= self.failure_threshold:
+                circuit.opened = time.monotonic()
+                circuit.trial = False
+
+    def is_open(self, endpoint):
+        circuit = self._circuits.get(endpoint)
+        return circuit is not None and circuit.opened is not None
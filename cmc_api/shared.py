@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import threading
+import time
+from .cache import SQLiteCache
+from .ratelimit import RateLimiter
+from .singleflight import SingleFlight
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=60, check_same_thread=False,
+                           isolation_level=None)
+    # WAL lets processes read while another one writes.
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+class _Transaction:
+    """
+    Lock of SharedRateLimiter, held across threads and processes.
+
+    The state of the buckets is loaded from sqlite on enter and
+    saved on exit, so the methods of RateLimiter work unchanged.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        limiter = self.limiter
+        try:
+            limiter._conn.execute('BEGIN IMMEDIATE')
+            row = limiter._conn.execute(
+                'SELECT calls, credits, blocked_until, updated FROM limiter '
+                'WHERE name = ?', (limiter.name,)).fetchone()
+        except BaseException:
+            self._lock.release()
+            raise
+        if row is not None:
+            (limiter._calls, limiter._credits, limiter._blocked_until,
+             limiter._updated) = row
+        return self
+
+    def __exit__(self, exc_type, *args):
+        limiter = self.limiter
+        try:
+            if exc_type is None:
+                limiter._conn.execute(
+                    'INSERT OR REPLACE INTO limiter VALUES (?, ?, ?, ?, ?)',
+                    (limiter.name, limiter._calls, limiter._credits,
+                     limiter._blocked_until, limiter._updated))
+                limiter._conn.execute('COMMIT')
+            else:
+                limiter._conn.execute('ROLLBACK')
+        finally:
+            self._lock.release()
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    A RateLimiter shared by every process using the same sqlite file.
+
+    Parameters
+    ----------
+    path: str
+        Path to the sqlite database file.
+    calls_per_minute, credits_per_minute, max_retries:
+        See RateLimiter.
+    name: str, default 'default'
+        Name of the limiter, to keep several in one file.
+    """
+    _clock = staticmethod(time.time)
+
+    def __init__(self, path, calls_per_minute=30, credits_per_minute=None,
+                 max_retries=3, name='default'):
+        super().__init__(calls_per_minute, credits_per_minute, max_retries)
+        self.path = path
+        self.name = name
+        self._conn = _connect(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS limiter (name TEXT PRIMARY KEY, '
+            'calls REAL, credits REAL, blocked_until REAL, updated REAL)')
+        self._lock = _Transaction(self)
+
+
+class SharedSingleFlight:
+    """
+    Share one call between callers of every process with the same key.
+
+    The first caller marks the key as in flight in sqlite and runs the
+    function. Callers of other processes wait for the mark to go away,
+    then read the result from the shared cache, and only run the
+    function themselves if it is not there. Threads of one process
+    share calls through a SingleFlight first.
+
+    Parameters
+    ----------
+    path: str
+        Path to the sqlite database file.
+    cache: cache object
+        Cache the function stores its result into.
+    timeout: float, default 60
+        Seconds after which a mark is considered abandoned,
+        e.g because its process died.
+    poll: float, default 0.05
+        Seconds between checks of the mark.
+    """
+
+    def __init__(self, path, cache, timeout=60, poll=0.05):
+        self.path = path
+        self.cache = cache
+        self.timeout = timeout
+        self.poll = poll
+        self._owner = '{}-{}'.format(os.getpid(), id(self))
+        self._local = SingleFlight()
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS in_flight (key TEXT PRIMARY KEY, '
+            'owner TEXT, expires REAL)')
+
+    def _claim(self, key):
+        """Mark key as in flight, unless another live caller did."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO in_flight VALUES (?, ?, ?) ON CONFLICT (key) '
+                'DO UPDATE SET owner = excluded.owner, '
+                'expires = excluded.expires WHERE expires < ?',
+                (key, self._owner, now + self.timeout, now))
+            return cursor.rowcount == 1
+
+    def _release(self, key):
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM in_flight WHERE key = ? AND owner = ?',
+                (key, self._owner))
+
+    def _in_flight(self, key):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM in_flight WHERE key = ? AND expires >= ?',
+                (key, time.time())).fetchone() is not None
+
+    def _do(self, key, function, args):
+        while True:
+            if self._claim(key):
+                try:
+                    return function(*args)
+                finally:
+                    self._release(key)
+            while self._in_flight(key):
+                time.sleep(self.poll)
+            value = self.cache.get(key)
+            if value is not None:
+                return value
+
+    def do(self, key, function, *args):
+        """Run function(*args), or wait for the call in flight for key."""
+        return self._local.do(key, self._do, key, function, args)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM in_flight').fetchone()[0]
+
+
+class SharedState:
+    """
+    Rate limit, cache and calls in flight shared by processes of a host.
+
+    Every process creating a SharedState with the same path uses the
+    same limits and cache entries, and a request sent by one process
+    is not sent again by the others while it is in flight.
+
+    Parameters
+    ----------
+    path: str
+        Path to the sqlite database file.
+    calls_per_minute: int, default 30
+        Maximum number of calls per minute of all processes.
+    credits_per_minute: int, optional
+        Maximum number of credits per minute of all processes.
+    maxsize: int, default 10000
+        Maximum number of cache entries.
+
+    Attributes
+    ----------
+    SharedState.cache: SQLiteCache
+    SharedState.rate_limiter: SharedRateLimiter
+    SharedState.single_flight: SharedSingleFlight
+
+    Examples
+    --------
+    >>> cmc = CoinMarketCap(shared=SharedState('/tmp/cmc.db',
+    ...                                        calls_per_minute=30))
+    """
+
+    def __init__(self, path, calls_per_minute=30, credits_per_minute=None,
+                 maxsize=10000):
+        self.path = path
+        _connect(path).close()
+        self.cache = SQLiteCache(path, maxsize)
+        self.rate_limiter = SharedRateLimiter(path, calls_per_minute,
+                                              credits_per_minute)
+        self.single_flight = SharedSingleFlight(path, self.cache)
@@ -0,0 +1,48 @@
+import threading
+
+
+class _Call:
+    """A call in flight."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Share one call between concurrent callers with the same key.
+
+    The first caller runs the function while the others wait for it,
+    and they all get its result or exception. The result is the same
+    object for every caller, so it must not be modified in place.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args):
+        """Run function(*args), or wait for the call in flight for key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.result = function(*args)
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def __len__(self):
+        return len(self._calls)
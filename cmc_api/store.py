@@ -0,0 +1,251 @@
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from .ranges import interval_seconds
+from .times import to_timestamp, to_isoformat
+
+
+# Columns of each kind of history. The first one is the time
+# the quote is for, and the others are fields of quote[convert].
+_columns = {
+    'quotes': {
+        'times': ('timestamp',),
+        'quote': ('price', 'volume_24h', 'market_cap', 'timestamp'),
+    },
+    'ohlcv': {
+        'times': ('time_open', 'time_close', 'time_high', 'time_low'),
+        'quote': ('open', 'high', 'low', 'close', 'volume', 'market_cap',
+                  'timestamp'),
+    },
+}
+_default_intervals = {'quotes': '5m', 'ohlcv': 'daily'}
+# Parameters the store knows how to answer. Requests
+# with any other parameter are sent to the api.
+_parameters = {
+    'quotes': {'id', 'time_start', 'time_end', 'interval', 'convert'},
+    'ohlcv': {'id', 'time_start', 'time_end', 'interval', 'time_period',
+              'convert'},
+}
+# Maximum number of quotes the server returns for one request.
+_max_count = 10000
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _missing_ranges(ranges, start, end):
+    """Parts of [start, end] that are not covered by ranges."""
+    missing = []
+    for a, b in ranges:
+        if b < start or a > end:
+            continue
+        if a > start:
+            missing.append((start, a))
+        start = max(start, b)
+    if start < end:
+        missing.append((start, end))
+    return missing
+
+
+class _Series:
+    """
+    Append-only columnar files of one (id, convert, interval).
+
+    Each column is a file of float64 values, with times as unix seconds
+    and missing values as nan. coverage.json holds the time ranges that
+    were already fetched, and the asset details.
+    """
+
+    def __init__(self, directory, kind):
+        self.directory = directory
+        self.kind = kind
+        os.makedirs(directory, exist_ok=True)
+        self.names = ['time.' + x for x in _columns[kind]['times']] + \
+            ['quote.' + x for x in _columns[kind]['quote']]
+        path = os.path.join(directory, 'coverage.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                meta = json.load(f)
+        else:
+            meta = {'ranges': [], 'asset': {}}
+        self.ranges = meta['ranges']
+        self.asset = meta['asset']
+        self.lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + '.f8')
+
+    def append(self, quotes, convert):
+        """Append quotes of a response to the column files."""
+        columns = {name: array('d') for name in self.names}
+        for quote in quotes:
+            values = quote['quote'].get(convert, {})
+            for name in self.names:
+                kind, field = name.split('.', 1)
+                value = quote.get(field) if kind == 'time' \
+                    else values.get(field)
+                if value is None:
+                    value = math.nan
+                elif field.startswith('time'):
+                    value = to_timestamp(value)
+                columns[name].append(value)
+        for name, column in columns.items():
+            with open(self._path(name), 'ab') as f:
+                column.tofile(f)
+
+    def cover(self, start, end, asset):
+        """Record that [start, end] was fetched."""
+        self.ranges = _merge_ranges(self.ranges + [[start, end]])
+        self.asset = asset or self.asset
+        path = os.path.join(self.directory, 'coverage.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'ranges': self.ranges, 'asset': self.asset}, f)
+        os.replace(path + '.tmp', path)
+
+    def read(self, start, end, convert):
+        """Get quotes within [start, end], sorted and without duplicates."""
+        columns = {}
+        for name in self.names:
+            column = array('d')
+            if os.path.exists(self._path(name)):
+                with open(self._path(name), 'rb') as f:
+                    column.frombytes(f.read())
+            columns[name] = column
+        # A write may have been interrupted, so trust the shortest column.
+        length = min(len(column) for column in columns.values())
+        key = columns[self.names[0]]
+        rows = {}
+        for i in range(length):
+            if start <= key[i] <= end:
+                rows[key[i]] = i
+        quotes = []
+        for t in sorted(rows):
+            i = rows[t]
+            quote = {}
+            values = {}
+            for name in self.names:
+                kind, field = name.split('.', 1)
+                value = columns[name][i]
+                if math.isnan(value):
+                    value = None
+                elif field.startswith('time'):
+                    value = to_isoformat(value)
+                if kind == 'time':
+                    quote[field] = value
+                else:
+                    values[field] = value
+            quote['quote'] = {convert: values}
+            quotes.append(quote)
+        return quotes
+
+
+class HistoryStore:
+    """
+    A local store of historical quotes and OHLCV.
+
+    History is kept per (id, convert, interval) in append-only columnar
+    files. Requests are answered from the store, and only the time
+    ranges that were never fetched are requested from the api.
+
+    Parameters
+    ----------
+    directory: str
+        Directory where the history is kept.
+
+    Notes
+    -----
+    Only requests for one id and one convert, with both time_start and
+    time_end, are served from the store. Other requests go to the api.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._series = {}
+        # Guards _series only. Each series has its own lock, held while
+        # its missing ranges are fetched, so that other series are not
+        # held up by requests in flight.
+        self._lock = threading.Lock()
+
+    def accepts(self, kind, parameters):
+        """Check if a request can be served from the store."""
+        if not set(parameters) <= _parameters[kind]:
+            return False
+        if 'time_start' not in parameters or 'time_end' not in parameters:
+            return False
+        return (',' not in str(parameters.get('id', ','))
+                and ',' not in str(parameters.get('convert', 'USD')))
+
+    def _get_series(self, kind, parameters):
+        interval = str(parameters.get('interval', _default_intervals[kind]))
+        if kind == 'ohlcv':
+            interval += '-' + str(parameters.get('time_period', 'daily'))
+        name = '{}-{}-{}'.format(parameters['id'],
+                                 parameters.get('convert', 'USD'), interval)
+        key = (kind, name)
+        series = self._series.get(key)
+        if series is None:
+            directory = os.path.join(self.directory, kind, name)
+            series = self._series[key] = _Series(directory, kind)
+        return series
+
+    def get(self, kind, parameters, fetch):
+        """
+        Get history from the store, fetching missing ranges first.
+
+        Parameters
+        ----------
+        kind: {'quotes', 'ohlcv'}
+        parameters: dict
+            Parameters of the request.
+        fetch: callable
+            fetch(parameters) requests data from the api.
+
+        Returns
+        -------
+        data: dict
+            Same as the data of historical_quotes or historical_ohlcv.
+        """
+        convert = str(parameters.get('convert', 'USD'))
+        start = to_timestamp(parameters['time_start'])
+        end = to_timestamp(parameters['time_end'])
+        step = interval_seconds(
+            str(parameters.get('interval', _default_intervals[kind])))
+        field = _columns[kind]['times'][0]
+        with self._lock:
+            series = self._get_series(kind, parameters)
+        with series.lock:
+            now = time.time()
+            for a, b in _missing_ranges(series.ranges, start, end):
+                if a >= now:
+                    # Quotes in the future do not exist yet.
+                    break
+                request = dict(parameters, time_start=to_isoformat(a),
+                               time_end=to_isoformat(b))
+                data = fetch(request)
+                quotes = data.get('quotes', [])
+                series.append(quotes, convert)
+                asset = {k: v for k, v in data.items() if k != 'quotes'}
+                if b + step <= now and len(quotes) < _max_count:
+                    # The range is over and was not cut short by the
+                    # maximum count, so the response is complete.
+                    series.cover(a, b, asset)
+                elif quotes:
+                    # Later quotes may not be published yet, or were
+                    # cut short, so only what was returned is covered.
+                    times = [to_timestamp(quote[field]) for quote in quotes
+                             if quote.get(field)]
+                    if times:
+                        series.cover(a, max(times), asset)
+            quotes = series.read(start, end, convert)
+            asset = series.asset
+        return dict(asset, quotes=quotes)
@@ -0,0 +1,33 @@
+from datetime import datetime, date, timezone
+
+
+def to_timestamp(value):
+    """
+    Convert a unix timestamp, ISO 8601 string, date or datetime
+    into unix seconds. Times without timezone are taken as UTC.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    else:
+        text = str(value)
+        try:
+            return float(text)
+        except ValueError:
+            pass
+        if text.endswith('Z'):
+            text = text[:-1] + '+00:00'
+        dt = datetime.fromisoformat(text)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def to_isoformat(timestamp):
+    """Convert unix seconds into the ISO 8601 format of coinmarketcap."""
+    dt = datetime.fromtimestamp(timestamp, timezone.utc)
+    return '{}.{:03d}Z'.format(dt.strftime('%Y-%m-%dT%H:%M:%S'),
+                               dt.microsecond // 1000)
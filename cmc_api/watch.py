@@ -0,0 +1,151 @@
+import statistics
+import time
+from collections import deque, namedtuple
+from collections.abc import Mapping
+from .times import to_timestamp
+
+
+Change = namedtuple('Change', ['id', 'record', 'previous'])
+Change.__doc__ = """
+A record that changed between two polls of CoinMarketCap.watch.
+
+id: int
+record: dict
+    The new record.
+previous: dict or None
+    The record when it was last yielded, None if it is new.
+"""
+
+
+def get_field(record, field):
+    """Get a dotted field of a record, e.g 'quote.USD.price'."""
+    value = record
+    for key in field.split('.'):
+        if not isinstance(value, Mapping):
+            return None
+        value = value.get(key)
+    return value
+
+
+def iter_records(data):
+    """Iterate over the records of listings or quotes data."""
+    values = data.values() if isinstance(data, Mapping) else data
+    for value in values:
+        if isinstance(value, list):
+            for record in value:
+                yield record
+        else:
+            yield value
+
+
+class Watcher:
+    """
+    Keep the last snapshot of records by id and find what changed.
+
+    Parameters
+    ----------
+    fields: sequence of str, optional
+        Dotted fields compared between polls, e.g ['quote.USD.price'].
+        By default whole records are compared.
+    thresholds: dict, optional
+        Minimum relative change of fields for a record to be yielded,
+        e.g {'quote.USD.price': 0.01} for 1%. Changes are measured from
+        the value when the record was last yielded, so slow drifts
+        add up until they cross the threshold.
+    initial: bool, default True
+        Yield every record of the first poll.
+    period: float, default 60
+        Seconds between refreshes of the server, until it is learned
+        from last_updated as the median of the last gaps.
+    lag: float, default 1
+        Seconds to wait after the expected refresh before polling.
+    """
+
+    def __init__(self, fields=None, thresholds=None, initial=True,
+                 period=60, lag=1):
+        self.fields = list(fields or [])
+        self.thresholds = dict(thresholds or {})
+        self.initial = initial
+        self.period = period
+        self.lag = lag
+        self.snapshot = {}
+        self.newest = None
+        self._gaps = deque(maxlen=9)
+        self._learned = None
+        self._polls = 0
+        self._polled = None
+
+    def _changed(self, record, previous):
+        if self.thresholds:
+            for field, threshold in self.thresholds.items():
+                new = get_field(record, field)
+                old = get_field(previous, field)
+                if new is None or old is None:
+                    if new != old:
+                        return True
+                elif old == 0:
+                    if new != 0:
+                        return True
+                elif abs(new - old) >= threshold * abs(old):
+                    return True
+            return False
+        if self.fields:
+            return any(get_field(record, field) != get_field(previous, field)
+                       for field in self.fields)
+        return record != previous
+
+    def update(self, data):
+        """
+        Compare a poll with the snapshot.
+
+        Parameters
+        ----------
+        data: list or dict
+            Data of listings or quotes.
+
+        Returns
+        -------
+        changes: list of Change
+        """
+        self._polls += 1
+        self._polled = time.time()
+        changes = []
+        newest = self.newest
+        for record in iter_records(data):
+            id = record['id']
+            previous = self.snapshot.get(id)
+            if previous is None:
+                self.snapshot[id] = record
+                if self.initial or self._polls > 1:
+                    changes.append(Change(id, record, None))
+            elif self._changed(record, previous):
+                self.snapshot[id] = record
+                changes.append(Change(id, record, previous))
+            updated = record.get('last_updated')
+            if updated:
+                updated = to_timestamp(updated)
+                if newest is None or updated > newest:
+                    newest = updated
+        if newest is not None and self.newest is not None \
+                and newest > self.newest:
+            # Polls may miss refreshes, and the server may be late,
+            # so the median of recent gaps follows the period without
+            # being thrown off by either, or only ever shrinking.
+            self._gaps.append(newest - self.newest)
+            self._learned = statistics.median(self._gaps)
+        self.newest = newest
+        return changes
+
+    def wait(self, min_interval=1):
+        """Seconds to wait before the next poll."""
+        period = self._learned or self.period
+        if self.newest is None:
+            return max(period, min_interval)
+        now = time.time()
+        due = self.newest + period + self.lag
+        if due <= now:
+            # The expected refresh has not shown up, e.g the server is
+            # late or its data is stale, so wait for another period
+            # rather than polling every min_interval.
+            due = (self._polled or now) + period
+        return max(due - now, min_interval)
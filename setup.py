@@ -18,6 +18,12 @@ setup(
     install_requires=[
         'requests'
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'frame': ['numpy', 'pandas'],
+        'arrow': ['numpy', 'pyarrow'],
+        'fast': ['orjson'],
+    },
     classifiers=[
         "Programming Language :: Python",
         "License :: OSI Approved :: MIT License",
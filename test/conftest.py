@@ -1,7 +1,53 @@
+import json
 import pytest
+from cmc_api import CoinMarketCap
 
 
 @pytest.fixture
 def base_url():
     return 'https://sandbox-api.coinmarketcap.com/v1'
-    
\ No newline at end of file
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(payload).encode()
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i+chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """A session answering with handler(url, params) -> (status, payload)."""
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        params = dict(params or {})
+        self.calls.append((url, params))
+        return FakeResponse(*self.handler(url, params))
+
+
+def ok(data, credit_count=1):
+    return 200, {'status': {'error_code': 0, 'credit_count': credit_count},
+                 'data': data}
+
+
+@pytest.fixture
+def offline_cmc():
+    """Make a sandbox CoinMarketCap whose requests go to a handler."""
+    def make(handler, **kwargs):
+        cmc = CoinMarketCap(root='sandbox', **kwargs)
+        cmc.session = FakeSession(handler)
+        return cmc
+    return make
@@ -0,0 +1,119 @@
+import asyncio
+import pytest
+from cmc_api import *
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+
+
+def run_with_server(routes, coroutine):
+    """Run coroutine(base_url) against a local aiohttp server."""
+    async def main():
+        app = web.Application()
+        app.add_routes(routes)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await coroutine('http://127.0.0.1:{}/v1'.format(port))
+        finally:
+            await runner.cleanup()
+    return asyncio.run(main())
+
+
+async def quotes_handler(request):
+    ids = request.query['id'].split(',')
+    data = {x: {'id': int(x), 'quote': {}} for x in ids}
+    return web.json_response({'status': {'error_code': 0}, 'data': data})
+
+
+async def error_handler(request):
+    status = {'error_code': 400, 'error_message': 'Invalid value for "id"'}
+    return web.json_response({'status': status, 'data': None}, status=400)
+
+
+routes = [
+    web.get('/v1/cryptocurrency/quotes/latest', quotes_handler),
+    web.get('/v1/exchange/quotes/latest', error_handler),
+]
+
+
+def test_async_quotes():
+    async def check(base_url):
+        async with AsyncCoinMarketCap(root='sandbox') as cmc:
+            cmc.BASE_URL = base_url
+            results = await asyncio.gather(
+                *[cmc.quotes(id=[i, i+1]) for i in range(50)])
+        return results
+    results = run_with_server(routes, check)
+    assert len(results) == 50
+    assert set(results[3]) == {'3', '4'}
+
+
+def test_async_exception():
+    async def check(base_url):
+        async with AsyncCoinMarketCap(root='sandbox') as cmc:
+            cmc.BASE_URL = base_url
+            with pytest.raises(BadRequestException):
+                await cmc.quotes('exchange', id='x')
+            with pytest.raises(ValueError):
+                await cmc.quotes('not_in_categories')
+    run_with_server(routes, check)
+
+
+def test_async_single_flight():
+    hits = []
+
+    async def slow_map(request):
+        hits.append(1)
+        await asyncio.sleep(0.1)
+        return web.json_response({'status': {}, 'data': [{'id': 1}]})
+
+    async def check(base_url):
+        async with AsyncCoinMarketCap(root='sandbox') as cmc:
+            cmc.BASE_URL = base_url
+            return await asyncio.gather(*[cmc.map() for _ in range(10)])
+    results = run_with_server(
+        [web.get('/v1/cryptocurrency/map', slow_map)], check)
+    assert results == [[{'id': 1}]] * 10
+    assert len(hits) == 1
+
+
+def test_async_metrics():
+    async def check(base_url):
+        async with AsyncCoinMarketCap(root='sandbox', metrics=True) as cmc:
+            cmc.BASE_URL = base_url
+            await cmc.quotes(id=1)
+            await cmc.quotes(id=2, raw=True)
+        return cmc.metrics.snapshot()
+    snapshot = run_with_server(routes, check)
+    assert snapshot['/v1/cryptocurrency/quotes/latest']['statuses'] == {200: 2}
+
+
+def test_async_stream():
+    received = asyncio.Event()
+
+    async def slow_map(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await response.write(b'{"status": {"credit_count": 1}, "data": [')
+        await response.write(b'{"id": 1}, {"id"')
+        # The rest is only sent once the first record was received.
+        await asyncio.wait_for(received.wait(), 5)
+        await response.write(b': 2}]}')
+        await response.write_eof()
+        return response
+
+    async def check(base_url):
+        async with AsyncCoinMarketCap(root='sandbox') as cmc:
+            cmc.BASE_URL = base_url
+            records = []
+            async for record in await cmc.map(stream=True):
+                records.append(record)
+                received.set()
+        return records
+    records = run_with_server(
+        [web.get('/v1/cryptocurrency/map', slow_map)], check)
+    assert records == [{'id': 1}, {'id': 2}]
@@ -0,0 +1,39 @@
+import pytest
+from cmc_api import *
+from .conftest import ok
+
+
+def quotes(url, params):
+    ids = params['id'].split(',')
+    if '13' in ids:
+        return 400, {'status': {'error_message': 'Invalid value for "id"'}}
+    return ok({x: {'id': int(x)} for x in ids})
+
+
+def test_small_list_is_not_split(offline_cmc):
+    cmc = offline_cmc(quotes)
+    assert set(cmc.quotes(id=[1, 2, 3])) == {'1', '2', '3'}
+    assert len(cmc.session.calls) == 1
+
+
+def test_large_list_is_split(offline_cmc):
+    cmc = offline_cmc(quotes)
+    cmc.batch_size = 5
+    result = cmc.info(id=list(range(1, 13)), aux='urls')
+    assert set(result) == {str(i) for i in range(1, 13)}
+    assert len(cmc.session.calls) == 3
+    assert all(params['aux'] == 'urls' for url, params in cmc.session.calls)
+    assert all(len(params['id'].split(',')) <= 5
+               for url, params in cmc.session.calls)
+
+
+def test_batch_errors(offline_cmc):
+    cmc = offline_cmc(quotes)
+    cmc.batch_size = 5
+    with pytest.raises(BatchException) as e:
+        cmc.quotes(id=list(range(1, 16)))
+    assert len(e.value.errors) == 1
+    batch, error = e.value.errors[0]
+    assert batch['id'] == '11,12,13,14,15'
+    assert isinstance(error, BadRequestException)
+    assert set(e.value.data) == {str(i) for i in range(1, 11)}
@@ -0,0 +1,69 @@
+import pytest
+from cmc_api import *
+from .conftest import ok
+
+url = 'https://sandbox-api.coinmarketcap.com/v1'
+key_info = {
+    'plan': {'credit_limit_daily': 10, 'credit_limit_monthly': 100,
+             'credit_limit_daily_reset_timestamp': '2999-01-01T00:00:00.000Z'},
+    'usage': {'current_day': {'credits_used': 4},
+              'current_month': {'credits_used': 50}},
+}
+
+
+def handler(url, params):
+    if url.endswith('/key/info'):
+        return ok(key_info, credit_count=0)
+    return ok([], credit_count=3)
+
+
+def test_estimate_credits():
+    quotes = url + '/cryptocurrency/quotes/latest'
+    assert estimate_credits(url + '/key/info', {}) == 0
+    assert estimate_credits(quotes, {'id': '1,2'}) == 1
+    assert estimate_credits(quotes, {'id': ','.join(['1'] * 150),
+                                     'convert': 'USD,EUR,BTC'}) == 4
+    assert estimate_credits(url + '/cryptocurrency/listings/latest', {}) == 1
+    assert estimate_credits(url + '/cryptocurrency/listings/latest',
+                            {'limit': 5000}) == 50
+    assert estimate_credits(url + '/cryptocurrency/map', {}) == 1
+    history = url + '/cryptocurrency/quotes/historical'
+    assert estimate_credits(history, {'id': 1, 'interval': 'hourly',
+                                      'time_start': '2020-01-01',
+                                      'time_end': '2020-01-10'}) == 3
+
+
+def test_reconcile_and_raise(offline_cmc):
+    budget = CreditBudget()
+    cmc = offline_cmc(handler, budget=budget)
+    cmc.map()
+    assert budget.limit('daily') == 10
+    assert budget.used('daily') == 7
+    assert budget.used('monthly') == 53
+    cmc.map()
+    with pytest.raises(BudgetExceededException):
+        cmc.map()
+    assert budget.remaining('daily') == 0
+    assert len([c for c in cmc.session.calls if c[0].endswith('/map')]) == 2
+
+
+def test_downgrade(offline_cmc):
+    budget = CreditBudget(daily=3, on_exceed='downgrade',
+                          reconcile_every=None)
+    cmc = offline_cmc(handler, budget=budget)
+    cmc.listings(limit=1000, convert='USD,EUR')
+    assert cmc.session.calls[-1][1] == {'limit': 300, 'convert': 'USD'}
+    with pytest.raises(BudgetExceededException):
+        cmc.quotes(id=1)
+
+
+def test_defer(offline_cmc):
+    budget = CreditBudget(daily=1, on_exceed='defer', max_wait=0,
+                          reconcile_every=None)
+    cmc = offline_cmc(lambda url, params: ok([], credit_count=1),
+                      budget=budget)
+    cmc.map()
+    with pytest.raises(BudgetExceededException):
+        cmc.map()
+    with pytest.raises(ValueError):
+        CreditBudget(on_exceed='skip')
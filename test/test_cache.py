@@ -0,0 +1,52 @@
+import time
+import pytest
+from cmc_api import *
+from cmc_api.cache import cache_key, get_ttl
+from .conftest import ok
+
+
+def test_cache_key():
+    url = 'https://x/v1/cryptocurrency/quotes/latest'
+    assert cache_key(url, {'id': '1,2', 'convert': 'USD'}) == \
+        cache_key(url, {'convert': 'USD', 'id': '1,2'})
+    assert cache_key(url, {}) == url
+
+
+def test_get_ttl():
+    assert get_ttl('https://x/v1/cryptocurrency/map') == 86400
+    assert get_ttl('https://x/v1/key/info') == 60
+    assert get_ttl('https://x/v1/cryptocurrency/quotes/latest') == 60
+    assert get_ttl('https://x/v1/unknown') == 0
+
+
+@pytest.mark.parametrize('make_cache', [
+    lambda tmp_path: MemoryCache(maxsize=2),
+    lambda tmp_path: SQLiteCache(str(tmp_path / 'cache.db'), maxsize=2),
+])
+def test_cache_lru_and_ttl(make_cache, tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set('a', [1], 60)
+    cache.set('b', {'x': 2}, 60)
+    assert cache.get('a') == [1]
+    cache.set('c', 3, 60)
+    assert cache.get('b') is None
+    assert cache.get('a') == [1]
+    assert len(cache) == 2
+    cache.set('d', 4, -1)
+    assert cache.get('d') is None
+
+
+def test_client_cache(offline_cmc):
+    cmc = offline_cmc(lambda url, params: ok([{'id': 1}]), cache=True)
+    assert cmc.map() == cmc.map() == [{'id': 1}]
+    assert len(cmc.session.calls) == 1
+    cmc.map(limit=5)
+    assert len(cmc.session.calls) == 2
+
+
+def test_client_cache_ttl(offline_cmc):
+    cmc = offline_cmc(lambda url, params: ok({}), cache=True,
+                      cache_ttl={'/quotes/latest': 0})
+    cmc.quotes(id=1)
+    cmc.quotes(id=1)
+    assert len(cmc.session.calls) == 2
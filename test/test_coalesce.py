@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from cmc_api import *
+from .conftest import ok
+
+
+def quotes(url, params):
+    if 'id' in params:
+        ids = str(params['id']).split(',')
+        if 'bad' in ids:
+            return 400, {'status': {'error_message': 'Invalid value for "id"'}}
+        return ok({x: {'id': x, 'convert': params.get('convert')} for x in ids})
+    symbols = params['symbol'].split(',')
+    return ok({x.upper(): {'symbol': x.upper()} for x in symbols})
+
+
+def run_concurrently(function, arguments):
+    with ThreadPoolExecutor(max_workers=len(arguments)) as executor:
+        return list(executor.map(function, arguments))
+
+
+def test_coalesced_quotes(offline_cmc):
+    cmc = offline_cmc(quotes, coalesce=0.2)
+    results = run_concurrently(lambda i: cmc.quotes(id=i), list(range(20)))
+    for i, result in enumerate(results):
+        assert result == {str(i): {'id': str(i), 'convert': None}}
+    assert len(cmc.session.calls) < 20
+
+
+def test_coalesce_groups_by_parameters(offline_cmc):
+    cmc = offline_cmc(quotes, coalesce=0.2)
+    arguments = [('USD', 1), ('EUR', 2), ('USD', 3), ('EUR', 4)]
+    results = run_concurrently(
+        lambda x: cmc.quotes(id=x[1], convert=x[0]), arguments)
+    for (convert, i), result in zip(arguments, results):
+        assert result[str(i)]['convert'] == convert
+    assert len(cmc.session.calls) == 2
+
+
+def test_coalesce_symbols(offline_cmc):
+    cmc = offline_cmc(quotes, coalesce=0.1)
+    results = run_concurrently(lambda x: cmc.quotes(symbol=x), ['btc', 'ETH'])
+    assert results == [{'BTC': {'symbol': 'BTC'}}, {'ETH': {'symbol': 'ETH'}}]
+
+
+def test_coalesce_bad_request(offline_cmc):
+    cmc = offline_cmc(quotes, coalesce=0.2)
+
+    def call(i):
+        try:
+            return cmc.quotes(id=i)
+        except BadRequestException as e:
+            return e
+    results = run_concurrently(call, [1, 'bad', 2])
+    assert results[0] == {'1': {'id': '1', 'convert': None}}
+    assert isinstance(results[1], BadRequestException)
+    assert results[2] == {'2': {'id': '2', 'convert': None}}
+
+
+def test_max_size_sends_early(offline_cmc):
+    cmc = offline_cmc(quotes, coalesce=Coalescer(window=10, max_size=2))
+    results = run_concurrently(lambda i: cmc.quotes(id=i), [1, 2])
+    assert results == [{'1': {'id': '1', 'convert': None}},
+                       {'2': {'id': '2', 'convert': None}}]
@@ -0,0 +1,135 @@
+import json
+import pytest
+from requests.exceptions import ChunkedEncodingError
+from cmc_api import *
+from cmc_api.decoders import StreamDecoder, get_decoder
+from cmc_api.mock import MockServer
+from .conftest import FakeResponse, ok
+
+
+def test_get_decoder():
+    body = b'{"data": [1, 2.5, "x"]}'
+    assert get_decoder()(body) == {'data': [1, 2.5, 'x']}
+    assert get_decoder('json')(body) == {'data': [1, 2.5, 'x']}
+    decoder = lambda content: 'custom'
+    assert get_decoder(decoder) is decoder
+    with pytest.raises(ValueError):
+        get_decoder('yaml')
+
+
+def test_get_orjson():
+    orjson = pytest.importorskip('orjson')
+    assert get_decoder() is orjson.loads
+    assert get_decoder('orjson') is orjson.loads
+
+
+def test_client_decoder(offline_cmc):
+    bodies = []
+
+    def decoder(content):
+        bodies.append(content)
+        return json.loads(content)
+    cmc = offline_cmc(lambda url, params: ok([{'id': 1}]),
+                      json_decoder=decoder)
+    assert cmc.map() == [{'id': 1}]
+    assert len(bodies) == 1
+
+
+def test_raw(offline_cmc):
+    cmc = offline_cmc(lambda url, params: ok({'1': {}}), cache=True,
+                      coalesce=0.01)
+    response = cmc.quotes(id=1, raw=True)
+    assert isinstance(response, RawResponse)
+    assert response.status_code == 200
+    assert json.loads(response.content)['data'] == {'1': {}}
+    assert cmc.session.calls[0][1] == {'id': 1}
+    cmc.quotes(id=1, raw=True)
+    assert len(cmc.session.calls) == 2
+
+
+def test_raw_does_not_raise(offline_cmc):
+    error = (400, {'status': {'error_message': 'bad'}})
+    cmc = offline_cmc(lambda url, params: error)
+    assert cmc.map(raw=True).status_code == 400
+
+
+def test_stream_decoder():
+    body = json.dumps({'status': {'credit_count': 2},
+                       'data': [{'id': i, 'name': 'é' * i} for i in range(5)],
+                       'more': 1.5}).encode()
+    decoder = StreamDecoder()
+    records = []
+    for i in range(len(body)):
+        records.extend(decoder.feed(body[i:i+1]))
+        if body[:i+1].endswith(b'}') and len(records) == 1:
+            # Records are returned as soon as they are complete.
+            assert i < len(body) // 2
+    records.extend(decoder.close())
+    assert records == json.loads(body)['data']
+    assert decoder.fields == {'status': {'credit_count': 2}, 'more': 1.5}
+    assert decoder.size == len(body)
+
+
+def test_stream_decoder_path():
+    body = {'data': {'id': 1, 'market_pairs': [{'a': 1}, {'a': 2}],
+                     'num_market_pairs': 2}}
+    decoder = StreamDecoder(('data', 'market_pairs'))
+    assert decoder.feed(json.dumps(body).encode()) == [{'a': 1}, {'a': 2}]
+    decoder.close()
+    assert decoder.fields == {'data.id': 1, 'data.num_market_pairs': 2}
+    decoder = StreamDecoder()
+    assert decoder.feed(b'{"data": {"1": {"id": 1}, "2": {"id": 2}}}') == \
+        [{'id': 1}, {'id': 2}]
+    decoder = StreamDecoder()
+    decoder.feed(b'{"data": [{"id": 1}, {"id"')
+    with pytest.raises(ValueError):
+        decoder.close()
+
+
+def test_stream(offline_cmc):
+    cmc = offline_cmc(lambda url, params: ok([{'id': 1}, {'id': 2}]),
+                      cache=True)
+    cmc.chunk_size = 5
+    assert list(cmc.map(stream=True)) == [{'id': 1}, {'id': 2}]
+    assert list(cmc.map(stream=True)) == [{'id': 1}, {'id': 2}]
+    assert cmc.session.calls[0][1] == {}
+    assert len(cmc.session.calls) == 2
+
+    error = (400, {'status': {'error_message': 'bad'}})
+    cmc = offline_cmc(lambda url, params: error)
+    records = cmc.map(stream=True)
+    assert cmc.session.calls == []
+    with pytest.raises(BadRequestException):
+        next(records)
+
+
+def test_stream_read_error(offline_cmc):
+    class BrokenResponse(FakeResponse):
+        def iter_content(self, chunk_size=1):
+            yield self.content[:len(self.content) // 2]
+            raise ChunkedEncodingError('Connection broken')
+
+    breaker = CircuitBreaker(failure_threshold=1)
+    cmc = offline_cmc(None, circuit_breaker=breaker, metrics=True)
+    cmc.session.get = lambda url, **kwargs: BrokenResponse(
+        *ok([{'id': i} for i in range(10)]))
+    records = cmc.map(stream=True)
+    assert next(records) == {'id': 0}
+    with pytest.raises(ChunkedEncodingError):
+        list(records)
+    assert breaker.is_open(cmc.BASE_URL + '/cryptocurrency/map')
+    statuses = cmc.metrics.snapshot()['/v1/cryptocurrency/map']['statuses']
+    assert statuses == {0: 1}
+
+
+def test_stream_server():
+    with MockServer() as server:
+        cmc = CoinMarketCap(root='sandbox', cache=True, rate_limit=RateLimiter(
+            60, credits_per_minute=100))
+        cmc.BASE_URL = server.url
+        records = cmc.listings(limit=500, stream=True)
+        assert [x['id'] for x in records] == list(range(1, 501))
+        assert cmc.rate_limiter._credits == pytest.approx(95, abs=0.1)
+        pairs = list(cmc.market_pairs(id=1, stream=True))
+        assert pairs[0]['market_pair'] == \
+            cmc.market_pairs(id=1)['market_pairs'][0]['market_pair']
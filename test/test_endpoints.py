@@ -0,0 +1,81 @@
+import asyncio
+from datetime import date
+import pytest
+from cmc_api import *
+from cmc_api.endpoints import ENDPOINTS
+from .conftest import ok
+
+
+def test_prepare():
+    path, parameters = ENDPOINTS['listings'].prepare('crypto', {
+        'limit': 10, 'convert': ['USD', 'EUR'], 'sort': 'price', 'raw': True})
+    assert path == '/cryptocurrency/listings/latest'
+    assert parameters == {'limit': 10, 'convert': 'USD,EUR', 'sort': 'price',
+                          'raw': True}
+    path, parameters = ENDPOINTS['historical_ohlcv'].prepare(None, {
+        'id': [1, 2], 'time_start': date(2021, 1, 1), 'skip_invalid': True})
+    assert path == '/cryptocurrency/ohlcv/historical'
+    assert parameters == {'id': '1,2', 'time_start': '2021-01-01',
+                          'skip_invalid': 'true'}
+    path, parameters = ENDPOINTS['listings'].prepare('crypto', {
+        'percent_change_24h_min': -10, 'percent_change_24h_max': -2.5})
+    assert parameters == {'percent_change_24h_min': -10,
+                          'percent_change_24h_max': -2.5}
+
+
+@pytest.mark.parametrize('method, cat, parameters', [
+    ('listings', 'crypto', {'limit': 0}),
+    ('listings', 'crypto', {'limit': '10a'}),
+    ('listings', 'crypto', {'sort': 'bogus'}),
+    ('listings', 'exchange', {'price_min': 1}),
+    ('listings', 'crypto', {'price_min': -1}),
+    ('listings', 'crypto', {'percent_change_24h_min': -101}),
+    ('map', 'crypto', {'listing_status': 'active,deleted'}),
+    ('map', 'exchange', {'symbol': 'BTC'}),
+    ('quotes', 'crypto', {'id': 'x'}),
+    ('quotes', 'crypto', {'convert': 'USD'}),
+    ('historical_quotes', 'crypto', {'id': 1, 'interval': 'fortnightly'}),
+    ('price_conversion', None, {'id': 1}),
+    ('price_conversion', None, {'amount': 0, 'id': 1}),
+])
+def test_invalid(method, cat, parameters):
+    with pytest.raises(InvalidParameterException):
+        ENDPOINTS[method].prepare(cat, parameters)
+
+
+def test_invalid_category():
+    with pytest.raises(ValueError) as info:
+        ENDPOINTS['map'].prepare('key', {})
+    assert '{crypto,exchange,fiat}' in str(info.value)
+
+
+def test_client_rejects_locally(offline_cmc):
+    cmc = offline_cmc(lambda url, params: ok([]))
+    with pytest.raises(BadRequestException):
+        cmc.listings(limit=10000)
+    with pytest.raises(ValueError):
+        cmc.price_conversion(amount='one', symbol='BTC')
+    with pytest.raises(ValueError):
+        cmc.info()
+    assert cmc.session.calls == []
+    cmc.info('key')
+    cmc.price_conversion(amount=1, symbol='BTC')
+    assert cmc.session.calls[1] == (
+        cmc.BASE_URL + '/tools/price-conversion',
+        {'amount': 1, 'symbol': 'BTC'})
+
+
+def test_generated_methods():
+    method = CoinMarketCap.price_performance_stats
+    assert method.__name__ == 'price_performance_stats'
+    assert 'time_period: str or sequence of str' in method.__doc__
+
+
+def test_async_rejects_locally():
+    pytest.importorskip('aiohttp')
+
+    async def check():
+        async with AsyncCoinMarketCap(root='sandbox') as cmc:
+            with pytest.raises(InvalidParameterException):
+                await cmc.blockchain_stats(id=1, limit=5)
+    asyncio.run(check())
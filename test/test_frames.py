@@ -0,0 +1,87 @@
+import pytest
+from cmc_api import *
+from cmc_api.frames import records_columns, historical_columns
+from .conftest import ok
+
+np = pytest.importorskip('numpy')
+
+listings = [
+    {'id': 1, 'symbol': 'BTC', 'cmc_rank': 1, 'max_supply': 21000000,
+     'platform': None, 'tags': ['mineable'],
+     'last_updated': '2021-01-01T00:00:00.000Z',
+     'quote': {'USD': {'price': 29000.5, 'volume_24h': 1},
+               'EUR': {'price': 24000, 'volume_24h': 2}}},
+    {'id': 1027, 'symbol': 'UNI', 'cmc_rank': 2, 'max_supply': None,
+     'platform': {'id': 1027, 'symbol': 'ETH'}, 'tags': [],
+     'last_updated': '2021-01-01T00:01:00.000Z',
+     'quote': {'USD': {'price': 5, 'volume_24h': 3},
+               'EUR': {'price': 4.1, 'volume_24h': None}}},
+]
+
+historical = {
+    'id': 1, 'name': 'Bitcoin', 'symbol': 'BTC',
+    'quotes': [
+        {'time_open': '2019-01-01T00:00:00.000Z',
+         'quote': {'USD': {'open': 1, 'close': 2.5}}},
+        {'time_open': '2019-01-02T00:00:00.000Z',
+         'quote': {'USD': {'open': 2.5, 'close': 3}}},
+    ],
+}
+
+
+def test_records_columns():
+    columns = records_columns(listings)
+    assert columns['quote.EUR.price'] == [24000, 4.1]
+    assert columns['platform'] == [None, None]
+    assert columns['platform.symbol'] == [None, 'ETH']
+    assert columns['tags'] == [['mineable'], []]
+
+
+def test_historical_columns():
+    columns = historical_columns(historical)
+    assert columns['symbol'] == ['BTC', 'BTC']
+    assert columns['quote.USD.close'] == [2.5, 3]
+    multi = historical_columns({'1': historical, '2': dict(historical, id=2)})
+    assert multi['id'] == [1, 1, 2, 2]
+
+
+def test_listings_numpy(offline_cmc):
+    cmc = offline_cmc(lambda url, params: ok(listings))
+    arrays = cmc.listings(as_frame='numpy')
+    assert arrays['id'].dtype == np.int64
+    assert arrays['max_supply'].dtype == np.float64
+    assert np.isnan(arrays['max_supply'][1])
+    assert arrays['quote.USD.price'].tolist() == [29000.5, 5.0]
+    assert np.isnan(arrays['quote.EUR.volume_24h'][1])
+    assert arrays['last_updated'].dtype == np.dtype('datetime64[ns]')
+    assert arrays['symbol'].dtype == object
+
+
+def test_quotes_pandas(offline_cmc):
+    pd = pytest.importorskip('pandas')
+    data = {str(x['id']): x for x in listings}
+    cmc = offline_cmc(lambda url, params: ok(data))
+    frame = cmc.quotes(id=[1, 1027], as_frame=True)
+    assert isinstance(frame, pd.DataFrame)
+    assert frame['quote.USD.price'].sum() == 29005.5
+
+
+def test_historical_ohlcv_frame(offline_cmc):
+    pytest.importorskip('pandas')
+    cmc = offline_cmc(lambda url, params: ok(historical))
+    frame = cmc.historical_ohlcv(id=1, as_frame='pandas')
+    assert list(frame['quote.USD.open']) == [1, 2.5]
+    assert str(frame['time_open'].dtype) == 'datetime64[ns]'
+
+
+def test_arrow(offline_cmc):
+    pa = pytest.importorskip('pyarrow')
+    cmc = offline_cmc(lambda url, params: ok(listings))
+    table = cmc.listings(as_frame='arrow')
+    assert table.num_rows == 2
+
+
+def test_bad_kind(offline_cmc):
+    cmc = offline_cmc(lambda url, params: ok(listings))
+    with pytest.raises(ValueError):
+        cmc.listings(as_frame='excel')
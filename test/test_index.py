@@ -0,0 +1,66 @@
+import pytest
+from cmc_api import *
+from .conftest import ok
+
+maps = {
+    'cryptocurrency': [
+        {'id': 1, 'rank': 1, 'name': 'Bitcoin', 'symbol': 'BTC',
+         'slug': 'bitcoin'},
+        {'id': 1027, 'rank': 2, 'name': 'Ethereum', 'symbol': 'ETH',
+         'slug': 'ethereum'},
+        {'id': 9999, 'rank': 900, 'name': 'Fake Bitcoin', 'symbol': 'BTC',
+         'slug': 'fake-bitcoin'},
+        {'id': 8888, 'rank': None, 'name': 'Unranked', 'symbol': 'BTC',
+         'slug': 'unranked'},
+    ],
+    'exchange': [{'id': 270, 'name': 'Binance', 'slug': 'binance'}],
+    'fiat': [{'id': 2781, 'name': 'United States Dollar', 'symbol': 'USD'}],
+}
+
+
+def handler(url, params):
+    if url.endswith('/map'):
+        return ok(maps[url.split('/')[-2]])
+    return ok({params.get('id', params.get('slug')): {}})
+
+
+@pytest.fixture
+def cmc(offline_cmc, tmp_path):
+    index = SymbolIndex(str(tmp_path / 'symbols.db'))
+    cmc = offline_cmc(handler, index=index)
+    assert index.refresh(cmc) == 6
+    return cmc
+
+
+def test_lookup(cmc):
+    index = cmc.index
+    assert index.lookup(symbol='btc') == 1
+    assert index.lookup(slug='ethereum') == 1027
+    assert index.lookup(name='binance', cat='exchange') == 270
+    assert index.lookup(symbol='USD', cat='fiat') == 2781
+    with pytest.raises(KeyError):
+        index.lookup(symbol='NOPE')
+
+
+def test_persistence_and_incremental_refresh(cmc, tmp_path):
+    index = SymbolIndex(str(tmp_path / 'symbols.db'))
+    assert len(index) == 6
+    assert index.lookup(symbol='ETH') == 1027
+    assert index.refresh(cmc) == 0
+    assert index.refresh(cmc, max_age=3600) == 0
+    calls = len(cmc.session.calls)
+    index.refresh(cmc, max_age=3600)
+    assert len(cmc.session.calls) == calls
+
+
+def test_resolve(cmc):
+    assert cmc.quotes(symbol=['BTC', 'eth'], resolve=True) == {'1,1027': {}}
+    assert cmc.session.calls[-1][1] == {'id': '1,1027'}
+    cmc.info(slug='unknown-coin', resolve=True)
+    assert cmc.session.calls[-1][1] == {'slug': 'unknown-coin'}
+
+
+def test_resolve_without_index(offline_cmc):
+    cmc = offline_cmc(handler)
+    with pytest.raises(ValueError):
+        cmc.ohlcv(symbol='BTC', resolve=True)
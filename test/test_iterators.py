@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from cmc_api import *
+from .conftest import ok
+
+universe = [{'id': i} for i in range(1, 13)]
+
+
+def paged(url, params):
+    start, limit = int(params['start']), int(params['limit'])
+    records = universe[start-1:start-1+limit]
+    if 'market-pairs' in url:
+        return ok({'id': 1, 'market_pairs': records})
+    return ok(records)
+
+
+def test_iter_map(offline_cmc):
+    cmc = offline_cmc(paged)
+    assert list(cmc.iter_map(page_size=5)) == universe
+    starts = [params['start'] for url, params in cmc.session.calls]
+    assert starts == [1, 6, 11]
+
+
+def test_iter_listings_start(offline_cmc):
+    cmc = offline_cmc(paged)
+    result = list(cmc.iter_listings(page_size=4, start=5, convert='EUR'))
+    assert result == universe[4:]
+    assert all(params['convert'] == 'EUR' for url, params in cmc.session.calls)
+
+
+def test_iter_market_pairs(offline_cmc):
+    cmc = offline_cmc(paged)
+    assert list(cmc.iter_market_pairs(page_size=6, id=1)) == universe
+    assert len(cmc.session.calls) == 3
+
+
+def test_iter_stops_early(offline_cmc):
+    cmc = offline_cmc(paged)
+    iterator = cmc.iter_map(page_size=2)
+    assert next(iterator) == universe[0]
+    iterator.close()
+    assert len(cmc.session.calls) <= 2
+
+
+def test_async_iter_map():
+    pytest.importorskip('aiohttp')
+    cmc = AsyncCoinMarketCap(root='sandbox')
+
+    async def map(cat='crypto', **parameters):
+        return paged('', parameters)[1]['data']
+    cmc.map = map
+
+    async def collect():
+        return [x async for x in cmc.iter_map(page_size=5)]
+    assert asyncio.run(collect()) == universe
@@ -0,0 +1,87 @@
+import threading
+import pytest
+from cmc_api import *
+from .conftest import FakeResponse, ok
+
+
+class KeySession:
+    """A session answering with statuses[key] for each API key."""
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.keys = []
+        self.credit_count = 1
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        key = headers['X-CMC_PRO_API_KEY']
+        self.keys.append(key)
+        status = self.statuses.get(key, 200)
+        if status != 200:
+            return FakeResponse(status, {'status': {'error_message': 'no'}},
+                                {'Retry-After': '30'})
+        return FakeResponse(*ok([], self.credit_count))
+
+
+def make(statuses, keys, **kwargs):
+    cmc = CoinMarketCap(api_key=keys, **kwargs)
+    cmc.session = KeySession(statuses)
+    return cmc
+
+
+def test_keys_are_not_in_session():
+    cmc = CoinMarketCap(api_key=['a', 'b'])
+    assert isinstance(cmc.key_pool, KeyPool)
+    assert 'X-CMC_PRO_API_KEY' not in cmc.session.headers
+
+
+def test_least_loaded_routing():
+    cmc = make({}, ['a', 'b', 'c'])
+    for _ in range(6):
+        cmc.map()
+    assert sorted(cmc.session.keys) == ['a', 'a', 'b', 'b', 'c', 'c']
+    pool = KeyPool(['a', 'b'])
+    assert pool.reserve()[0] == 'a'
+    assert pool.reserve()[0] == 'b'
+    pool.release('b')
+    assert pool.reserve()[0] == 'b'
+
+
+def test_bad_keys_leave_rotation():
+    cmc = make({'a': 401, 'b': 429}, ['a', 'b', 'c'])
+    for _ in range(4):
+        cmc.map()
+    assert cmc.session.keys[-2:] == ['c', 'c']
+    assert cmc.key_pool.healthy == ['b', 'c']
+    cmc = make({'a': 402}, ['a'])
+    with pytest.raises(PaymentRequiredException):
+        cmc.map()
+    with pytest.raises(KeyPoolExhaustedException):
+        cmc.map()
+
+
+def test_per_key_limits():
+    pool = KeyPool(['a', 'b'], calls_per_minute=1, daily_credits=3)
+    assert pool.reserve()[0] == 'a'
+    assert pool.reserve()[0] == 'b'
+    key, wait = pool.reserve()
+    assert key is None and 0 < wait <= 60
+    assert pool.remaining('a') == 2
+    pool = KeyPool(['a'], daily_credits=1)
+    pool.reserve()
+    with pytest.raises(KeyPoolExhaustedException):
+        pool.reserve()
+
+
+
+def test_credits_follow_credit_count():
+    cmc = make({'b': 429}, ['a', 'b'])
+    cmc.session.credit_count = 5
+    pool = cmc.key_pool
+    pool.daily_credits = 100
+    cmc.map()
+    # Credits estimated when a key is taken are replaced once the
+    # response is decoded, and rejected calls use no credits.
+    assert cmc.session.keys == ['a']
+    assert pool.remaining('a') == 95
+    cmc.map()
+    assert cmc.session.keys == ['a', 'b', 'a']
+    assert (pool.remaining('a'), pool.remaining('b')) == (90, 100)
@@ -0,0 +1,72 @@
+import pytest
+from requests.exceptions import ConnectionError
+from cmc_api import *
+from .conftest import ok
+
+
+def handler(url, params):
+    if url.endswith('/info'):
+        return 400, {'status': {'error_message': 'bad id'}}
+    return 200, {'status': {'error_code': 0, 'credit_count': 2,
+                            'elapsed': 7}, 'data': []}
+
+
+def test_disabled_by_default(offline_cmc):
+    cmc = offline_cmc(handler)
+    assert cmc.metrics is None
+    assert cmc.map() == []
+
+
+def test_records_per_endpoint(offline_cmc):
+    metrics = Metrics(buckets=(0.5, 1))
+    events = []
+    metrics.add_hook(events.append)
+    cmc = offline_cmc(handler, metrics=metrics, single_flight=False)
+    cmc.map()
+    cmc.map()
+    with pytest.raises(BadRequestException):
+        cmc.info(id=1)
+    snapshot = metrics.snapshot()
+    map_ = snapshot['/v1/cryptocurrency/map']
+    assert map_['requests'] == 2
+    assert map_['statuses'] == {200: 2}
+    assert map_['credits'] == 4
+    assert map_['elapsed_ms'] == 14
+    assert map_['bytes'] > 0
+    assert map_['latency_buckets'][float('inf')] == 2
+    assert snapshot['/v1/cryptocurrency/info']['statuses'] == {400: 1}
+    assert [e.endpoint for e in events] == [
+        '/v1/cryptocurrency/map', '/v1/cryptocurrency/map',
+        '/v1/cryptocurrency/info']
+    assert events[0].credit_count == 2
+
+
+def test_cache_hits_and_failures(offline_cmc):
+    def fail(url, params):
+        raise ConnectionError('reset')
+    cmc = offline_cmc(handler, metrics=True, cache=True)
+    cmc.map()
+    cmc.map()
+    cmc.map(raw=True)
+    statuses = cmc.metrics.snapshot()['/v1/cryptocurrency/map']['statuses']
+    assert statuses == {200: 2}
+    cmc = offline_cmc(fail, metrics=True)
+    with pytest.raises(ConnectionError):
+        cmc.map()
+    statuses = cmc.metrics.snapshot()['/v1/cryptocurrency/map']['statuses']
+    assert statuses == {0: 1}
+
+
+def test_prometheus(offline_cmc):
+    cmc = offline_cmc(handler, metrics=Metrics(buckets=(1,)))
+    cmc.map()
+    text = cmc.metrics.to_prometheus()
+    assert '# TYPE cmc_api_requests_total counter' in text
+    assert ('cmc_api_requests_total{endpoint="/v1/cryptocurrency/map",'
+            'status="200"} 1') in text
+    assert ('cmc_api_request_duration_seconds_bucket{'
+            'endpoint="/v1/cryptocurrency/map",le="+Inf"} 1') in text
+    assert ('cmc_api_credits_total{endpoint="/v1/cryptocurrency/map"} 2'
+            in text)
+    cmc.metrics.reset()
+    assert cmc.metrics.snapshot() == {}
@@ -0,0 +1,66 @@
+import pytest
+from cmc_api import *
+from cmc_api.mock import MockServer
+from benchmarks.bench import run, compare
+
+
+@pytest.fixture(scope='module')
+def server():
+    with MockServer() as server:
+        yield server
+
+
+@pytest.fixture
+def cmc(server):
+    cmc = CoinMarketCap(root='sandbox')
+    cmc.BASE_URL = server.url
+    return cmc
+
+
+def test_every_endpoint(cmc):
+    assert len(cmc.map(limit=10)) == 10
+    assert len(cmc.map('fiat')) == 5
+    assert cmc.listings(limit=3)[2]['cmc_rank'] == 3
+    assert len(cmc.listings('exchange')) == 100
+    assert len(cmc.historical_listings(date='2021-01-01', limit=2)) == 2
+    assert cmc.info(symbol='C7')['C7']['id'] == 7
+    assert cmc.key_info()['plan']['credit_limit_daily'] == 4000
+    quotes = cmc.quotes(id=[1, 2], convert='USD,EUR')
+    assert set(quotes['2']['quote']) == {'USD', 'EUR'}
+    assert 'quote' in cmc.quotes('global-metrics')
+    history = cmc.historical_quotes(id=1, interval='hourly',
+                                    time_start='2021-01-01T00:00:00Z',
+                                    time_end='2021-01-02T00:00:00Z')
+    assert len(history['quotes']) == 25
+    assert len(cmc.historical_ohlcv(id=1, count=5)['quotes']) == 5
+    assert set(cmc.ohlcv(id='1,3')) == {'1', '3'}
+    assert len(cmc.market_pairs(id=1, limit=7)['market_pairs']) == 7
+    assert '1' in cmc.price_performance_stats(id=1)
+    assert cmc.price_conversion(id=2, amount=2)['amount'] == 2
+    assert '1' in cmc.blockchain_stats(id=1)
+    assert len(cmc.flipside_fcas_listings(limit=4)) == 4
+    assert '1' in cmc.flipside_fcas_quotes(id=1)
+    with pytest.raises(BadRequestException):
+        cmc.quotes(id=999999)
+
+
+def test_injected_failures():
+    with MockServer(error_rate=0.5, rate_limit_rate=0.3, retry_after=0,
+                    seed=1) as server:
+        cmc = CoinMarketCap(root='sandbox', rate_limit=RateLimiter(6000, max_retries=10),
+                            retry=Retry(total=10, backoff_factor=0))
+        cmc.BASE_URL = server.url
+        for i in range(10):
+            assert cmc.quotes(id=i + 1)
+        statuses = {status for _, status in server.requests}
+    assert statuses == {200, 429, 500}
+
+
+def test_benchmark(server):
+    result = run(server.url, 'quotes', 'threads', calls=20, workers=4)
+    assert set(result) == {'throughput', 'p50_ms', 'p99_ms', 'cpu_ms',
+                           'peak_kb'}
+    assert result['p99_ms'] >= result['p50_ms']
+    slower = dict(result, throughput=result['throughput'] / 2)
+    assert compare({'x': slower}, {'x': result}, 0.2) == \
+        [('x', 'throughput', result['throughput'], slower['throughput'])]
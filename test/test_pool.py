@@ -0,0 +1,53 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from requests import Session
+from cmc_api import *
+from .conftest import ok
+
+
+def test_init_session_pool():
+    session = CoinMarketCap._init_session('key', pool_size=32)
+    adapter = session.get_adapter('https://pro-api.coinmarketcap.com')
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block
+    assert session.headers['Connection'] == 'keep-alive'
+    session = CoinMarketCap._init_session('key', keep_alive=False)
+    assert session.headers['Connection'] == 'close'
+
+
+def test_thread_sessions():
+    cmc = CoinMarketCap(root='sandbox', pool_strategy='thread')
+    assert cmc.session is cmc.session
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        sessions = list(executor.map(lambda _: cmc.session, range(2)))
+    assert all(isinstance(session, Session) for session in sessions)
+    assert sessions[0] is not cmc.session
+
+
+def test_shared_session():
+    cmc = CoinMarketCap(root='sandbox')
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        sessions = list(executor.map(lambda _: cmc.session, range(2)))
+    assert sessions == [cmc.session] * 2
+
+
+def test_bad_pool_strategy():
+    with pytest.raises(ValueError):
+        CoinMarketCap(root='sandbox', pool_strategy='process')
+
+
+def test_map_concurrent(offline_cmc):
+    def handler(url, params):
+        if params['id'] == 0:
+            return 400, {'status': {'error_message': 'Invalid value for "id"'}}
+        return ok({str(params['id']): params['id']})
+    cmc = offline_cmc(handler)
+    results = cmc.map_concurrent('quotes', [{'id': i} for i in range(1, 20)])
+    assert results == [{str(i): i} for i in range(1, 20)]
+    results = cmc.map_concurrent(cmc.info, [{'id': 1}, {'id': 0}],
+                                 return_exceptions=True)
+    assert results[0] == {'1': 1}
+    assert isinstance(results[1], BadRequestException)
+    with pytest.raises(BadRequestException):
+        cmc.map_concurrent('info', [{'id': 0}])
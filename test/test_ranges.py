@@ -0,0 +1,100 @@
+import pytest
+from cmc_api import *
+from cmc_api.ranges import (interval_seconds, plan_windows, plan_dates,
+                            merge_history)
+from cmc_api.times import to_timestamp, to_isoformat
+from .conftest import ok
+
+DAY = 24 * 60 * 60
+
+
+def daily_quotes(url, params):
+    if 'date' in params:
+        return ok([{'id': 1, 'last_updated': params['date']},
+                   {'id': 2, 'last_updated': params['date']}])
+    start = -(-to_timestamp(params['time_start']) // DAY) * DAY
+    end = to_timestamp(params['time_end'])
+    if end - start > 5 * DAY:
+        return 400, {'status': {'error_message': 'Too many quotes.'}}
+    times = range(int(start), int(end) + 1, DAY)
+    asset = {'id': 1, 'symbol': 'BTC',
+             'quotes': [{'timestamp': to_isoformat(t),
+                         'quote': {'USD': {'price': t // DAY}}}
+                        for t in times]}
+    if ',' in str(params['id']):
+        return ok({'1': asset, '2': dict(asset, id=2)})
+    return ok(asset)
+
+
+def test_interval_seconds():
+    assert interval_seconds('5m') == 300
+    assert interval_seconds('2h') == 7200
+    assert interval_seconds('daily') == DAY
+    assert interval_seconds('7d') == 7 * DAY
+    with pytest.raises(ValueError):
+        interval_seconds('often')
+
+
+def test_plan_windows():
+    windows = plan_windows('2021-01-01', '2021-01-12', 'daily', max_count=5)
+    assert len(windows) == 3
+    assert windows[0] == (to_timestamp('2021-01-01'),
+                          to_timestamp('2021-01-06') - 1)
+    assert windows[-1][1] == to_timestamp('2021-01-12')
+    assert plan_windows('2021-01-01', '2021-01-02', '5m') == \
+        [(to_timestamp('2021-01-01'), to_timestamp('2021-01-02'))]
+
+
+def test_plan_dates():
+    assert plan_dates('2021-01-01', '2021-01-03') == [
+        '2021-01-01T00:00:00.000Z', '2021-01-02T00:00:00.000Z',
+        '2021-01-03T00:00:00.000Z']
+
+
+def test_merge_history_deduplicates():
+    a = {'id': 1, 'quotes': [{'timestamp': '2021-01-02'},
+                             {'timestamp': '2021-01-03'}]}
+    b = {'id': 1, 'quotes': [{'timestamp': '2021-01-01'},
+                             {'timestamp': '2021-01-02'}]}
+    merged = merge_history([a, b], 'quotes')
+    assert [q['timestamp'] for q in merged['quotes']] == \
+        ['2021-01-01', '2021-01-02', '2021-01-03']
+
+
+def test_split_historical_quotes(offline_cmc):
+    cmc = offline_cmc(daily_quotes)
+    cmc.max_count = 5
+    with pytest.raises(BadRequestException):
+        cmc.historical_quotes(id=1, interval='daily',
+                              time_start='2021-01-01', time_end='2021-01-12')
+    data = cmc.historical_quotes(id=1, interval='daily', split=True,
+                                 time_start='2021-01-01', time_end='2021-01-12')
+    assert len(cmc.session.calls) == 4
+    timestamps = [q['timestamp'] for q in data['quotes']]
+    assert len(timestamps) == 12
+    assert timestamps == sorted(timestamps)
+    assert data['symbol'] == 'BTC'
+
+
+def test_split_multiple_ids(offline_cmc):
+    cmc = offline_cmc(daily_quotes)
+    cmc.max_count = 5
+    data = cmc.historical_quotes(id='1,2', interval='daily', split=True,
+                                 time_start='2021-01-01', time_end='2021-01-12')
+    assert set(data) == {'1', '2'}
+    assert len(data['2']['quotes']) == 12
+
+
+def test_split_historical_listings(offline_cmc):
+    cmc = offline_cmc(daily_quotes)
+    data = cmc.historical_listings(split=True, time_start='2021-01-01',
+                                   time_end='2021-01-03', limit=2)
+    assert len(data) == 6
+    assert cmc.session.calls[0][1] == {'limit': 2,
+                                       'date': '2021-01-01T00:00:00.000Z'}
+
+
+def test_split_requires_range(offline_cmc):
+    cmc = offline_cmc(daily_quotes)
+    with pytest.raises(ValueError):
+        cmc.historical_ohlcv(id=1, count=10, split=True)
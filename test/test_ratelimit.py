@@ -0,0 +1,57 @@
+import time
+import pytest
+from cmc_api import *
+from cmc_api.ratelimit import retry_after, credit_count
+from .conftest import ok
+
+
+def test_retry_after():
+    assert retry_after({'Retry-After': '5'}) == 5
+    assert retry_after({}) == 60
+    assert retry_after({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}) == 0
+    assert retry_after({'Retry-After': 'soon'}, default=3) == 3
+
+
+def test_credit_count():
+    assert credit_count({'status': {'credit_count': 4}}) == 4
+    assert credit_count({}) == 1
+
+
+def test_rate_limiter_queues():
+    limiter = RateLimiter(calls_per_minute=600)
+    waits = [limiter.reserve() for _ in range(605)]
+    assert waits[0] == 0
+    assert waits[599] == 0
+    assert 0.09 < waits[-1] < 0.6
+
+
+def test_rate_limiter_credits():
+    limiter = RateLimiter(calls_per_minute=600, credits_per_minute=60)
+    limiter.consume(61)
+    assert limiter.reserve() > 0.5
+
+
+def test_rate_limiter_pause():
+    limiter = RateLimiter()
+    limiter.pause(2)
+    assert 1 < limiter.reserve() <= 2
+
+
+def test_client_retries_after_429(offline_cmc):
+    responses = [
+        (429, {'status': {'error_message': 'rate limited'}}, {'Retry-After': '0'}),
+        ok([{'id': 1}]),
+    ]
+    cmc = offline_cmc(lambda url, params: responses.pop(0), rate_limit=30)
+    assert cmc.map() == [{'id': 1}]
+    assert len(cmc.session.calls) == 2
+
+
+def test_client_raises_when_retries_exhausted(offline_cmc):
+    limiter = RateLimiter(max_retries=1)
+    response = (429, {'status': {'error_message': 'rate limited'}},
+                {'Retry-After': '0'})
+    cmc = offline_cmc(lambda url, params: response, rate_limit=limiter)
+    with pytest.raises(TooManyRequestsException):
+        cmc.map()
+    assert len(cmc.session.calls) == 2
@@ -0,0 +1,47 @@
+import pytest
+from cmc_api import *
+from cmc_api.mock import MockServer
+
+np = pytest.importorskip('numpy')
+
+listings = [
+    {'id': 1, 'symbol': 'BTC', 'cmc_rank': 1,
+     'quote': {'USD': {'price': 50000., 'last_updated': 1000}}},
+    {'id': 1027, 'symbol': 'ETH', 'cmc_rank': 2,
+     'quote': {'USD': {'price': 2000., 'last_updated': 900}}},
+    {'id': 9999, 'symbol': 'BTC', 'cmc_rank': 900,
+     'quote': {'USD': {'price': 1., 'last_updated': 1000}}},
+]
+
+
+def test_convert_arrays():
+    rates = RateTable(max_age=60)
+    rates.add_quotes(listings)
+    result = rates.convert([1, 2, 3], 'btc', 'ETH')
+    assert result.amount.tolist() == [25., 50., 75.]
+    assert result.as_of.tolist() == [900, 900, 900]
+    assert result.stale.all()
+    result = rates.convert(np.array([10, 10]), ['BTC', 1027], 'USD')
+    assert result.amount.tolist() == [500000., 20000.]
+    assert rates.rate(9999, 'USD') == 1
+    assert rates.matrix(['BTC', 'ETH'])[1, 0] == pytest.approx(0.04)
+    with pytest.raises(KeyError):
+        rates.convert(1, 'DOGE', 'USD')
+
+
+def test_fallback_and_refresh():
+    with MockServer() as server:
+        cmc = CoinMarketCap(root='sandbox')
+        cmc.BASE_URL = server.url
+        rates = RateTable(cmc)
+        rates.refresh(limit=10, fiats=['EUR'])
+        assert 'C10' in rates and 'EUR' in rates and 'C11' not in rates
+        calls = sum(server.requests.values())
+        rates.convert([1, 2], 'C3', 'EUR')
+        assert sum(server.requests.values()) == calls
+        # Prices of the mock server move every 5 minutes.
+        assert rates.convert(1, 'C11', 'C10').amount == pytest.approx(
+            cmc.price_conversion(amount=1, symbol='C11',
+                                 convert='C10')['quote']['C10']['price'],
+            rel=0.3)
+        assert 'C11' in rates
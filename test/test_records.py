@@ -0,0 +1,86 @@
+import json
+import pickle
+import pytest
+from cmc_api import *
+from cmc_api.records import decode_records
+from .conftest import ok
+
+
+def body(data, status=None):
+    return json.dumps({'status': status or {'credit_count': 1},
+                       'data': data}).encode()
+
+
+listings = [{'id': i, 'symbol': 'C{}'.format(i), 'tags': ['a', 'b]'],
+             'quote': {'USD': {'price': i * 1.5}}} for i in range(1, 4)]
+
+
+def test_decode_listings():
+    res = decode_records(body(listings), 'listings')
+    assert res['status'] == {'credit_count': 1}
+    records = res['data']
+    assert [type(x) for x in records] == [Listing] * 3
+    assert not any(x.loaded for x in records)
+    assert records[1].symbol == 'C2'
+    assert records[1].loaded and not records[0].loaded
+    assert records[2]['quote']['USD']['price'] == 4.5
+    assert records[0].max_supply is None
+    assert records == listings
+    with pytest.raises(AttributeError):
+        records[0].price
+
+
+def test_decode_nested():
+    data = {'1': {'id': 1, 'quote': {}}, '2': {'id': 2, 'quote': {}}}
+    res = decode_records(body(data), 'quotes')
+    assert {k: type(v) for k, v in res['data'].items()} == \
+        {'1': Quote, '2': Quote}
+    assert res['data'] == data
+    data = {'id': 1, 'num_market_pairs': 2,
+            'market_pairs': [{'market_pair': 'BTC/USD'},
+                             {'market_pair': 'BTC/"EUR"'}]}
+    res = decode_records(body(data), 'market_pairs')
+    assert res['data']['num_market_pairs'] == 2
+    assert res['data']['market_pairs'][1].market_pair == 'BTC/"EUR"'
+    assert isinstance(res['data']['market_pairs'][0], MarketPair)
+
+
+def test_decode_fallback():
+    deep = {'id': 1, 'quote': {'a': {'b': {'c': {'d': {'e': {'f': 1}}}}}}}
+    res = decode_records(body([deep]), 'listings')
+    assert res['data'] == [deep]
+    assert isinstance(res['data'][0], Listing)
+    res = decode_records(body(None, {'error_message': 'bad'}), 'listings')
+    assert res == {'status': {'error_message': 'bad'}, 'data': None}
+
+
+def test_pickle():
+    record = decode_records(body(listings), 'listings')['data'][0]
+    assert pickle.loads(pickle.dumps(record)) == listings[0]
+    record.id
+    assert pickle.loads(pickle.dumps(record)) == listings[0]
+
+
+def test_client_records(offline_cmc):
+    cmc = offline_cmc(lambda url, params: ok(listings), cache=True)
+    records = cmc.listings(records=True)
+    assert isinstance(records[0], Listing)
+    assert cmc.session.calls[0][1] == {}
+    cached = cmc.listings(records=True)
+    assert isinstance(cached[0], Listing) and cached == listings
+    assert isinstance(cmc.listings()[0], dict)
+    assert len(cmc.session.calls) == 2
+    with pytest.raises(ValueError):
+        cmc.quotes('global-metrics', records=True)
+
+
+def test_records_in_json_caches(offline_cmc, tmp_path):
+    quotes = {'1': {'id': 1, 'symbol': 'BTC', 'quote': {}}}
+    for kwargs in ({'cache': SQLiteCache(str(tmp_path / 'cache.db'))},
+                   {'shared': SharedState(str(tmp_path / 'shared.db'))}):
+        cmc = offline_cmc(lambda url, params: ok(quotes), **kwargs)
+        for _ in range(2):
+            records = cmc.quotes(id=1, records=True)
+            assert isinstance(records['1'], Quote)
+            assert records['1'].symbol == 'BTC' and records == quotes
+        assert len(cmc.session.calls) == 1
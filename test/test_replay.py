@@ -0,0 +1,45 @@
+import pytest
+from cmc_api import *
+from .conftest import ok
+
+
+def handler(url, params):
+    return ok([{'id': int(x)} for x in params.get('id', '1').split(',')])
+
+
+def test_record_then_replay(offline_cmc, tmp_path):
+    path = str(tmp_path / 'tape.db')
+    cmc = offline_cmc(handler, tape=Tape(path, mode='record'))
+    assert cmc.historical_quotes(id='1,2') == [{'id': 1}, {'id': 2}]
+    assert len(cmc.tape) == 1
+    replay = offline_cmc(handler, tape=Tape(path, mode='replay'),
+                         budget=CreditBudget(daily=0, reconcile_every=None))
+    assert replay.historical_quotes(id='1,2') == [{'id': 1}, {'id': 2}]
+    assert replay.historical_quotes(id='1,2', raw=True).status_code == 200
+    assert replay.session.calls == []
+    with pytest.raises(ReplayMissException):
+        replay.historical_quotes(id='2,1')
+
+
+def test_auto_and_fuzzy(offline_cmc, tmp_path):
+    path = str(tmp_path / 'tape.db')
+    tape = Tape(path, match='fuzzy', ignore=['aux'], time_tolerance=60)
+    cmc = offline_cmc(handler, tape=tape)
+    cmc.historical_quotes(id='1,2', time_start='2021-01-01T00:00:00Z')
+    cmc.historical_quotes(id='1,2', time_start='2021-01-01T00:00:00Z')
+    assert len(cmc.session.calls) == 1
+    cmc.historical_quotes(id='2,1', time_start='2021-01-01T00:00:30Z', aux='x')
+    assert len(cmc.session.calls) == 1
+    cmc.historical_quotes(id='2,1', time_start='2021-01-01T00:02:00Z')
+    assert len(cmc.session.calls) == 2
+
+
+def test_transient_errors_are_not_recorded(offline_cmc, tmp_path):
+    def unavailable(url, params):
+        return 503, {'status': {'error_message': 'Service unavailable'}}
+    cmc = offline_cmc(unavailable, tape=Tape(str(tmp_path / 'tape.db')))
+    with pytest.raises(CMCAPIException):
+        cmc.map()
+    assert len(cmc.tape) == 0
+    with pytest.raises(ValueError):
+        Tape(str(tmp_path / 'tape.db'), mode='play')
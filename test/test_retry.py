@@ -0,0 +1,120 @@
+import time
+import pytest
+from requests.exceptions import ConnectionError, Timeout
+from cmc_api import *
+from .conftest import ok
+
+server_error = (500, {'status': {'error_message': 'Internal error'}})
+unavailable = (503, {'status': {'error_message': 'Service unavailable'}})
+
+
+def sequence(*responses):
+    """Handler answering with responses in order, raising exceptions."""
+    responses = list(responses)
+
+    def handler(url, params):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+    return handler
+
+
+def test_backoff():
+    retry = Retry(backoff_factor=1, max_backoff=5, jitter=False)
+    assert [retry.backoff(i) for i in range(4)] == [1, 2, 4, 5]
+    retry = Retry(backoff_factor=1)
+    assert all(0 <= retry.backoff(3) <= 8 for _ in range(100))
+
+
+def test_timeout_is_sent(offline_cmc):
+    cmc = offline_cmc(sequence(ok([])), timeout=5)
+    calls = []
+    get = cmc.session.get
+    cmc.session.get = lambda url, **kwargs: calls.append(kwargs) or \
+        get(url, **kwargs)
+    cmc.map()
+    assert calls[0]['timeout'] == 5
+
+
+def test_retry_server_and_network_errors(offline_cmc):
+    handler = sequence(server_error, ConnectionError('reset'),
+                       Timeout('read'), ok([{'id': 1}]))
+    cmc = offline_cmc(handler, retry=Retry(backoff_factor=0))
+    assert cmc.map() == [{'id': 1}]
+    assert len(cmc.session.calls) == 4
+
+
+def test_retries_exhausted(offline_cmc):
+    cmc = offline_cmc(sequence(unavailable, unavailable),
+                      retry=Retry(total=1, backoff_factor=0))
+    with pytest.raises(CMCAPIException):
+        cmc.map()
+    cmc = offline_cmc(sequence(ConnectionError('reset')))
+    with pytest.raises(ConnectionError):
+        cmc.map()
+
+
+def test_client_errors_are_not_retried(offline_cmc):
+    bad = (400, {'status': {'error_message': 'bad'}})
+    cmc = offline_cmc(sequence(bad), retry=True)
+    with pytest.raises(BadRequestException):
+        cmc.map()
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    breaker.failure('a')
+    breaker.before('a')
+    breaker.failure('a')
+    assert breaker.is_open('a')
+    with pytest.raises(CircuitOpenException):
+        breaker.before('a')
+    breaker.before('b')
+    time.sleep(0.1)
+    breaker.before('a')
+    with pytest.raises(CircuitOpenException):
+        breaker.before('a')
+    breaker.failure('a')
+    with pytest.raises(CircuitOpenException):
+        breaker.before('a')
+    time.sleep(0.1)
+    breaker.before('a')
+    breaker.success('a')
+    assert not breaker.is_open('a')
+    breaker.before('a')
+
+
+def test_client_circuit_breaker(offline_cmc):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    cmc = offline_cmc(lambda url, params: server_error,
+                      circuit_breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(InternalServerErrorException):
+            cmc.map()
+    with pytest.raises(CircuitOpenException):
+        cmc.map()
+    assert len(cmc.session.calls) == 2
+
+
+def test_breaker_trial_released_on_error(offline_cmc):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    cmc = offline_cmc(sequence(server_error, ValueError('bad'), ok([])),
+                      circuit_breaker=breaker)
+    with pytest.raises(InternalServerErrorException):
+        cmc.map()
+    with pytest.raises(ValueError):
+        cmc.map()
+    assert cmc.map() == []
+    assert not breaker.is_open(cmc.BASE_URL + '/cryptocurrency/map')
+
+
+def test_client_errors_do_not_open_breaker(offline_cmc):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    cmc = offline_cmc(sequence(*[ValueError('bad')] * 3 + [ok([])]),
+                      circuit_breaker=breaker)
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            cmc.map()
+    assert not breaker.is_open(cmc.BASE_URL + '/cryptocurrency/map')
+    assert cmc.map() == []
@@ -0,0 +1,58 @@
+import threading
+import time
+from cmc_api import *
+from cmc_api.mock import MockServer
+from cmc_api.shared import SharedSingleFlight
+
+
+def test_rate_limit_is_shared(tmp_path):
+    path = str(tmp_path / 'shared.db')
+    a = SharedRateLimiter(path, calls_per_minute=2)
+    b = SharedRateLimiter(path, calls_per_minute=2)
+    assert a.reserve() == 0
+    assert b.reserve() == 0
+    assert 29 < a.reserve() <= 30
+    b.pause(120)
+    assert 119 < a.reserve() <= 120
+
+
+def test_calls_in_flight_are_shared(tmp_path):
+    path = str(tmp_path / 'shared.db')
+    cache = SQLiteCache(path)
+    flights = [SharedSingleFlight(path, cache, poll=0.01) for _ in range(4)]
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        cache.set('key', 'value', 60)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(
+        target=lambda f=f: results.append(f.do('key', fetch)))
+        for f in flights]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+    assert len(flights[0]) == 0
+
+
+def test_clients_share_cache(tmp_path):
+    path = str(tmp_path / 'shared.db')
+    with MockServer(latency=0.2) as server:
+        clients = []
+        for _ in range(3):
+            cmc = CoinMarketCap(root='sandbox', shared=SharedState(path, 600))
+            cmc.BASE_URL = server.url
+            clients.append(cmc)
+        threads = [threading.Thread(target=cmc.map) for cmc in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        clients[0].map()
+        assert sum(server.requests.values()) == 1
@@ -0,0 +1,63 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from cmc_api import *
+from cmc_api.singleflight import SingleFlight
+from .conftest import ok
+
+
+def test_single_flight_shares_result():
+    flight = SingleFlight()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return [x]
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(lambda _: flight.do('k', slow, 1),
+                                    range(10)))
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert len(flight) == 0
+
+
+def test_single_flight_shares_exception():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise BadRequestException('bad')
+
+    def call(_):
+        try:
+            flight.do('k', fail)
+        except BadRequestException as e:
+            return e
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        errors = list(executor.map(call, range(5)))
+    assert all(isinstance(e, BadRequestException) for e in errors)
+
+
+def test_client_single_flight(offline_cmc):
+    def handler(url, params):
+        time.sleep(0.2)
+        return ok([{'id': 1}])
+    cmc = offline_cmc(handler)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: cmc.map(), range(8)))
+    assert results == [[{'id': 1}]] * 8
+    assert len(cmc.session.calls) == 1
+    cmc.map()
+    assert len(cmc.session.calls) == 2
+
+
+def test_client_without_single_flight(offline_cmc):
+    def handler(url, params):
+        time.sleep(0.1)
+        return ok([])
+    cmc = offline_cmc(handler, single_flight=False)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: cmc.map(), range(4)))
+    assert len(cmc.session.calls) == 4
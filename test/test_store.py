@@ -0,0 +1,150 @@
+import threading
+import time
+import pytest
+from cmc_api import *
+from cmc_api import store
+from cmc_api.store import _missing_ranges, _merge_ranges
+from cmc_api.times import to_timestamp, to_isoformat
+from .conftest import ok
+
+DAY = 24 * 60 * 60
+
+
+def history(url, params):
+    """Daily history where the price is the day number."""
+    start = to_timestamp(params['time_start'])
+    end = to_timestamp(params['time_end'])
+    first = -(-start // DAY) * DAY
+    quotes = []
+    t = first
+    while t <= end:
+        day = int(t // DAY)
+        if 'ohlcv' in url:
+            quotes.append({'time_open': to_isoformat(t),
+                           'time_close': to_isoformat(t + DAY - 1),
+                           'time_high': None, 'time_low': None,
+                           'quote': {'USD': {'open': day, 'close': day + 1,
+                                             'high': None, 'low': None,
+                                             'volume': 1e9, 'market_cap': 1,
+                                             'timestamp': to_isoformat(t)}}})
+        else:
+            quotes.append({'timestamp': to_isoformat(t),
+                           'quote': {'USD': {'price': day, 'volume_24h': 1,
+                                             'market_cap': 2,
+                                             'timestamp': to_isoformat(t)}}})
+        t += DAY
+    return ok({'id': 1, 'name': 'Bitcoin', 'symbol': 'BTC', 'quotes': quotes})
+
+
+def test_ranges():
+    assert _merge_ranges([[5, 6], [1, 3], [2, 4]]) == [[1, 4], [5, 6]]
+    assert _missing_ranges([[1, 4], [5, 6]], 0, 10) == \
+        [(0, 1), (4, 5), (6, 10)]
+    assert _missing_ranges([[1, 4]], 2, 3) == []
+
+
+def test_store_fetches_missing_ranges(offline_cmc, tmp_path):
+    cmc = offline_cmc(history, store=HistoryStore(str(tmp_path)))
+    first = cmc.historical_quotes(id=1, interval='daily',
+                                  time_start='2021-01-10', time_end='2021-01-20')
+    assert len(first['quotes']) == 11
+    assert first['symbol'] == 'BTC'
+    assert len(cmc.session.calls) == 1
+
+    again = cmc.historical_quotes(id=1, interval='daily',
+                                  time_start='2021-01-12', time_end='2021-01-15')
+    assert len(cmc.session.calls) == 1
+    assert [q['quote']['USD']['price'] for q in again['quotes']] == \
+        [18639, 18640, 18641, 18642]
+    assert again['quotes'][0]['timestamp'] == '2021-01-12T00:00:00.000Z'
+
+    wider = cmc.historical_quotes(id=1, interval='daily',
+                                  time_start='2021-01-01', time_end='2021-01-25')
+    assert len(cmc.session.calls) == 3
+    prices = [q['quote']['USD']['price'] for q in wider['quotes']]
+    assert prices == list(range(18628, 18653))
+
+
+def test_store_persists(offline_cmc, tmp_path):
+    cmc = offline_cmc(history, store=HistoryStore(str(tmp_path)))
+    cmc.historical_ohlcv(id=1, time_start='2021-01-01', time_end='2021-01-05')
+    cmc = offline_cmc(history, store=HistoryStore(str(tmp_path)))
+    data = cmc.historical_ohlcv(id=1, time_start='2021-01-02',
+                                time_end='2021-01-03')
+    assert cmc.session.calls == []
+    quote = data['quotes'][0]
+    assert quote['time_low'] is None
+    assert quote['quote']['USD']['open'] == 18629
+    assert quote['quote']['USD']['high'] is None
+
+
+def test_store_skips_other_requests(offline_cmc, tmp_path):
+    cmc = offline_cmc(history, store=HistoryStore(str(tmp_path)))
+    for _ in range(2):
+        cmc.historical_quotes(id=1, count=10, time_start='2021-01-01',
+                              time_end='2021-01-02')
+        cmc.historical_quotes(id='1,2', time_start='2021-01-01',
+                              time_end='2021-01-02')
+    assert len(cmc.session.calls) == 4
+
+
+def test_store_covers_what_was_returned(offline_cmc, tmp_path):
+    today = time.time() // DAY * DAY
+
+    def published(url, params):
+        end = min(to_timestamp(params['time_end']), time.time())
+        return history(url, dict(params, time_end=end))
+
+    cmc = offline_cmc(published, store=HistoryStore(str(tmp_path)))
+    parameters = dict(id=1, interval='daily', time_start=today - 3 * DAY,
+                      time_end=today + 3 * DAY)
+    assert len(cmc.historical_quotes(**parameters)['quotes']) == 4
+    cmc.historical_quotes(**parameters)
+    # The quotes after today were not published, so they are asked again
+    # from the last one returned, but not past the current time.
+    assert [to_timestamp(call[1]['time_start'])
+            for call in cmc.session.calls] == [today - 3 * DAY, today]
+    cmc.historical_quotes(id=1, interval='daily', time_start=today + DAY,
+                          time_end=today + 2 * DAY)
+    assert len(cmc.session.calls) == 2
+
+
+def test_store_covers_cut_short_responses(offline_cmc, tmp_path,
+                                          monkeypatch):
+    def cut_short(url, params):
+        status, res = history(url, params)
+        res['data']['quotes'] = res['data']['quotes'][:3]
+        return status, res
+
+    monkeypatch.setattr(store, '_max_count', 3)
+    cmc = offline_cmc(cut_short, store=HistoryStore(str(tmp_path)))
+    for _ in range(2):
+        cmc.historical_quotes(id=1, interval='daily', time_start='2021-01-01',
+                              time_end='2021-01-10')
+    # Responses with the maximum count may have been cut short.
+    assert [call[1]['time_start'] for call in cmc.session.calls] == [
+        '2021-01-01T00:00:00.000Z', '2021-01-03T00:00:00.000Z']
+
+
+def test_store_fetches_series_concurrently(offline_cmc, tmp_path):
+    started = threading.Event()
+    release = threading.Event()
+
+    def handler(url, params):
+        if str(params['id']) == '1':
+            started.set()
+            assert release.wait(5)
+        return history(url, params)
+
+    cmc = offline_cmc(handler, store=HistoryStore(str(tmp_path)))
+    thread = threading.Thread(target=cmc.historical_quotes, kwargs=dict(
+        id=1, time_start='2021-01-01', time_end='2021-01-02'))
+    thread.start()
+    assert started.wait(5)
+    # The request of another id is not held up by the one in flight.
+    data = cmc.historical_quotes(id=2, interval='daily',
+                                 time_start='2021-01-01',
+                                 time_end='2021-01-02')
+    release.set()
+    thread.join()
+    assert len(data['quotes']) == 2
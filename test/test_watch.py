@@ -0,0 +1,97 @@
+import asyncio
+import time
+import pytest
+from cmc_api import *
+from cmc_api.times import to_isoformat
+from .conftest import ok
+
+
+def polls(*prices):
+    """Handler answering listings with the prices of each poll."""
+    prices = list(prices)
+
+    def handler(url, params):
+        data = [{'id': i + 1, 'last_updated': to_isoformat(60 * n),
+                 'quote': {'USD': {'price': price}}}
+                for i, (n, price) in enumerate(prices.pop(0))]
+        return ok(data)
+    return handler
+
+
+def test_watch_yields_changes(offline_cmc):
+    cmc = offline_cmc(polls([(0, 10), (0, 20)], [(1, 11), (0, 20)],
+                            [(1, 11), (0, 20), (2, 5)]), cache=False)
+    changes = list(cmc.watch('listings', max_polls=3, min_interval=0))
+    assert [(c.id, c.previous is None) for c in changes] == [
+        (1, True), (2, True), (1, False), (3, True)]
+    assert changes[2].previous['quote']['USD']['price'] == 10
+
+
+def test_watch_thresholds(offline_cmc):
+    cmc = offline_cmc(polls([(0, 100)], [(1, 100.5)], [(2, 101)],
+                            [(3, 100.8)]))
+    changes = cmc.watch('listings', initial=False, max_polls=4,
+                        min_interval=0,
+                        thresholds={'quote.USD.price': 0.01})
+    assert [c.record['quote']['USD']['price'] for c in changes] == [101]
+
+
+def test_watch_records(offline_cmc):
+    cmc = offline_cmc(polls([(0, 100)], [(1, 100.5)], [(2, 101)]))
+    changes = list(cmc.watch('listings', initial=False, max_polls=3,
+                             min_interval=0, records=True,
+                             thresholds={'quote.USD.price': 0.01}))
+    assert [type(c.record) for c in changes] == [Listing]
+    assert changes[0].record.quote['USD']['price'] == 101
+
+
+def test_cadence():
+    watcher = Watcher(period=60, lag=1)
+    assert watcher.wait(5) == 60
+    now = time.time()
+    watcher.update([{'id': 1, 'last_updated': to_isoformat(now - 100)}])
+    watcher.update([{'id': 1, 'last_updated': to_isoformat(now - 10)}])
+    assert watcher.wait(0) == pytest.approx(81, abs=1)
+    assert watcher.wait(200) == 200
+
+
+def test_cadence_with_stale_data():
+    watcher = Watcher(period=60, lag=1)
+    stale = to_isoformat(time.time() - 3600)
+    for _ in range(3):
+        watcher.update([{'id': 1, 'last_updated': stale}])
+        assert watcher.wait(1) == pytest.approx(60, abs=1)
+
+
+def test_cadence_follows_median_gap():
+    watcher = Watcher(period=60, lag=0)
+    now = time.time()
+    for t in (-130, -120, -60, 0):
+        watcher.update([{'id': 1, 'last_updated': to_isoformat(now + t)}])
+    # A single short gap does not set the period.
+    assert watcher.wait(0) == pytest.approx(60, abs=1)
+
+
+def test_watch_bypasses_cache(offline_cmc):
+    cmc = offline_cmc(polls([(0, 10)], [(1, 11)], [(2, 12)]), cache=True)
+    changes = list(cmc.watch('listings', max_polls=3, min_interval=0))
+    assert [c.record['quote']['USD']['price'] for c in changes] == \
+        [10, 11, 12]
+    assert len(cmc.session.calls) == 3
+    assert 'fresh' not in str(cmc.session.calls)
+    # The last poll is cached for other callers.
+    assert cmc.listings()[0]['quote']['USD']['price'] == 12
+    assert len(cmc.session.calls) == 3
+
+
+def test_async_watch():
+    cmc = AsyncCoinMarketCap.__new__(AsyncCoinMarketCap)
+    data = [[{'id': 1, 'v': 1}], [{'id': 1, 'v': 2}]]
+
+    async def listings(**parameters):
+        return data.pop(0)
+
+    async def main():
+        return [change.record['v'] async for change in
+                cmc._watch(listings, Watcher(period=0), {}, 2, 0)]
+    assert asyncio.run(main()) == [1, 2]